@@ -0,0 +1,95 @@
+"""
+Measures the client side cost of the chromium driver against the fake
+chromedriver server, so transport changes can be compared on any machine.
+
+Run from the project directory with ``python -m benchmarks.bench_driver``.
+The "client" column is the time spent outside the server phase, i.e. the
+overhead added by the driver, the Controller and the socket round-trip.
+
+``--transport proxy`` serves the fake server over TCP behind a
+UnixSocketProxy, as with the SERVICE_SOCKET_DIR setting, to measure the
+extra hop of the relay against ``tcp`` and ``unix``.
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+
+from core.services.fakedriver import FakeChromeDriver
+from core.services.proxy import UnixSocketProxy
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium.instrumentation import Metrics
+
+
+def scenarios(driver, element, text):
+    return [
+        ('GET_TITLE', lambda: driver.get_title()),
+        ('FIND_ELEMENT', lambda: driver.find_element('css selector', 'a')),
+        ('FIND_ELEMENTS', lambda: driver.find_elements('css selector', 'a')),
+        ('EXECUTE_SCRIPT', lambda: driver.execute_script('return 1', 1, 'a')),
+        ('GET_PAGE_SOURCE', lambda: driver.get_page_source()),
+        ('SEND_KEYS_TO_ELEMENT', lambda: element.send_keys(text)),
+    ]
+
+
+def run(iterations=1000, latency=0, elements=100, page_source_size=100000,
+        text_size=1000, transport='tcp'):
+    metrics = Metrics()
+    unix_socket = None
+    if transport == 'unix':
+        unix_socket = os.path.join(tempfile.mkdtemp(), 'fakedriver.sock')
+    with contextlib.ExitStack() as stack:
+        fake = stack.enter_context(FakeChromeDriver(
+            latency=latency, elements_count=elements,
+            page_source_size=page_source_size, unix_socket=unix_socket))
+        url = fake.url
+        if transport == 'proxy':
+            proxy = stack.enter_context(UnixSocketProxy(
+                os.path.join(tempfile.mkdtemp(), 'proxy.sock'), (fake.host, fake.port)))
+            url = proxy.url
+        # Repeated lookups would be answered by the element cache
+        driver = ChromiumDriver(url, metrics=metrics, element_cache=False)
+        element = driver.find_element('css selector', 'input')
+        text = 'x' * text_size
+        results = []
+        for name, func in scenarios(driver, element, text):
+            for _ in range(min(iterations, 50)):
+                func()
+            metrics.reset()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            elapsed = time.perf_counter() - start
+            results.append((name, elapsed / iterations * 1e6, metrics.commands[name]))
+        driver.quit()
+    return results
+
+
+def report(results):
+    header = '{0:<22} {1:>10} {2:>10} {3:>10} {4:>10} {5:>10}'
+    row = '{0:<22} {1:>10.1f} {2:>10.1f} {3:>10.1f} {4:>10.1f} {5:>10d}'
+    print(header.format('command', 'wall us', 'p50 us', 'p99 us', 'client us', 'resp B'))
+    for name, wall, stats in results:
+        total = stats.latency['total']
+        server = stats.latency['server']
+        print(row.format(
+            name, wall, total.percentile(50), total.percentile(99),
+            total.mean - server.mean, int(stats.response_bytes.mean)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--iterations', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--elements', type=int, default=100)
+    parser.add_argument('--page-source-size', type=int, default=100000)
+    parser.add_argument('--text-size', type=int, default=1000)
+    parser.add_argument('--transport', choices=['tcp', 'unix', 'proxy'], default='tcp')
+    options = parser.parse_args(argv)
+    report(run(options.iterations, options.latency, options.elements,
+               options.page_source_size, options.text_size, options.transport))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures the attribute access overhead of the lazy proxies.
+
+Run from the project directory with ``python -m benchmarks.bench_lazy``.
+"""
+import timeit
+
+from conf import LazyConfig
+from conf.snapshot import ConfigSnapshot
+from utils.lazy import CachedLazyObject, LazyObject, SimpleLazyObject
+
+
+class Target(object):
+    value = 1
+
+
+class PlainLazyTarget(LazyObject):
+    def _setup(self):
+        self._wrapped = Target()
+
+
+class CachedLazyTarget(CachedLazyObject):
+    def _setup(self):
+        self._wrapped = Target()
+
+
+def bench(label, stmt, namespace, number):
+    elapsed = min(timeit.repeat(stmt, globals=namespace, number=number, repeat=5))
+    per_call = elapsed / number * 1e9
+    print('{0:<28} {1:8.1f} ns/access'.format(label, per_call))
+    return per_call
+
+
+def main(number=1000000):
+    target = Target()
+    plain = PlainLazyTarget()
+    cached = CachedLazyTarget()
+    simple = SimpleLazyObject(Target)
+    settings = LazyConfig()
+    settings.use_snapshot(ConfigSnapshot({'debug': True}))
+    snapshot = settings._wrapped
+
+    namespace = locals()
+    baseline = bench('direct attribute', 'target.value', namespace, number)
+    bench('LazyObject', 'plain.value', namespace, number)
+    bench('CachedLazyObject', 'cached.value', namespace, number)
+    bench('SimpleLazyObject', 'simple.value', namespace, number)
+    mapping = bench('snapshot item', "snapshot['debug']", namespace, number)
+    bench('LazyConfig attribute', 'settings.debug', namespace, number)
+    bench('LazyConfig item', "settings['debug']", namespace, number)
+    print('baseline: %.1f ns (attribute), %.1f ns (item)' % (baseline, mapping))
+
+
+if __name__ == '__main__':
+    main()
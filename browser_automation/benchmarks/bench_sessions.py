@@ -0,0 +1,59 @@
+"""
+Measures how fast sessions can be created against the fake chromedriver
+server, building the options for each session or sharing a ChromeOptions.
+
+Run from the project directory with ``python -m benchmarks.bench_sessions``.
+"""
+import argparse
+import time
+
+from core.services.fakedriver import FakeChromeDriver
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium.options import ChromeOptions
+from core.webdriver.chromium.instrumentation import Metrics
+
+OPTIONS = {
+    'chrome_switches': ['headless', 'disable-gpu', 'window-size=1280,1024'],
+    'logging_prefs': {'browser': 'ALL', 'performance': 'INFO'},
+    'experimental_options': {'prefs': {'intl': {'accept_languages': 'en-US'}}},
+    'download_dir': '/tmp/downloads',
+    'page_load_strategy': 'normal',
+}
+
+
+def run(sessions=1000):
+    metrics = Metrics(enabled=False)
+    shared = ChromeOptions(**OPTIONS)
+    scenarios = [
+        ('options per session', lambda url: ChromiumDriver(url, metrics=metrics, **OPTIONS)),
+        ('shared ChromeOptions', lambda url: ChromiumDriver(url, metrics=metrics, options=shared)),
+        ('build options only', lambda url: ChromeOptions(**OPTIONS)),
+    ]
+    results = []
+    with FakeChromeDriver() as fake:
+        for name, create in scenarios:
+            for _ in range(min(sessions, 50)):
+                create(fake.url)
+            start = time.perf_counter()
+            for _ in range(sessions):
+                create(fake.url)
+            elapsed = time.perf_counter() - start
+            results.append((name, sessions / elapsed, elapsed / sessions * 1e6))
+    return results
+
+
+def report(results):
+    print('{0:<22} {1:>12} {2:>12}'.format('scenario', 'sessions/s', 'us/session'))
+    for name, rate, per_session in results:
+        print('{0:<22} {1:>12.0f} {2:>12.1f}'.format(name, rate, per_session))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--sessions', type=int, default=1000)
+    options = parser.parse_args(argv)
+    report(run(options.sessions))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ from conf import settings as global_settings
 from utils.lazy import LazyObject, empty
 from core.exceptions import ImproperlyConfigured
 from conf.config import Config
+from conf.snapshot import IMMUTABLE_TYPES, ConfigSnapshot
 
 
 VERSION = (1, 0, 0, 'alpha', 0)
@@ -47,20 +48,63 @@ class LazyConfig(LazyObject):
         }
 
     def __getattr__(self, name):
-        if self._wrapped is empty:
+        """
+        Return the value of a setting. Immutable values are cached in
+        __dict__, so later attribute reads don't go through the proxy at all;
+        mutable ones are read from the wrapped object each time, so they
+        keep its semantics (e.g. a snapshot's copy on read).
+        """
+        _wrapped = self._wrapped
+        if _wrapped is empty:
             self._setup(name)
-        return self._wrapped[name]
+            _wrapped = self._wrapped
+        value = _wrapped[name]
+        if isinstance(value, IMMUTABLE_TYPES):
+            self.__dict__[name] = value
+        return value
+
+    def __getitem__(self, name):
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            return self.__getattr__(name)
 
-    __getitem__ = __getattr__
+    def __setattr__(self, name, value):
+        """
+        Clear the settings cache when the wrapped object is replaced, and keep
+        it in sync with every write to the wrapped Config.
+        """
+        if name == "_wrapped":
+            self.__dict__.clear()
+            if isinstance(value, Config):
+                value.register_write_callback(self._uncache)
+        else:
+            self.__dict__.pop(name, None)
+        super(LazyConfig, self).__setattr__(name, value)
 
     def __setitem__(self, name, value):
         if name == "_wrapped":
-            self.__dict__["_wrapped"] = value
+            self.__setattr__(name, value)
         else:
             if self._wrapped is empty:
                 self._setup()
+            self.__dict__.pop(name, None)
             self._wrapped[name] = value
 
+    def __delitem__(self, name):
+        if self._wrapped is empty:
+            self._setup()
+        self.__dict__.pop(name, None)
+        del self._wrapped[name]
+
+    def _uncache(self, name):
+        if name is None:
+            wrapped = self.__dict__.get('_wrapped', empty)
+            self.__dict__.clear()
+            self.__dict__['_wrapped'] = wrapped
+        else:
+            self.__dict__.pop(name, None)
+
     def get(self, key, default):
         try:
             return self[key]
@@ -84,6 +128,26 @@ class LazyConfig(LazyObject):
 
         self._wrapped = holder
 
+    def snapshot(self):
+        """
+        Return an immutable snapshot of the settings, suitable to be
+        serialized once and shared with worker processes.
+        """
+        if self._wrapped is empty:
+            self._setup()
+        if isinstance(self._wrapped, ConfigSnapshot):
+            return self._wrapped
+        return self._wrapped.snapshot()
+
+    def use_snapshot(self, snapshot):
+        """
+        Replace the wrapped settings with a read-only snapshot. Used by
+        worker processes so they don't run _setup() again.
+        """
+        if not isinstance(snapshot, ConfigSnapshot):
+            snapshot = ConfigSnapshot.loads(snapshot)
+        self._wrapped = snapshot
+
     @property
     def configured(self):
         """
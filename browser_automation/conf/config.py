@@ -6,6 +6,7 @@ import shutil
 from collections import ChainMap
 
 from utils.json import find_json_objects
+from conf.snapshot import ConfigSnapshot
 from conf.helpers import get_default_config_dir
 
 
@@ -45,9 +46,15 @@ class Config(object):
             if isinstance(key, str) and key.isupper()
         })
 
+        # Values to fall back to when a key is removed from the config file
+        self.__defaults = dict(self.__config.maps[0])
+        # Keys set by the config file, see reload()
+        self.__file_keys = set()
+
         self.__config_disabled = list()
         self.__set_functions = dict()
         self.__change_callbacks = list()
+        self.__write_callbacks = list()
 
         # These hold the version numbers and they will be set when loaded
         self.__version = {
@@ -82,6 +89,7 @@ class Config(object):
         # Convert any key object to lower string
         else:
             self.__config[str(key).lower()] = value
+            self._written(str(key).lower())
             logger.debug('Setting key "{0}" to: {1} (of type: {2})'
                          .format(key, value, type(value)))
 
@@ -105,6 +113,7 @@ class Config(object):
         operate on the first mapping.
         """
         del self.__config[key]
+        self._written(key)
 
     def __del__(self):
         pass
@@ -120,21 +129,46 @@ class Config(object):
         return self.__config.parents
 
     def popitem(self):
-        return self.__config.popitem()
+        key, value = self.__config.popitem()
+        self._written(key)
+        return key, value
 
     def pop(self, key, args):
-        return self.__config.pop(key, args)
+        value = self.__config.pop(key, args)
+        self._written(key)
+        return value
 
     def clear(self):
         self.__config.clear()
+        self._written(None)
+
+    def snapshot(self):
+        """
+        Return an immutable ConfigSnapshot of the current values.
+        """
+        return ConfigSnapshot(dict(self.__config))
 
     def register_change_callback(self, callback):
         """
         Register a callback function for any changed value. Will be
-        called when any value is changed in the config dictionary.
+        called with (key, value) when any value is changed in the config
+        dictionary by a reload.
         """
         self.__change_callbacks.append(callback)
 
+    def register_write_callback(self, callback):
+        """
+        Register a callback function called with the key of every value set
+        or deleted, however it's done, or with None when all of them are.
+        A callback already registered isn't added again.
+        """
+        if callback not in self.__write_callbacks:
+            self.__write_callbacks.append(callback)
+
+    def _written(self, key):
+        for callback in self.__write_callbacks:
+            callback(key)
+
     def register_set_function(self, key, function, apply_now=True):
         """
         Register a function to be called when a config value changes.
@@ -163,51 +197,117 @@ class Config(object):
         logger.debug('Calling set functions for key %s..', key)
         if key in self.__set_functions:
             for func in self.__set_functions[key]:
-                func(key, self.__config[key])
+                func(key, self.__config.get(key))
 
-    def load(self, filename=None):
+    def _read(self, filename):
         """
-        Load a config file.
+        Read a config file and return a tuple of (version, content) dicts.
+        Either of them is None when it could not be read from the file.
         """
-        if not filename:
-            filename = self.__config_file
-
         try:
             with open(filename, 'r') as _file:
                 data = _file.read()
         except IOError as ex:
             logger.warning('Unable to open config file %s: %s', filename, ex)
-            return
+            return None, None
 
+        version, content = None, None
         objects = find_json_objects(data)
 
         if not len(objects):
             # No json objects found, try depickling it
             try:
-                self.__config.update(pickle.loads(data))
+                content = pickle.loads(data)
             except Exception as ex:
                 logger.exception(ex)
                 logger.warning('Unable to load config file: %s', filename)
         elif len(objects) == 1:
             start, end = objects[0]
             try:
-                self.__config.update(json.loads(data[start:end]))
+                content = json.loads(data[start:end])
             except Exception as ex:
                 logger.exception(ex)
                 logger.warning('Unable to load config file: %s', filename)
         elif len(objects) == 2:
             try:
                 start, end = objects[0]
-                self.__version.update(json.loads(data[start:end]))
+                version = json.loads(data[start:end])
                 start, end = objects[1]
-                self.__config.update(json.loads(data[start:end]))
+                content = json.loads(data[start:end])
             except Exception as ex:
                 logger.exception(ex)
                 logger.warning('Unable to load config file: %s', filename)
+                version, content = None, None
+        return version, content
+
+    def load(self, filename=None):
+        """
+        Load a config file.
+        """
+        if not filename:
+            filename = self.__config_file
+
+        version, content = self._read(filename)
+        if version is not None:
+            self.__version.update(version)
+        if content is not None:
+            self.__config.update(content)
+            self.__file_keys.update(str(key).lower() for key in content)
 
         logger.debug('Config %s version: %s.%s loaded: %s', filename,
                      self.__version['format'], self.__version['file'], self.__config)
 
+    def reload(self, filename=None):
+        """
+        Reload a config file, applying only the keys whose value differs from
+        the current configuration. Keys no longer in the file go back to their
+        default, or are deleted if they have none. Set functions registered
+        for those keys and the change callbacks are called once per changed
+        key, with None for a deleted one. Returns the list of changed keys.
+        """
+        if not filename:
+            filename = self.__config_file
+
+        version, content = self._read(filename)
+        if content is None:
+            return []
+        if version is not None:
+            self.__version.update(version)
+
+        changed = []
+        for key, value in content.items():
+            if key in self.__config and self.__config[key] == value:
+                continue
+            try:
+                self[key] = value
+            except ValueError:
+                logger.warning('Ignoring reloaded key %s from %s', key, filename)
+                continue
+            changed.append(str(key).lower())
+
+        loaded_keys = set(str(key).lower() for key in content)
+        for key in sorted(self.__file_keys - loaded_keys):
+            if key in self.__defaults:
+                if self.__config.get(key) == self.__defaults[key]:
+                    continue
+                self.__config[key] = self.__defaults[key]
+                self._written(key)
+            elif key in self.__config:
+                del self.__config[key]
+                self._written(key)
+            else:
+                continue
+            changed.append(key)
+        self.__file_keys = loaded_keys
+
+        for key in changed:
+            self.apply_set_functions(key)
+            for callback in self.__change_callbacks:
+                callback(key, self.__config.get(key))
+
+        logger.debug('Config %s reloaded, changed keys: %s', filename, changed)
+        return changed
+
     def save(self, filename=None):
         """
         Save configuration to disk.
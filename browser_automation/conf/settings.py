@@ -64,24 +64,64 @@ SERVICE_EXECUTABLE = os.path.join(BASE_DIR, 'bin', 'drivers', 'chromedriver.exe'
 SERVICE_HOST = 'localhost'
 
 # The specified ports to listen on. It may be of the form
-# '8000-8010,8080,9200-9300'
+# '8000-8010,8080,9200-9300'; port 0 lets the OS assign a free one.
 SERVICE_PORT = '4444-4454'
 
+# Directory of the lock files reserving the service ports, shared by every
+# worker on the host. None for core.services.ports.DEFAULT_LOCK_DIR, under
+# the temporary directory.
+SERVICE_PORT_LOCK_DIR = None
+
+# Directory for a Unix socket in front of each service, which the drivers
+# then connect to through its unix:// URL. None to connect over TCP.
+# The socket is relayed to chromedriver's TCP port, an extra hop that makes
+# each command slower than over TCP (see benchmarks/bench_driver.py
+# --transport proxy); use it to save ports, not time.
+SERVICE_SOCKET_DIR = None
+
+# File where the webdriver command metrics are written at the end of a run,
+# as JSON if it ends with '.json' and as Prometheus text otherwise.
+# Set to None to skip the dump.
+WEBDRIVER_METRICS_FILE = None
+
+# Directory for the browser logs of each session collected with
+# ChromiumDriver.collect_logs(), one '<session id>.jsonl' file per session.
+WEBDRIVER_LOG_DIR = os.path.join(BASE_DIR, 'logs', 'browser')
+
+# Network throttling profiles, by name, for ChromiumDriver.apply_network_profile(),
+# the throttle_network task decorator and the runner's --network-profile option.
+# Latency is in milliseconds and throughputs in bytes per second.
+NETWORK_PROFILES = {
+    'gprs': {'latency': 500, 'download_throughput': 6400, 'upload_throughput': 2560},
+    '2g': {'latency': 300, 'download_throughput': 32000, 'upload_throughput': 6400},
+    '3g': {'latency': 100, 'download_throughput': 96000, 'upload_throughput': 32000},
+    '4g': {'latency': 20, 'download_throughput': 524288, 'upload_throughput': 393216},
+    'dsl': {'latency': 5, 'download_throughput': 262144, 'upload_throughput': 131072},
+    'cable': {'latency': 28, 'download_throughput': 655360, 'upload_throughput': 131072},
+    'wifi': {'latency': 2, 'download_throughput': 3932160, 'upload_throughput': 1966080},
+}
+
+# When True, the config file is watched while the tasks run and its changes
+# are applied without a restart (see conf.watcher.ConfigWatcher).
+CONFIG_WATCH = False
+
 # The callable to use to configure logging
 LOGGING_CONFIG = 'logging.config.dictConfig'
 
 # Default logging. If you don’t want to configure logging at all
 # (or you want to manually configure logging using your own approach),
-# set LOGGING_CONFIG to None and provide a new configuration
+# set LOGGING_CONFIG to None and provide a new configuration.
+# Records go through a bounded queue and are written by a background
+# listener, so logging I/O doesn't add latency to the tasks.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'filters': {
         'require_debug_false': {
-            '()': 'browser_automation.utils.log.RequireDebugFalse',
+            '()': 'core.logging.filters.RequireDebugFalse',
         },
         'require_debug_true': {
-            '()': 'browser_automation.utils.log.RequireDebugTrue',
+            '()': 'core.logging.filters.RequireDebugTrue',
         },
     },
     'handlers': {
@@ -93,16 +133,23 @@ LOGGING = {
         'file': {
             'level': 'DEBUG',
             'filters': ['require_debug_true'],
-            'class': 'logging.FileHandler',
+            'class': 'core.logging.handlers.BatchFileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'debug.log'),
+            'delay': True,
+            'capacity': 100,
+            'flush_interval': 1.0,
+        },
+        # Must sort after the handlers it feeds
+        'queue': {
+            '()': 'core.logging.handlers.QueueHandler',
+            'handlers': ['console', 'file'],
+            'queue_size': 10000,
         },
     },
     'loggers': {
         'browser_automation': {
-            'handlers': ['console', 'mail_admins', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
         },
     }
 }
-
-
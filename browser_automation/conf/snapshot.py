@@ -0,0 +1,81 @@
+import copy
+import pickle
+from collections.abc import Mapping
+
+
+# Types handed out as they are; anything else is copied on each read
+IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, type(None), frozenset)
+
+
+def _copy(value):
+    """
+    Return `value`, or a deep copy of it if it could be mutated, so readers
+    get the same types as from the settings without changing the snapshot.
+    """
+    if isinstance(value, IMMUTABLE_TYPES):
+        return value
+    return copy.deepcopy(value)
+
+
+class ConfigSnapshot(Mapping):
+    """
+    An immutable copy of the configuration. It is built once in the parent
+    process, serialized to a single blob and handed to every worker, so the
+    workers neither import the settings module again nor share the mutable
+    Config singleton.
+
+    Only the top level is read-only: nested dicts, lists and sets are plain
+    containers, as in the parent, and each read returns a copy of them.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data=None):
+        object.__setattr__(self, '_data', copy.deepcopy(dict(data or {})))
+
+    def __getitem__(self, key):
+        return _copy(self._data[key])
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __setattr__(self, name, value):
+        raise TypeError("'%s' object is read-only" % type(self).__name__)
+
+    __delattr__ = __setattr__
+
+    def __setitem__(self, key, value):
+        raise TypeError("'%s' object does not support item assignment" % type(self).__name__)
+
+    def __delitem__(self, key):
+        raise TypeError("'%s' object does not support item deletion" % type(self).__name__)
+
+    def __reduce__(self):
+        return (self.__class__, (self._data,))
+
+    def get(self, key, default=None):
+        if key in self._data:
+            return self[key]
+        return default
+
+    def dumps(self):
+        """
+        Serialize the snapshot to a compact bytes blob.
+        """
+        return pickle.dumps(self._data, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def loads(cls, blob):
+        """
+        Rebuild a snapshot from a blob returned by dumps().
+        """
+        return cls(pickle.loads(blob))
+
+    def __repr__(self):
+        import pprint
+        return str(pprint.pformat(self._data))
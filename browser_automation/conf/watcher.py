@@ -0,0 +1,167 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from utils.lazy import LazyObject, empty
+
+
+logger = logging.getLogger(__name__)
+
+# Flags from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class PollingBackend(object):
+    """
+    Detects changes by comparing the stat signature of the file.
+    """
+    def __init__(self, filename, interval=1.0):
+        self.filename = filename
+        self.interval = interval
+        self._signature = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def wait(self, timeout):
+        """
+        Block up to `timeout` seconds and return True if the file changed.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            signature = self._stat()
+            if signature != self._signature:
+                self._signature = signature
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class InotifyBackend(object):
+    """
+    Detects changes with inotify. The parent directory is watched instead of
+    the file itself because Config.save() replaces the file by moving a new
+    one over it.
+    """
+    mask = IN_CLOSE_WRITE | IN_MODIFY | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, filename):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on linux')
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.filename = filename
+        self._name = os.path.basename(filename).encode()
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        directory = os.path.dirname(os.path.abspath(filename))
+        if libc.inotify_add_watch(self._fd, directory.encode(), self.mask) < 0:
+            code = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(code, 'inotify_add_watch failed for %s' % directory)
+
+    def wait(self, timeout):
+        """
+        Block up to `timeout` seconds and return True if the file changed.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            data = os.read(self._fd, 4096)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return False
+            raise
+        changed = False
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name == self._name:
+                changed = True
+        return changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def get_backend(filename, interval=1.0):
+    """
+    Return an inotify backend when available, otherwise a polling one.
+    """
+    try:
+        return InotifyBackend(filename)
+    except (OSError, AttributeError, TypeError) as e:
+        logger.debug('inotify not available (%s), polling %s', e, filename)
+        return PollingBackend(filename, interval)
+
+
+class ConfigWatcher(threading.Thread):
+    """
+    Thread that watches a config file and reloads it when it changes. A burst
+    of writes is coalesced into a single reload: the reload happens once the
+    file has been quiet for `debounce` seconds.
+    """
+    def __init__(self, config, filename=None, debounce=0.5, interval=1.0,
+                 backend=None):
+        super(ConfigWatcher, self).__init__()
+        self.daemon = True
+        if isinstance(config, LazyObject):
+            if config._wrapped is empty:
+                config._setup()
+            config = config._wrapped
+        self.config = config
+        self.filename = filename or config.config_file
+        self.debounce = debounce
+        self.backend = backend or get_backend(self.filename, interval)
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.is_set():
+                if not self.backend.wait(self.debounce):
+                    continue
+                # Keep draining events until the file settles down
+                while not self._stopped.is_set() and self.backend.wait(self.debounce):
+                    pass
+                if self._stopped.is_set():
+                    break
+                try:
+                    self.config.reload(self.filename)
+                except Exception as e:
+                    logger.exception('Error reloading config file %s: %s',
+                                     self.filename, e)
+        finally:
+            self.backend.close()
+
+    def stop(self):
+        self._stopped.set()
@@ -63,7 +63,8 @@ class Aplication(Command):
         del options['liveserver']
         
         # What do I have to do?
-        builder = Builder(pattern="do_*.py", test_runner=TestRunner)
+        builder = Builder(pattern="do_*.py", test_runner=TestRunner,
+                          network_profiles=options.get('network_profiles'))
         suite, result = builder.run_tests(['tasks'])
 
 
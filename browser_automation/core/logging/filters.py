@@ -3,11 +3,35 @@ import logging
 from conf import config
 
 
-class RequireDebugFalse(logging.Filter):
+class CachedDebugFilter(logging.Filter):
+    """
+    Reads the DEBUG setting once instead of on every record. The cached
+    value is dropped when the config reports a change to it.
+    """
+    def __init__(self, name=''):
+        super(CachedDebugFilter, self).__init__(name)
+        self._debug = None
+        self._registered = False
+
+    @property
+    def debug(self):
+        if self._debug is None:
+            self._debug = bool(config['debug'])
+            register = getattr(config._wrapped, 'register_set_function', None)
+            if register is not None and not self._registered:
+                register('debug', self._invalidate, apply_now=False)
+                self._registered = True
+        return self._debug
+
+    def _invalidate(self, key, value):
+        self._debug = None
+
+
+class RequireDebugFalse(CachedDebugFilter):
     def filter(self, record):
-        return not config['debug']
+        return not self.debug
 
 
-class RequireDebugTrue(logging.Filter):
+class RequireDebugTrue(CachedDebugFilter):
     def filter(self, record):
-        return config['debug']
\ No newline at end of file
+        return self.debug
@@ -0,0 +1,135 @@
+import logging
+import logging.handlers
+import queue
+import threading
+
+
+def get_handler_by_name(name):
+    """
+    Return the handler configured with `name`, or None.
+    """
+    getter = getattr(logging, 'getHandlerByName', None)
+    if getter is not None:
+        return getter(name)
+    return logging._handlers.get(name)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records over to a bounded queue which is drained by a background
+    QueueListener, so the threads running the tasks never wait on console or
+    file I/O. When the queue is full the record is dropped and counted in
+    `dropped` instead of blocking the caller.
+
+    `handlers` are names of handlers defined in the same logging
+    configuration. They must be configured before this one; dictConfig
+    creates handlers in name order, so name the queue handler accordingly
+    (e.g. 'queue' after 'console' and 'file').
+    """
+    def __init__(self, handlers=(), queue_size=10000, respect_handler_level=True):
+        targets = []
+        for name in handlers:
+            handler = name if isinstance(name, logging.Handler) else get_handler_by_name(name)
+            if handler is None:
+                raise ValueError('Handler %r is not configured yet' % name)
+            targets.append(handler)
+
+        super(QueueHandler, self).__init__(queue.Queue(queue_size))
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *targets, respect_handler_level=respect_handler_level)
+        self.listener.start()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def close(self):
+        """
+        Stop the listener, which processes every record still in the queue.
+        """
+        self.acquire()
+        try:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+                if self.dropped:
+                    logging.getLogger(__name__).warning(
+                        '%d log records were dropped because the queue was full',
+                        self.dropped)
+        finally:
+            self.release()
+        super(QueueHandler, self).close()
+
+
+class BatchFileHandler(logging.FileHandler):
+    """
+    A FileHandler that buffers formatted records and writes them with a single
+    call once `capacity` records are waiting, or `flush_interval` seconds
+    after the first of them arrived, from a timer thread. Pending records are
+    always written on close().
+
+    A failed write is reported with handleError() and its records are
+    dropped, so an unwritable file neither grows the buffer without limit
+    nor raises into the thread logging the record.
+    """
+    def __init__(self, filename, mode='a', encoding=None, delay=False,
+                 capacity=100, flush_interval=1.0):
+        self.buffer = []
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._timer = None
+        self._last_record = None
+        super(BatchFileHandler, self).__init__(filename, mode, encoding, delay)
+
+    def emit(self, record):
+        try:
+            self.buffer.append(self.format(record) + self.terminator)
+            self._last_record = record
+            if len(self.buffer) >= self.capacity:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        except Exception:
+            self.handleError(record)
+
+    def _flush_on_timer(self):
+        self.acquire()
+        try:
+            self._timer = None
+            self.flush()
+        except Exception:
+            self.handleError(self._last_record)
+        finally:
+            self.release()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def flush(self):
+        self.acquire()
+        try:
+            self._cancel_timer()
+            if self.buffer:
+                # Dropped even if the write fails, so they aren't retried forever
+                pending, self.buffer = self.buffer, []
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(''.join(pending))
+            super(BatchFileHandler, self).flush()
+        finally:
+            self.release()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            super(BatchFileHandler, self).close()
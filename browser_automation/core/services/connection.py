@@ -1,4 +1,3 @@
-import errno
 import logging
 import os
 import platform
@@ -7,24 +6,82 @@ import shutil
 import socket
 import subprocess
 import threading
+import time
 from urllib import request
 
 from conf import config
+from core.services.ports import PortAllocator
+from core.services.proxy import UnixSocketProxy
 from core.webdriver.chromium import constants as command
+from core.webdriver.exceptions import WebDriverException
 
 logger = logging.getLogger(__name__)
 
 
+def parse_address(address):
+    """
+    Split an address of the form 'host:8000-8010,8080,9200-9300' into the
+    host and the detailed list of all possible ports.
+    """
+    host, port_ranges = address.split(':')
+    possible_ports = []
+    for port_range in port_ranges.split(','):
+        # A port range can be of either form: '8000' or '8000-8010'.
+        extremes = list(map(int, port_range.split('-')))
+        if len(extremes) not in [1, 2]:
+            raise ValueError('Invalid port range: %s' % port_range)
+        if len(extremes) == 1:
+            # Port range of the form '8000'
+            possible_ports.append(extremes[0])
+        else:
+            # Port range of the form '8000-8010'
+            for port in range(extremes[0], extremes[1] + 1):
+                possible_ports.append(port)
+    return host, possible_ports
+
+
+def start_server_thread(server_thread, startup_timeout):
+    """
+    Start `server_thread` and wait until its server accepts connections.
+    """
+    server_thread.daemon = True
+    server_thread.start()
+    server_thread.is_ready.wait()
+    if server_thread.error:
+        raise server_thread.error
+
+    # The process has been spawned; wait until it accepts connections.
+    deadline = time.monotonic() + startup_timeout
+    while not server_thread.is_running():
+        if time.monotonic() >= deadline:
+            server_thread.terminate()
+            raise WebDriverException(
+                'Service on %s did not start in time' % server_thread.get_url())
+        time.sleep(0.05)
+    return server_thread
+
+
 class LiveServerThread(threading.Thread):
     """
     Thread for running a live http server while the tasks are running.
+
+    When `socket_dir` (by default the SERVICE_SOCKET_DIR setting) is set, the
+    server is also exposed on a Unix socket in that directory and get_url()
+    returns its unix:// URL.
+
+    The port is reserved with a PortAllocator before the process is spawned
+    and kept until the thread is terminated, so parallel workers never pick
+    the same one. A port of 0 lets the OS assign it.
     """
 
-    def __init__(self, host, possible_ports, env=None):
+    def __init__(self, host, possible_ports, env=None, socket_dir=None):
         self.host = host
         self.port = None
         self.possible_ports = possible_ports
         self.env = env or os.environ
+        self.socket_dir = socket_dir
+        self.proxy = None
+        self.reservation = None
         self.is_ready = threading.Event()
         self.error = None
         super(LiveServerThread, self).__init__()
@@ -35,26 +92,20 @@ class LiveServerThread(threading.Thread):
         http requests.
         """
         try:
-            # Go through the list of possible ports, hoping that we can find
-            # one that is free to use for the service server.
-            for index, port in enumerate(self.possible_ports):
-                try:
-                    self.process = self._create_server(port)
-                except socket.error as e:
-                    if (index + 1 < len(self.possible_ports) and
-                            e.errno == errno.EADDRINUSE):
-                        # This port is already in use, so we go on and try with
-                        # the next one in the list.
-                        continue
-                    else:
-                        # Either none of the given ports are free or the error
-                        # is something else than "Address already in use". So
-                        # we let that error bubble up to the main thread.
-                        raise
-                else:
-                    # A free port was found.
-                    self.port = port
-                    break
+            allocator = PortAllocator(self.host, self.possible_ports,
+                                      config.get('service_port_lock_dir', None))
+            self.reservation = allocator.allocate()
+            self.port = self.reservation.port
+            try:
+                self.process = self._create_server(self.port)
+            except Exception:
+                self.reservation.release()
+                raise
+
+            socket_dir = self.socket_dir or config.get('service_socket_dir', None)
+            if socket_dir:
+                path = os.path.join(socket_dir, 'service-%d-%d.sock' % (os.getpid(), self.port))
+                self.proxy = UnixSocketProxy(path, (self.host, self.port)).start()
 
             self.is_ready.set()
 
@@ -63,6 +114,11 @@ class LiveServerThread(threading.Thread):
             self.is_ready.set()
 
     def get_url(self):
+        if self.proxy is not None:
+            return self.proxy.url
+        return self.get_http_url()
+
+    def get_http_url(self):
         return 'http://%s:%s' % (self.host, self.port)
 
     def is_running(self):
@@ -82,7 +138,7 @@ class LiveServerThread(threading.Thread):
 
     def get_status(self):
         try:
-            response = request.urlopen(self.get_url() + '/status')
+            response = request.urlopen(self.get_http_url() + '/status')
         except request.URLError:
             response = None
         return response
@@ -117,7 +173,7 @@ class LiveServerThread(threading.Thread):
         try:
             if hasattr(self, 'process') and self.process:
                 try:
-                    cmd = self.get_url() + command.SHUTDOWN[1]
+                    cmd = self.get_http_url() + command.SHUTDOWN[1]
                     request.urlopen(cmd, timeout=10).close()
                 except:
                     logger.warning("Error trying to shutdown server")
@@ -134,6 +190,12 @@ class LiveServerThread(threading.Thread):
                 self.process.kill()
                 self.process.wait()
                 self.process = None
+            if self.proxy is not None:
+                self.proxy.stop()
+                self.proxy = None
+            if self.reservation is not None:
+                self.reservation.release()
+                self.reservation = None
         except OSError:
             logger.error('Kill server may not be available under windows environment')
 
@@ -0,0 +1,367 @@
+"""
+A stand-in for chromedriver that speaks the JSON wire protocol routes in
+core.webdriver.chromium.constants without launching a browser.
+
+It is meant for tests and benchmarks of the client side: responses are
+canned, and latency, payload sizes and errors can be configured per command.
+
+Run it as a separate process with ``python -m core.services.fakedriver``.
+"""
+import argparse
+import base64
+import itertools
+import json
+import os
+import random
+import re
+import socket
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from core.webdriver.chromium import constants
+
+
+def compile_routes():
+    """
+    Return a list of (method, regex, command name) for every command.
+    """
+    routes = []
+    for name, value in sorted(vars(constants).items()):
+        if not (name.isupper() and isinstance(value, tuple)):
+            continue
+        method, path = value
+        pattern = re.sub(r':(\w+)', r'(?P<\1>[^/]+)', path)
+        routes.append((method, re.compile('^%s$' % pattern), name))
+    # Match the most specific (longest) paths first
+    routes.sort(key=lambda route: -len(route[1].pattern))
+    return routes
+
+ROUTES = compile_routes()
+
+# HTTP error making the server close the connection without an answer
+DROP_CONNECTION = -1
+# HTTP error making the server close the connection halfway through an answer
+RESET_MID_BODY = -2
+
+
+class FakeDriverState(object):
+    """
+    Configuration and counters shared by the request handlers.
+
+    `latency`
+        seconds to wait before answering, or a callable receiving the command
+        name and returning the seconds.
+    `responses`
+        maps command names to the value to return, or to a callable receiving
+        (params, state) and returning it.
+    `errors`
+        maps command names to a legacy status code (e.g. 7 for NoSuchElement)
+        returned instead of a value, or to a callable receiving
+        (params, state) and returning the status code or None.
+    `http_errors`
+        like `errors`, but with an HTTP status (e.g. 503) answered with a
+        plain text body, DROP_CONNECTION to close the connection instead, or
+        RESET_MID_BODY to close it after half of a successful answer.
+    `error_rate`
+        probability of answering any command with `error_status`.
+    `page_source_size`, `screenshot_size`, `elements_count`
+        sizes of the generated payloads.
+    """
+    def __init__(self, latency=0, responses=None, errors=None, http_errors=None, error_rate=0,
+                 error_status=13, page_source_size=1024, screenshot_size=1024,
+                 elements_count=10, w3c=False, seed=None):
+        self.latency = latency
+        self.responses = dict(responses or {})
+        self.errors = dict(errors or {})
+        self.http_errors = dict(http_errors or {})
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.page_source_size = page_source_size
+        self.screenshot_size = screenshot_size
+        self.elements_count = elements_count
+        self.w3c = w3c
+        self.random = random.Random(seed)
+        self.sessions = {}
+        self.requests = {}
+        self._sessions_created = 0
+        self._element_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def add_session(self, params):
+        """
+        Register a new session created with `params` and return its id and
+        its number, counted from 0.
+        """
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[session_id] = params
+            self._sessions_created += 1
+            return session_id, self._sessions_created - 1
+
+    def has_session(self, session_id):
+        with self._lock:
+            return session_id in self.sessions
+
+    def remove_session(self, session_id):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+
+    def new_element(self):
+        key = 'element-6066-11e4-a52e-4f735466cecf' if self.w3c else 'ELEMENT'
+        return {key: '0.%d-1' % next(self._element_ids)}
+
+    def delay(self, name):
+        latency = self.latency(name) if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+
+    def value_for(self, name, params):
+        if name in self.responses:
+            response = self.responses[name]
+            return response(params, self) if callable(response) else response
+        if name in ('NEW_SESSION', 'GET_SESSION_CAPABILITIES'):
+            session_id = params['sessionId']
+            return {'browserName': 'chrome', 'version': 'fake',
+                    'chrome': {'chromedriverVersion': 'fake',
+                               'userDataDir': '/tmp/.org.chromium.Chromium.%s' % session_id},
+                    'goog:chromeOptions': {'debuggerAddress': 'localhost:%d' % (
+                        9222 + params.get('sessionNumber', 0))}}
+        if name in ('FIND_ELEMENT', 'FIND_CHILD_ELEMENT', 'GET_ACTIVE_ELEMENT'):
+            return self.new_element()
+        if name in ('FIND_ELEMENTS', 'FIND_CHILD_ELEMENTS'):
+            return [self.new_element() for _ in range(self.elements_count)]
+        if name == 'GET_PAGE_SOURCE':
+            body = '<html><body>%s</body></html>'
+            return body % ('x' * max(self.page_source_size - len(body) + 2, 0))
+        if name == 'SCREENSHOT':
+            return base64.b64encode(b'\0' * self.screenshot_size).decode('ascii')
+        if name == 'GET_TITLE':
+            return 'Fake page'
+        if name == 'GET_CURRENT_URL':
+            return 'about:blank'
+        if name == 'GET_WINDOW_HANDLES':
+            return ['CDwindow-1']
+        if name == 'GET_CURRENT_WINDOW_HANDLE':
+            return 'CDwindow-1'
+        if name in ('GET_LOG', 'GET_COOKIES'):
+            return []
+        return None
+
+
+class FakeDriverHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _route(self, method):
+        path = self.path.split('?', 1)[0].rstrip('/') or '/'
+        for route_method, regex, name in ROUTES:
+            if route_method != method:
+                continue
+            match = regex.match(path)
+            if match:
+                return name, match.groupdict()
+        return None, {}
+
+    def _reply(self, status, payload, truncate=False):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if truncate:
+            self.wfile.write(data[:len(data) // 2])
+            # Let the client read it, then reset the connection
+            time.sleep(0.05)
+            self.connection.setsockopt(
+                socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            self.connection.close()
+            self.close_connection = True
+            return
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        params = json.loads(body.decode('utf-8')) if body else {}
+
+        name, path_params = self._route(method)
+        if name is None:
+            self._reply(404, {'status': 9, 'value': {'message': 'unknown command: %s' % self.path}})
+            return
+        params.update(path_params)
+        state.count(name)
+        state.delay(name)
+
+        session_id = path_params.get('sessionId')
+        if name == 'NEW_SESSION':
+            session_id, number = state.add_session(params)
+            params = dict(params, sessionId=session_id, sessionNumber=number)
+        elif session_id is not None and not state.has_session(session_id):
+            self._reply(200, {'sessionId': session_id, 'status': 6,
+                              'value': {'message': 'invalid session id'}})
+            return
+
+        http_status = state.http_errors.get(name)
+        if callable(http_status):
+            http_status = http_status(params, state)
+        if http_status == DROP_CONNECTION:
+            self.close_connection = True
+            return
+        if http_status and http_status != RESET_MID_BODY:
+            data = b'Service unavailable'
+            self.send_response(http_status)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        status = state.errors.get(name)
+        if callable(status):
+            status = status(params, state)
+        if status is None and state.error_rate and state.random.random() < state.error_rate:
+            status = state.error_status
+        if status:
+            # Legacy chromedriver answers errors with 200 and a status code
+            self._reply(200, {'sessionId': session_id, 'status': status,
+                              'value': {'message': 'injected error for %s' % name}})
+            return
+
+        value = state.value_for(name, params)
+        if name == 'QUIT':
+            state.remove_session(session_id)
+        self._reply(200, {'sessionId': session_id, 'status': 0, 'value': value},
+                    truncate=http_status == RESET_MID_BODY)
+
+        if name == 'SHUTDOWN':
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+class FakeDriverServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, state):
+        self.state = state
+        HTTPServer.__init__(self, address, FakeDriverHandler)
+
+
+class _UnixFakeDriverHandler(FakeDriverHandler):
+    # TCP_NODELAY doesn't apply to Unix sockets
+    disable_nagle_algorithm = False
+
+    def address_string(self):
+        return self.server.server_address
+
+
+class UnixFakeDriverServer(ThreadingMixIn, UnixStreamServer):
+    """
+    A FakeDriverServer listening on the Unix socket at `path`.
+    """
+    daemon_threads = True
+
+    def __init__(self, path, state):
+        self.state = state
+        if os.path.exists(path):
+            os.remove(path)
+        UnixStreamServer.__init__(self, path, _UnixFakeDriverHandler)
+
+
+class FakeChromeDriver(object):
+    """
+    Runs a FakeDriverServer in a background thread. Can be used as a context
+    manager; `url` is the value to pass to ChromiumDriver. With
+    `unix_socket`, a path, it listens there instead of on `host`:`port`.
+    """
+    def __init__(self, host='127.0.0.1', port=0, unix_socket=None, **options):
+        self.state = FakeDriverState(**options)
+        self.unix_socket = unix_socket
+        if unix_socket is None:
+            self.server = FakeDriverServer((host, port), self.state)
+            self.host, self.port = self.server.server_address[:2]
+        else:
+            self.server = UnixFakeDriverServer(unix_socket, self.state)
+            self.host = self.port = None
+        self._thread = None
+
+    @property
+    def url(self):
+        if self.unix_socket is not None:
+            return 'unix://%s' % os.path.abspath(self.unix_socket)
+        return 'http://%s:%s' % (self.host, self.port)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
+        if self.unix_socket is not None and os.path.exists(self.unix_socket):
+            os.remove(self.unix_socket)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fake chromedriver server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9515)
+    parser.add_argument('--unix-socket', help='Listen on this Unix socket instead.')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='Seconds to wait before answering each command.')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='Probability of answering with an unknown error.')
+    parser.add_argument('--page-source-size', type=int, default=1024)
+    parser.add_argument('--elements-count', type=int, default=10)
+    options = parser.parse_args(argv)
+
+    state = FakeDriverState(
+        latency=options.latency, error_rate=options.error_rate,
+        page_source_size=options.page_source_size,
+        elements_count=options.elements_count)
+    if options.unix_socket:
+        server = UnixFakeDriverServer(options.unix_socket, state)
+    else:
+        server = FakeDriverServer((options.host, options.port), state)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Allocation of the ports the service processes listen on.
+
+A service process is spawned with the port on its command line, so nothing
+fails in this process if the port is taken, and two workers starting a
+service at the same time could pick the same one. A PortAllocator reserves
+the port before the process is spawned instead:
+
+- each port is reserved by an exclusive lock on '<lock_dir>/<port>.lock',
+  shared by every worker on the host and released by the OS if the worker
+  dies, and it's only handed out if nothing is listening on it;
+- the configured ports are tried from a random one on, so workers starting
+  together don't all contend for the first;
+- port 0 among them (e.g. SERVICE_PORT '0') stands for any port: once the
+  others are taken, the OS assigns an ephemeral one, which is locked too.
+
+The lock directory and files are made writable by every user, so the
+workers of several users on a host share them. A lock file another user
+created without leaving it writable counts as a taken port.
+"""
+import errno
+import logging
+import os
+import random
+import socket
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_DIR = os.path.join(tempfile.gettempdir(), 'browser_automation-ports')
+
+# Ephemeral ports to draw before giving up
+EPHEMERAL_ATTEMPTS = 20
+
+
+class NoFreePort(OSError):
+    """
+    Raised when none of the possible ports can be reserved.
+    """
+    def __init__(self, message):
+        super(NoFreePort, self).__init__(errno.EADDRINUSE, message)
+
+
+def _lock(fd):
+    """
+    Try to take an exclusive lock on the open file `fd`; return whether it
+    was taken.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def is_port_free(host, port):
+    """
+    Return whether `port` can be bound on `host`.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind((host, port))
+    except OSError:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+def ephemeral_port(host):
+    """
+    Return a port the OS considers free, from its ephemeral range.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+class PortReservation(object):
+    """
+    A port reserved for this process until release() is called.
+    """
+    def __init__(self, port, fd):
+        self.port = port
+        self._fd = fd
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def released(self):
+        return self._fd is None
+
+    def __repr__(self):
+        return '<%s %d%s>' % (type(self).__name__, self.port,
+                              ' released' if self.released else '')
+
+
+class PortAllocator(object):
+    """
+    Reserves ports on `host` among `possible_ports`, where 0 (or None
+    instead of a list) stands for an ephemeral port assigned by the OS. See
+    the module documentation.
+    """
+    def __init__(self, host, possible_ports=None, lock_dir=None):
+        self.host = '127.0.0.1' if host in (None, '', 'localhost') else host
+        self.ephemeral = possible_ports is None or 0 in possible_ports
+        self.possible_ports = [port for port in possible_ports or [] if port]
+        self.lock_dir = lock_dir or DEFAULT_LOCK_DIR
+        if not os.path.isdir(self.lock_dir):
+            os.makedirs(self.lock_dir, exist_ok=True)
+            # Like the temporary directory: anyone may add lock files
+            try:
+                os.chmod(self.lock_dir, 0o1777)
+            except OSError:
+                pass
+
+    def reserve(self, port):
+        """
+        Return a PortReservation of `port`, or None if another worker holds
+        it or it's in use.
+        """
+        path = os.path.join(self.lock_dir, '%d.lock' % port)
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        except PermissionError:
+            logger.debug('Lock file %s is not writable, skipping port %d', path, port)
+            return None
+        try:
+            # The umask may have left it read-only for the other users
+            os.fchmod(fd, 0o666)
+        except (OSError, AttributeError):
+            pass
+        if not _lock(fd):
+            os.close(fd)
+            return None
+        if not is_port_free(self.host, port):
+            os.close(fd)
+            return None
+        return PortReservation(port, fd)
+
+    def _candidates(self):
+        if self.possible_ports:
+            start = random.randrange(len(self.possible_ports))
+            for port in self.possible_ports[start:] + self.possible_ports[:start]:
+                yield port
+        if self.ephemeral:
+            for _ in range(EPHEMERAL_ATTEMPTS):
+                yield ephemeral_port(self.host)
+
+    def allocate(self):
+        """
+        Reserve a port and return its PortReservation. Raise NoFreePort if
+        none is available.
+        """
+        for port in self._candidates():
+            reservation = self.reserve(port)
+            if reservation is not None:
+                logger.debug('Reserved port %d', port)
+                return reservation
+        raise NoFreePort('No free port on %s among %s' % (
+            self.host, self.possible_ports + (['ephemeral'] if self.ephemeral else [])))
@@ -0,0 +1,106 @@
+"""
+A local proxy exposing a TCP service on a Unix socket.
+
+chromedriver only listens on TCP. Running a UnixSocketProxy in front of it
+lets the drivers on the same host use the unix:// transport (see
+core.webdriver.chromium.transport), so they need no TCP port per connection:
+
+    proxy = UnixSocketProxy('/run/ba/chromedriver-9515.sock', ('127.0.0.1', 9515))
+    proxy.start()
+    driver = ChromiumDriver(proxy.url)
+
+Each connection accepted on the socket is relayed byte for byte over its own
+TCP connection to the target, which HTTP keep-alive reuses for every command
+of a driver.
+"""
+import logging
+import os
+import selectors
+import socket
+import socketserver
+import threading
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = 64 * 1024
+
+
+class _RelayHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        try:
+            upstream = socket.create_connection(self.server.target)
+        except OSError as e:
+            logger.warning('Could not connect to %s:%s: %s',
+                           self.server.target[0], self.server.target[1], e)
+            return
+        upstream.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        peers = {self.request: upstream, upstream: self.request}
+        with upstream, selectors.DefaultSelector() as selector:
+            for sock in peers:
+                selector.register(sock, selectors.EVENT_READ)
+            while True:
+                for key, _ in selector.select():
+                    try:
+                        data = key.fileobj.recv(BUFFER_SIZE)
+                        if data:
+                            peers[key.fileobj].sendall(data)
+                    except OSError:
+                        data = b''
+                    if not data:
+                        # Either side closed, so the other one is done too
+                        return
+
+
+class _UnixRelayServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, target):
+        self.target = target
+        socketserver.UnixStreamServer.__init__(self, path, _RelayHandler)
+
+
+class UnixSocketProxy(object):
+    """
+    Relays the connections to the Unix socket `path` to `target`, a
+    (host, port) tuple, from a background thread. A stale socket file left
+    at `path` is replaced.
+    """
+    def __init__(self, path, target):
+        self.path = path
+        self.target = tuple(target)
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        if os.path.exists(path):
+            os.remove(path)
+        self.server = _UnixRelayServer(path, self.target)
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'unix://%s' % os.path.abspath(self.path)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,182 @@
+"""
+Runs several browser sessions on each chromedriver process.
+
+chromedriver can host many concurrent sessions, so instead of one service
+process per browser the ServiceScheduler starts a few of them and places each
+new session on the least loaded one that is below `sessions_per_process`.
+The ChromiumDriver created for a session talks to the URL of the service it
+was placed on.
+
+With a `supervisor` (see core.services.supervisor) the services are watched
+and restarted when they crash or leak; the slots of a restarted service move
+to its new URL. The sessions created by create_session() release the slot of
+the process they were placed on, so those that died with a restarted one
+don't free the slots of its successor, even on the same URL.
+"""
+import logging
+import threading
+import time
+
+from conf import config
+from core.services.connection import (
+    LiveServerThread, parse_address, start_server_thread)
+from core.webdriver.exceptions import PoolTimeout
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Service(object):
+    """
+    A running service process and the number of sessions placed on it.
+    """
+    def __init__(self, server_thread):
+        self.server_thread = server_thread
+        self.url = server_thread.get_url()
+        self.sessions = 0
+        # Incremented on each restart of the process
+        self.generation = 0
+
+
+class ServiceScheduler(object):
+    def __init__(self, address=None, max_processes=2, sessions_per_process=4,
+                 server_factory=LiveServerThread, startup_timeout=10, supervisor=None):
+        if address is None:
+            address = '{0}:{1}'.format(config['service_host'], config['service_port'])
+        self.host, self.possible_ports = parse_address(address)
+        self.max_processes = max_processes
+        self.sessions_per_process = sessions_per_process
+        self.server_factory = server_factory
+        self.startup_timeout = startup_timeout
+        self.services = []
+        # URLs of services replaced or given up by the supervisor
+        self._retired = set()
+        self.supervisor = supervisor
+        if supervisor is not None:
+            supervisor.add_listener(self._on_restart)
+        self._starting = 0
+        self._condition = threading.Condition()
+
+    def _free_ports(self):
+        used = set(service.server_thread.port for service in self.services)
+        return [port for port in self.possible_ports if port not in used]
+
+    def _start_service(self, ports):
+        server_thread = start_server_thread(
+            self.server_factory(self.host, ports), self.startup_timeout)
+        if self.supervisor is not None:
+            self.supervisor.watch(server_thread)
+        return _Service(server_thread)
+
+    def _on_restart(self, old, new):
+        """
+        Move the slots of a service restarted by the supervisor to its new
+        URL, or drop them if it was given up. The sessions on the old process
+        are gone, so their slots are freed.
+        """
+        with self._condition:
+            for service in list(self.services):
+                if service.server_thread is not old:
+                    continue
+                self._retired.add(service.url)
+                if new is None:
+                    self.services.remove(service)
+                else:
+                    service.server_thread = new
+                    service.url = new.get_url()
+                    service.sessions = 0
+                    service.generation += 1
+                self._condition.notify_all()
+
+    def acquire(self, timeout=None):
+        """
+        Reserve a session slot and return the URL of the service to use.
+        """
+        return self._acquire(timeout)[2]
+
+    def _acquire(self, timeout):
+        """
+        Reserve a session slot and return its service, the generation of
+        the service and its URL.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                candidates = [service for service in self.services
+                              if service.sessions < self.sessions_per_process]
+                if candidates:
+                    service = min(candidates, key=lambda service: service.sessions)
+                    service.sessions += 1
+                    return service, service.generation, service.url
+                if len(self.services) + self._starting < self.max_processes:
+                    self._starting += 1
+                    ports = self._free_ports()
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout('All service processes are at capacity')
+                self._condition.wait(remaining)
+
+        try:
+            service = self._start_service(ports)
+        finally:
+            with self._condition:
+                self._starting -= 1
+                self._condition.notify_all()
+        with self._condition:
+            service.sessions += 1
+            self.services.append(service)
+            slot = service, service.generation, service.url
+        logger.debug('Started service %s', service.url)
+        return slot
+
+    def release(self, url):
+        with self._condition:
+            for service in self.services:
+                if service.url == url:
+                    service.sessions = max(service.sessions - 1, 0)
+                    self._condition.notify()
+                    return
+            if url in self._retired:
+                # Its sessions died with the old process
+                return
+        raise ValueError('Unknown service %s' % url)
+
+    def _release(self, service, generation):
+        """
+        Release a slot returned by _acquire(), unless its process has been
+        replaced or given up since.
+        """
+        with self._condition:
+            if service.generation == generation and service in self.services:
+                service.sessions = max(service.sessions - 1, 0)
+                self._condition.notify()
+
+    def create_session(self, timeout=None, **options):
+        """
+        Create a ChromiumDriver on the least loaded service. The slot is
+        released when the driver is quit.
+        """
+        from core.webdriver.chromium import ChromiumDriver
+
+        service, generation, url = self._acquire(timeout)
+        try:
+            driver = ChromiumDriver(url, **options)
+        except Exception:
+            self._release(service, generation)
+            raise
+        driver.quit_callbacks.append(lambda driver: self._release(service, generation))
+        return driver
+
+    def close(self):
+        """
+        Terminate every service process.
+        """
+        with self._condition:
+            services, self.services = self.services, []
+            self._condition.notify_all()
+        for service in services:
+            if self.supervisor is not None:
+                self.supervisor.unwatch(service.server_thread)
+            service.server_thread.terminate()
+            service.server_thread.join()
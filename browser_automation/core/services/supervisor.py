@@ -0,0 +1,234 @@
+"""
+Supervision of the service processes.
+
+A ServiceSupervisor checks every `interval` seconds that each watched
+service is healthy:
+
+- its process hasn't exited;
+- it answers GET /status within `heartbeat_timeout`, missing at most
+  `max_missed_heartbeats` checks in a row;
+- its resident memory hasn't grown past `max_rss_growth` times the first
+  sample, nor past `max_rss` bytes.
+
+An unhealthy service is terminated and a new one started in its place, on
+another port from the same list if there's one, so the new service gets a
+new URL. Restarts of a service that keeps failing are
+delayed by `backoff` seconds, doubling up to `max_backoff`, and it's given up
+after `max_restarts` in a row. Each restart or give-up is reported to the
+listeners with the old and new server threads (None when given up), and the
+sessions pooled for the old URL are moved to the new one (see
+pool.rehome()), so the remaining tasks get a fresh session instead of
+failing on the dead one.
+"""
+import logging
+import threading
+import time
+from urllib import request
+
+from core.services.connection import LiveServerThread, start_server_thread
+from core.webdriver.chromium import pool
+
+logger = logging.getLogger(__name__)
+
+
+def process_rss(pid):
+    """
+    Return the resident memory of process `pid` in bytes, or None if it
+    can't be read on this platform.
+    """
+    try:
+        with open('/proc/%d/status' % pid) as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class _Watched(object):
+    """
+    The health of a supervised server thread.
+    """
+    def __init__(self, server_thread):
+        self.server_thread = server_thread
+        # Read now, as terminating a server thread may change its URL
+        self.url = server_thread.get_url()
+        self.started = time.monotonic()
+        self.missed_heartbeats = 0
+        self.rss_baseline = None
+        self.restarts = 0
+        self.restart_at = None
+        self.reason = None
+
+
+class ServiceSupervisor(threading.Thread):
+    """
+    Thread supervising service processes, see the module documentation.
+    New services are created with `server_factory(host, possible_ports)`.
+    """
+    def __init__(self, interval=5.0, heartbeat_timeout=2.0, max_missed_heartbeats=3,
+                 max_rss_growth=3.0, max_rss=None, backoff=1.0, max_backoff=60.0,
+                 max_restarts=5, stable_after=60.0, startup_timeout=10,
+                 server_factory=LiveServerThread):
+        super(ServiceSupervisor, self).__init__()
+        self.daemon = True
+        self.interval = interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_missed_heartbeats = max_missed_heartbeats
+        self.max_rss_growth = max_rss_growth
+        self.max_rss = max_rss
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_restarts = max_restarts
+        self.stable_after = stable_after
+        self.startup_timeout = startup_timeout
+        self.server_factory = server_factory
+        self.listeners = []
+        self._watched = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def watch(self, server_thread):
+        """
+        Supervise a started server thread.
+        """
+        with self._lock:
+            self._watched.append(_Watched(server_thread))
+
+    def unwatch(self, server_thread):
+        with self._lock:
+            self._watched = [watched for watched in self._watched
+                             if watched.server_thread is not server_thread]
+
+    @property
+    def server_threads(self):
+        with self._lock:
+            return [watched.server_thread for watched in self._watched]
+
+    def add_listener(self, callback):
+        """
+        Call `callback(old_thread, new_thread)` after each restart, with a
+        None `new_thread` when a service is given up.
+        """
+        self.listeners.append(callback)
+
+    def diagnose(self, watched):
+        """
+        Return why the service of `watched` is unhealthy, or None.
+        """
+        server_thread = watched.server_thread
+        process = getattr(server_thread, 'process', None)
+        if process is not None:
+            code = process.poll()
+            if code is not None:
+                return 'exited with code %s' % code
+
+        try:
+            url = getattr(server_thread, 'get_http_url', server_thread.get_url)()
+            request.urlopen(url + '/status', timeout=self.heartbeat_timeout).close()
+        except (OSError, ValueError) as e:
+            watched.missed_heartbeats += 1
+            if watched.missed_heartbeats >= self.max_missed_heartbeats:
+                return 'missed %d heartbeats (%s)' % (watched.missed_heartbeats, e)
+        else:
+            watched.missed_heartbeats = 0
+
+        rss = process_rss(process.pid) if process is not None else None
+        if rss is not None:
+            if watched.rss_baseline is None:
+                watched.rss_baseline = rss
+            if self.max_rss and rss > self.max_rss:
+                return 'RSS of %d bytes above %d' % (rss, self.max_rss)
+            if (self.max_rss_growth and
+                    rss > watched.rss_baseline * self.max_rss_growth):
+                return 'RSS grew from %d to %d bytes' % (watched.rss_baseline, rss)
+        return None
+
+    def _backoff(self, restarts):
+        """
+        Seconds to wait before the next restart after `restarts` in a row.
+        """
+        if not restarts:
+            return 0
+        return min(self.backoff * 2 ** (restarts - 1), self.max_backoff)
+
+    def check(self):
+        """
+        Check every watched service once, restarting the unhealthy ones
+        whose backoff has elapsed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            watched_list = list(self._watched)
+        for watched in watched_list:
+            if watched.restart_at is None:
+                reason = self.diagnose(watched)
+                if reason is None:
+                    if watched.restarts and now - watched.started >= self.stable_after:
+                        watched.restarts = 0
+                    continue
+                watched.reason = reason
+                watched.restart_at = now + self._backoff(watched.restarts)
+                logger.warning('Service %s %s', watched.url, reason)
+            if now >= watched.restart_at:
+                self._restart(watched)
+
+    def _restart(self, watched):
+        old = watched.server_thread
+        try:
+            old.terminate()
+        except Exception as e:
+            logger.warning('Error terminating service %s: %s', watched.url, e)
+
+        if watched.restarts >= self.max_restarts:
+            logger.error('Giving up service %s after %d restarts: %s',
+                         watched.url, watched.restarts, watched.reason)
+            self.unwatch(old)
+            self._notify(watched.url, old, None)
+            return
+
+        watched.restarts += 1
+        # Sessions of the old process may still be released by URL
+        ports = [port for port in old.possible_ports if port != old.port]
+        try:
+            new = start_server_thread(
+                self.server_factory(old.host, ports or old.possible_ports),
+                self.startup_timeout)
+        except Exception as e:
+            watched.restart_at = time.monotonic() + self._backoff(watched.restarts)
+            logger.warning('Restart %d of service %s failed: %s',
+                           watched.restarts, watched.url, e)
+            return
+
+        logger.warning('Service %s restarted on %s (%s)',
+                       watched.url, new.get_url(), watched.reason)
+        old_url = watched.url
+        with self._lock:
+            watched.server_thread = new
+            watched.url = new.get_url()
+            watched.started = time.monotonic()
+            watched.missed_heartbeats = 0
+            watched.rss_baseline = None
+            watched.restart_at = None
+        self._notify(old_url, old, new)
+
+    def _notify(self, old_url, old, new):
+        pool.rehome(old_url, new.get_url() if new is not None else None)
+        for callback in self.listeners:
+            try:
+                callback(old, new)
+            except Exception:
+                logger.exception('Error notifying the restart of %s', old_url)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception('Error supervising services')
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
@@ -3,8 +3,12 @@ import unittest
 import logging
 import sys
 
-from core.test.suites import ParallelTestSuite
+from core.test.suites import (
+    NetworkProfileSuite, ParallelTestSuite, format_network_matrix)
+from core.webdriver.chromium import pool
+from core.webdriver.chromium.instrumentation import metrics
 from conf import config
+from conf.watcher import ConfigWatcher
 from core.test.helpers import \
     (reorder_suite, filter_tests_by_tags, default_test_processes)
 
@@ -21,7 +25,8 @@ class Builder(object):
 
     def __init__(self, pattern=None, top_level=None, verbosity=1,
                 failfast=False, reverse=False, parallel=0,
-                tags=None, exclude_tags=None, test_runner=None, **kwargs):
+                tags=None, exclude_tags=None, test_runner=None,
+                network_profiles=None, **kwargs):
 
         self.pattern = pattern or "do_*.py"
         self.top_level = top_level
@@ -33,6 +38,7 @@ class Builder(object):
         self.exclude_tags = set(exclude_tags or [])
         if test_runner:
             self.test_runner = test_runner
+        self.network_profiles = list(network_profiles or [])
 
     @classmethod
     def add_arguments(cls, parser):
@@ -61,11 +67,26 @@ class Builder(object):
             '--exclude-tag', action='append', dest='exclude_tags',
             help='Do not run tests with the specified tag. Can be used multiple times.',
         )
+        parser.add_argument(
+            '--network-profile', action='append', dest='network_profiles',
+            help='Run the tasks once under each network profile (from '
+                 'NETWORK_PROFILES) and tabulate their timings. Can be used '
+                 'multiple times; tasks run sequentially in this mode.',
+        )
 
     def setup_test_environment(self):
         unittest.installHandler()
+        self.config_watcher = None
+        if config.get('config_watch', False):
+            self.config_watcher = ConfigWatcher(config)
+            self.config_watcher.start()
 
     def teardown_test_environment(self, **kwargs):
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+            self.config_watcher = None
+        # Sessions the tasks left in the shared pools
+        pool.close_all()
         unittest.removeHandler()
 
     def build_suite(self, test_labels=None, extra_tests=None, **kwargs):
@@ -115,6 +136,26 @@ class Builder(object):
 
         return suite
 
+    def build_network_matrix(self, test_labels=None, extra_tests=None, **kwargs):
+        """
+        Return a NetworkProfileSuite per network profile, each one with a
+        fresh copy of the suite. Tasks run in this process so their timings
+        are comparable.
+        """
+        parallel, self.parallel = self.parallel, 0
+        try:
+            return [
+                NetworkProfileSuite(self.build_suite(test_labels, extra_tests, **kwargs), profile)
+                for profile in self.network_profiles
+            ]
+        finally:
+            self.parallel = parallel
+
+    def report_network_matrix(self, suites):
+        table = format_network_matrix(suites)
+        logger.info('Timings by network profile:\n%s', table)
+        print('\n' + table, file=sys.stderr)
+
     def run_suite(self, suite, **kwargs):
         result = None
         report_file = os.path.join(config['base_dir'], 'logs', 'html', 'report.html')
@@ -132,6 +173,19 @@ class Builder(object):
     def suite_result(self, suite, result, **kwargs):
         return suite, result
 
+    def dump_metrics(self):
+        """
+        Write the webdriver command metrics collected during the run to the
+        file named by the WEBDRIVER_METRICS_FILE setting, if any.
+        """
+        filename = config.get('webdriver_metrics_file', None)
+        if not filename:
+            return
+        try:
+            metrics.dump(filename)
+        except EnvironmentError:
+            logger.error("Unable to write metrics to {0}".format(filename))
+
     def run_tests(self, test_labels, extra_tests=None, **kwargs):
         """
         Run the unit tasks for all the test labels in the provided list.
@@ -145,8 +199,15 @@ class Builder(object):
         Returns the number of tasks that failed.
         """
         self.setup_test_environment()
-        suite = self.build_suite(test_labels, extra_tests)
-        result = self.run_suite(suite)
+        if self.network_profiles:
+            matrix = self.build_network_matrix(test_labels, extra_tests)
+            suite = self.test_suite(matrix)
+            result = self.run_suite(suite)
+            self.report_network_matrix(matrix)
+        else:
+            suite = self.build_suite(test_labels, extra_tests)
+            result = self.run_suite(suite)
+        self.dump_metrics()
         self.teardown_test_environment()
         return self.suite_result(suite, result)
 
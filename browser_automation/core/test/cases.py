@@ -3,7 +3,7 @@ import os
 import unittest
 
 from conf import config
-from core.services.connection import LiveServerThread
+from core.services.connection import LiveServerThread, parse_address
 from utils.decorators import classproperty
 
 
@@ -32,20 +32,8 @@ class LiveServerTestCase(unittest.TestCase):
         # The specified ports may be of the form '8000-8010,8080,9200-9300'
         # i.e. a comma-separated list of ports or ranges of ports, so we break
         # it down into a detailed list of all possible ports.
-        possible_ports = []
         try:
-            host, port_ranges = specified_address.split(':')
-            for port_range in port_ranges.split(','):
-                # A port range can be of either form: '8000' or '8000-8010'.
-                extremes = list(map(int, port_range.split('-')))
-                assert len(extremes) in [1, 2]
-                if len(extremes) == 1:
-                    # Port range of the form '8000'
-                    possible_ports.append(extremes[0])
-                else:
-                    # Port range of the form '8000-8010'
-                    for port in range(extremes[0], extremes[1] + 1):
-                        possible_ports.append(port)
+            host, possible_ports = parse_address(specified_address)
         except Exception:
             msg = 'Invalid address ("%s") for live server.' % specified_address
             print(msg)
@@ -135,6 +135,77 @@ class TestContextDecorator(object):
         raise TypeError('Cannot decorate object of type %s' % type(decorated))
 
 
+class throttle_network(TestContextDecorator):
+    """
+    Throttle the network of a ChromiumDriver with a profile from
+    NETWORK_PROFILES while a task runs, and restore it afterwards.
+
+    As a decorator the driver is read from the `driver_attr` attribute of the
+    task once its setUp() has run; as a context manager it's passed in:
+
+        @throttle_network('3g')
+        class CheckoutTest(unittest.TestCase):
+            ...
+
+        with throttle_network('cable', driver=driver):
+            ...
+    """
+    def __init__(self, profile, driver=None, driver_attr='driver'):
+        super(throttle_network, self).__init__()
+        self.profile = profile
+        self.driver = driver
+        self.driver_attr = driver_attr
+        # The profiles active before each enable(), restored by disable()
+        self._previous = []
+
+    def enable(self):
+        previous = self.driver.network_profile
+        self.driver.apply_network_profile(self.profile)
+        self._previous.append(previous)
+        return self.driver
+
+    def disable(self):
+        previous = self._previous.pop()
+        if previous is None:
+            self.driver.delete_network_conditions()
+        else:
+            self.driver.apply_network_profile(previous)
+
+    def decorate_class(self, cls):
+        if not issubclass(cls, unittest.TestCase):
+            raise TypeError('Can only decorate subclasses of unittest.TestCase')
+        decorated_setUp = cls.setUp
+        decorated_tearDown = cls.tearDown
+
+        def setUp(inner_self):
+            decorated_setUp(inner_self)
+            try:
+                self.driver = getattr(inner_self, self.driver_attr)
+                self.enable()
+            except Exception:
+                # unittest doesn't call tearDown() when setUp() fails
+                decorated_tearDown(inner_self)
+                raise
+
+        def tearDown(inner_self):
+            try:
+                self.disable()
+            finally:
+                decorated_tearDown(inner_self)
+
+        cls.setUp = setUp
+        cls.tearDown = tearDown
+        return cls
+
+    def decorate_callable(self, func):
+        @functools.wraps(func)
+        def inner(test, *args, **kwargs):
+            self.driver = getattr(test, self.driver_attr)
+            with self:
+                return func(test, *args, **kwargs)
+        return inner
+
+
 
 
 
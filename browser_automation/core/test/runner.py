@@ -8,6 +8,8 @@ from xml.sax import saxutils
 from conf import config
 from utils.version import get_version
 from utils.stream import stdout_redirector, stderr_redirector
+from core.webdriver.chromium import deadline
+from core.webdriver.chromium import har
 from misc.template import (DEFAULT_TITLE, DEFAULT_DESCRIPTION,
     ENDING_TEMPLATE, HEADING_ATTRIBUTE_TEMPLATE, HEADING_TEMPLATE,
     HTML_TEMPLATE, REPORT_CLASS_TEMPLATE, REPORT_TEMPLATE,
@@ -37,9 +39,18 @@ class _TestResult(unittest.TestResult):
         #   stack trace,
         # )
         self.result = []
+        # (TestCase object, deadline.Overrun) of the commands that overran
+        # their deadline
+        self.overruns = []
+        # (TestCase object, [har.PageSummary]) of the HAR files saved
+        self.har_summaries = []
+        self.current_test = None
 
     def startTest(self, test, *args):
         super().startTest(test)
+        self.current_test = test
+        deadline.pop_overruns()
+        har.pop_summaries()
         # just one buffer for both stdout and stderr
         self.outputBuffer = StringIO()
         stdout_redirector.fp = self.outputBuffer
@@ -55,6 +66,13 @@ class _TestResult(unittest.TestResult):
         Safe to call multiple times.
         """
         if self.stdout0:
+            for overrun in deadline.pop_overruns():
+                self.overruns.append((self.current_test, overrun))
+                self.outputBuffer.write('Deadline overrun: %s\n' % overrun)
+            summaries = har.pop_summaries()
+            if summaries:
+                self.har_summaries.append((self.current_test, summaries))
+                self.outputBuffer.write('Page timings:\n%s\n' % har.format_summaries(summaries))
             sys.stdout = self.stdout0
             sys.stderr = self.stderr0
             self.stdout0 = None
@@ -157,11 +175,17 @@ class HTMLTestRunner(object):
             status = ' '.join(status)
         else:
             status = 'none'
-        return [
+        attributes = [
             ('Start Time', startTime),
             ('Duration', duration),
             ('Status', status),
         ]
+        if result.overruns:
+            attributes.append(('Deadline overruns', str(len(result.overruns))))
+        if result.har_summaries:
+            pages = sum(len(summaries) for _, summaries in result.har_summaries)
+            attributes.append(('HAR pages', str(pages)))
+        return attributes
 
     def generate_report(self, test, result):
         report_attrs = self.get_report_attributes(result)
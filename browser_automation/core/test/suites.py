@@ -1,6 +1,7 @@
 import ctypes
 import logging
 import multiprocessing
+import time
 import unittest
 import itertools
 
@@ -9,8 +10,14 @@ try:
 except ImportError:
     tblib = None
 
+from conf import config
+from core.webdriver.chromium import network
+
 logger = logging.getLogger(__name__)
 
+# Set by _init_worker() in each process of the pool
+_worker_id = 0
+
 
 def partition_suite_by_case(suite):
     """
@@ -26,6 +33,20 @@ def partition_suite_by_case(suite):
                 groups.extend(partition_suite_by_case(item))
     return groups
 
+def _init_worker(counter, snapshot=None):
+    """
+    Switch to the config snapshot built by the parent process, so workers
+    read settings from a read-only copy instead of setting them up again.
+    """
+    global _worker_id
+
+    with counter.get_lock():
+        counter.value += 1
+        _worker_id = counter.value
+
+    if snapshot is not None:
+        config.use_snapshot(snapshot)
+
 class ParallelTestSuite(unittest.TestSuite):
     """
     Run a series of tests in parallel in several processes.
@@ -42,6 +63,8 @@ class ParallelTestSuite(unittest.TestSuite):
     that they have been run in parallel.
     """
 
+    init_worker = _init_worker
+
     def __init__(self, suite, processes, failfast=False):
         self.subsuites = partition_suite_by_case(suite)
         self.processes = processes
@@ -66,11 +89,14 @@ class ParallelTestSuite(unittest.TestSuite):
         if tblib is not None:
             tblib.pickling_support.install()
 
+        # Serialize the settings once; every worker loads the same blob.
+        snapshot = config.snapshot().dumps() if config.configured else None
+
         counter = multiprocessing.Value(ctypes.c_int, 0)
         pool = multiprocessing.Pool(
             processes=self.processes,
             initializer=self.init_worker.__func__,
-            initargs=[counter])
+            initargs=[counter, snapshot])
         args = [
             (index, subsuite, self.failfast)
             for index, subsuite in enumerate(self.subsuites)
@@ -103,3 +129,74 @@ class ParallelTestSuite(unittest.TestSuite):
         pool.join()
 
         return result
+
+
+class _TimingResult(object):
+    """
+    Proxy of a TestResult that also records how long each test takes.
+    """
+    def __init__(self, result, timings):
+        object.__setattr__(self, '_result', result)
+        object.__setattr__(self, '_timings', timings)
+        object.__setattr__(self, '_started', {})
+
+    def __getattr__(self, name):
+        return getattr(self._result, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._result, name, value)
+
+    def startTest(self, test):
+        self._started[test.id()] = time.perf_counter()
+        self._result.startTest(test)
+
+    def stopTest(self, test):
+        self._result.stopTest(test)
+        started = self._started.pop(test.id(), None)
+        if started is not None:
+            self._timings[test.id()] = time.perf_counter() - started
+
+
+class NetworkProfileSuite(unittest.TestSuite):
+    """
+    Run a suite with a network profile active, so every ChromiumDriver
+    session created by its tasks is throttled with it. The duration of each
+    test, in seconds, is stored in `timings` by test id.
+
+    Class and module fixtures are torn down before the profile is
+    deactivated, so the sessions they create are set up again, under its
+    own profile, by the suite of the next profile.
+    """
+    def __init__(self, suite, profile):
+        super(NetworkProfileSuite, self).__init__([suite])
+        self.profile = profile
+        self.timings = {}
+
+    def run(self, result, debug=False):
+        with network.activate(self.profile):
+            super(NetworkProfileSuite, self).run(
+                _TimingResult(result, self.timings), debug)
+            self._tearDownPreviousClass(None, result)
+            self._handleModuleTearDown(result)
+            result._previousTestClass = None
+        return result
+
+
+def format_network_matrix(suites):
+    """
+    Return a text table with the duration of each test, in seconds, under
+    the profile of each NetworkProfileSuite.
+    """
+    test_ids = []
+    for suite in suites:
+        test_ids.extend(test_id for test_id in suite.timings if test_id not in test_ids)
+    width = max([len(test_id) for test_id in test_ids] + [4])
+    header = '%-*s' % (width, 'test') + ''.join(
+        ' %10s' % suite.profile for suite in suites)
+    lines = [header]
+    for test_id in test_ids:
+        cells = ''.join(
+            ' %10s' % ('%.3f' % suite.timings[test_id] if test_id in suite.timings else '-')
+            for suite in suites)
+        lines.append('%-*s%s' % (width, test_id, cells))
+    return '\n'.join(lines)
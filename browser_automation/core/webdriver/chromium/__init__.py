@@ -1,19 +1,50 @@
-import platform
-import sys
+import contextlib
+import logging
+import os
+import weakref
 
+from core.webdriver.chromium import capabilities as capabilities_cache
 from core.webdriver.chromium import constants as command
 from core.webdriver.chromium.controller import Controller
+from core.webdriver.chromium import deadline
+from core.webdriver.chromium import forms
+from core.webdriver.chromium import instrumentation
+from core.webdriver.chromium import keys
+from core.webdriver.chromium import network
+from core.webdriver.chromium.options import ChromeOptions
+from core.webdriver.chromium import streaming
 from core.webdriver.chromium.webelement import WebElement
 from core.webdriver.exceptions import (
-    UnknownError, exception_for_legacy_response, exception_for_standard_response)
+    DeadlineExceeded, FormFillError, NoSuchFrame, NoSuchWindow, UnknownError,
+    exception_for_legacy_response, exception_for_standard_response)
+
+logger = logging.getLogger(__name__)
 
 ELEMENT_KEY_W3C = "element-6066-11e4-a52e-4f735466cecf"
 ELEMENT_KEY = "ELEMENT"
 
+# Commands that don't change the page, so they keep the element cache.
+# Every other non-GET command may change the DOM and clears it.
+LOOKUP_COMMANDS = frozenset([
+    command.FIND_ELEMENT, command.FIND_ELEMENTS,
+    command.FIND_CHILD_ELEMENT, command.FIND_CHILD_ELEMENTS,
+    command.GET_ACTIVE_ELEMENT, command.GET_LOG,
+])
+
+# Server side timeouts of a new session, in milliseconds, by type
+DEFAULT_TIMEOUTS = {
+    'page load': 300000,
+    'script': 30000,
+    'implicit': 0,
+}
+
 
 class ChromiumDriver(object):
     """
     Starts and controls a single Chrome instance on this machine.
+
+    The session is created with `options`, a ChromeOptions object, or with
+    one built from the Chrome specific arguments.
     """
 
     def __init__(self, server_url, chrome_binary=None, android_package=None,
@@ -24,98 +55,41 @@ class ChromiumDriver(object):
                  mobile_emulation=None, experimental_options=None,
                  download_dir=None, network_connection=None,
                  send_w3c_capability=None, send_w3c_request=None,
-                 page_load_strategy=None, unexpected_alert_behaviour=None):
-        self._executor = Controller(server_url)
-
-        options = {}
-
-        if experimental_options:
-            assert isinstance(experimental_options, dict)
-            options = experimental_options.copy()
-
-        if android_package:
-            options['androidPackage'] = android_package
-            if android_activity:
-                options['androidActivity'] = android_activity
-            if android_process:
-                options['androidProcess'] = android_process
-            if android_use_running_app:
-                options['androidUseRunningApp'] = android_use_running_app
-        elif chrome_binary:
-            options['binary'] = chrome_binary
-
-        # TODO(samuong): speculative fix for crbug.com/611886
-        if (sys.platform.startswith('linux') and
-                    platform.architecture()[0] == '32bit'):
-            if chrome_switches is None:
-                chrome_switches = []
-            chrome_switches.append('no-sandbox')
-
-        if chrome_switches:
-            assert type(chrome_switches) is list
-            options['args'] = chrome_switches
-
-        if mobile_emulation:
-            assert type(mobile_emulation) is dict
-            options['mobileEmulation'] = mobile_emulation
-
-        if chrome_extensions:
-            assert type(chrome_extensions) is list
-            options['extensions'] = chrome_extensions
-
-        if chrome_log_path:
-            assert type(chrome_log_path) is str
-            options['logPath'] = chrome_log_path
-
-        if debugger_address:
-            assert type(debugger_address) is str
-            options['debuggerAddress'] = debugger_address
-
-        if logging_prefs:
-            assert type(logging_prefs) is dict
-            log_types = ['client', 'driver', 'browser', 'server', 'performance']
-            log_levels = ['ALL', 'DEBUG', 'INFO', 'WARNING', 'SEVERE', 'OFF']
-            for log_type, log_level in logging_prefs.iteritems():
-                assert log_type in log_types
-                assert log_level in log_levels
-        else:
-            logging_prefs = {}
-
-        download_prefs = {}
-        if download_dir:
-            if 'prefs' not in options:
-                options['prefs'] = {}
-            if 'download' not in options['prefs']:
-                options['prefs']['download'] = {}
-            options['prefs']['download']['default_directory'] = download_dir
-
-        if send_w3c_capability:
-            options['w3c'] = send_w3c_capability
-
-        params = {
-            'desiredCapabilities': {
-                'chromeOptions': options,
-                'loggingPrefs': logging_prefs
-            }
-        }
-
-        if page_load_strategy:
-            assert type(page_load_strategy) is str
-            params['desiredCapabilities']['pageLoadStrategy'] = page_load_strategy
-
-        if unexpected_alert_behaviour:
-            assert type(unexpected_alert_behaviour) is str
-            params['desiredCapabilities']['unexpectedAlertBehaviour'] = (
-                unexpected_alert_behaviour)
-
-        if network_connection:
-            params['desiredCapabilities']['networkConnectionEnabled'] = (
-                network_connection)
-
-        if send_w3c_request:
-            params = {'capabilities': params}
-
-        response = self._execute_command(command.NEW_SESSION, params)
+                 page_load_strategy=None, unexpected_alert_behaviour=None,
+                 metrics=None, executor=None, element_cache=False, options=None):
+        self.server_url = server_url
+        self._executor = executor or Controller(server_url)
+        self.metrics = metrics or instrumentation.metrics
+        # Called with the driver once its session has been quit
+        self.quit_callbacks = []
+        self._log_collectors = []
+        # Elements found on the current page, by locator. Off by default, as
+        # only commands clear it: lookups polling for changes made by the
+        # page itself (timers, XHR) would never see them.
+        self.element_cache = element_cache
+        self._element_cache = {}
+        self._page_url = None
+        # Live WebElement objects of this session, by element id
+        self._elements = weakref.WeakValueDictionary()
+        # Client side view of the current browsing context: the window handle
+        # and the frames entered from its top level document. None means
+        # unknown, so the next switch is always sent.
+        self._window_handle = None
+        self._frame_path = []
+        self._timeouts = dict(DEFAULT_TIMEOUTS)
+
+        if options is None:
+            options = ChromeOptions(
+                chrome_binary, android_package, android_activity,
+                android_process, android_use_running_app, chrome_switches,
+                chrome_extensions, chrome_log_path, debugger_address,
+                logging_prefs, mobile_emulation, experimental_options,
+                download_dir, network_connection, send_w3c_capability,
+                send_w3c_request, page_load_strategy, unexpected_alert_behaviour)
+        self.options = options
+
+        with self.metrics.span(command.NEW_SESSION) as span:
+            response = self._execute_command(command.NEW_SESSION, options.body, span)
         if isinstance(response['status'], str):
             self.w3c_compliant = True
         elif isinstance(response['status'], int):
@@ -124,8 +98,50 @@ class ChromiumDriver(object):
             raise UnknownError("unexpected response")
 
         self._session_id = response['sessionId']
-        self.capabilities = self._unwrap_value(response['value'])
 
+        # Capabilities are parsed on first access, or taken from the cache
+        # if a session with the same versions and options has been seen.
+        # The raw response is only kept when it isn't cached yet.
+        self._capabilities = None
+        self._capabilities_key = capabilities_cache.cache_key(
+            response['value'], options.digest)
+        self._session_fields = capabilities_cache.session_fields(response['value'])
+        if (self._capabilities_key is not None and
+                self._capabilities_key in capabilities_cache.cache):
+            self._raw_capabilities = None
+        else:
+            self._raw_capabilities = response['value']
+
+        # Throttle the session if it's created within network.activate()
+        self.network_profile = None
+        if network.active_profile() is not None:
+            self.apply_network_profile(network.active_profile())
+
+
+    @property
+    def capabilities(self):
+        if self._capabilities is None:
+            self._capabilities = self._load_capabilities()
+        return self._capabilities
+
+    def _load_capabilities(self):
+        key = self._capabilities_key
+        if key is not None:
+            cached = capabilities_cache.cache.get(key)
+            if cached is not None:
+                self._raw_capabilities = None
+                return capabilities_cache.with_session_fields(cached, self._session_fields)
+
+        raw, self._raw_capabilities = self._raw_capabilities, None
+        if raw is None:
+            # Evicted from the cache since the session was created
+            raw = self._execute_command(
+                command.GET_SESSION_CAPABILITIES, {'sessionId': self._session_id})['value']
+        parsed = self._unwrap_value(raw)
+        if key is not None:
+            capabilities_cache.cache.set(
+                key, capabilities_cache.without_session_fields(parsed))
+        return parsed
 
     def _wrap_value(self, value):
         """
@@ -152,10 +168,10 @@ class ChromiumDriver(object):
                 and ELEMENT_KEY_W3C in value
                 and isinstance(
                     value[ELEMENT_KEY_W3C], str)):
-                return WebElement(self, value[ELEMENT_KEY_W3C])
+                return self._element(value[ELEMENT_KEY_W3C])
             elif (len(value) == 1 and ELEMENT_KEY in value
                   and isinstance(value[ELEMENT_KEY], str)):
-                return WebElement(self, value[ELEMENT_KEY])
+                return self._element(value[ELEMENT_KEY])
             else:
                 unwraped = {}
                 for key, val in value.items():
@@ -166,35 +182,105 @@ class ChromiumDriver(object):
         else:
             return value
 
-    def _execute_command(self, command, params={}):
-        params = self._wrap_value(params)
-        response = self._executor.execute(command, params)
+    def _element(self, id_):
+        """
+        Return the WebElement for `id_`, reusing the live one if any.
+        """
+        element = self._elements.get(id_)
+        if element is None:
+            element = WebElement(self, id_)
+            self._elements[id_] = element
+        return element
+
+    def _rebind_element(self, element, id_):
+        """
+        Give `element` a new id, e.g. once it has been found again after
+        going stale, so later references to `id_` return it.
+        """
+        if self._elements.get(element._id) is element:
+            del self._elements[element._id]
+        element._id = id_
+        self._elements[id_] = element
+
+    def _execute_command(self, command, params={}, span=instrumentation.NULL_SPAN):
+        with span.phase('serialize'):
+            params = self._wrap_value(params)
+        response = self._executor.execute(command, params, span)
+        self._check_response(response)
+        return response
+
+    def _check_response(self, response):
         if ('status' in response and isinstance(response['status'], int) and
                     response['status'] != 0):
             raise exception_for_legacy_response(response)
         elif 'error' in response:
             raise exception_for_standard_response(response)
-        return response
 
-    def execute_command(self, command, params={}):
+    def execute_command(self, command, params={}, timeout=None):
+        """
+        Execute `command`, failing with DeadlineExceeded if it doesn't
+        complete within `timeout` seconds or the current deadline scope.
+        """
+        if timeout is not None:
+            with deadline.scope(timeout):
+                return self.execute_command(command, params)
+        if (self._element_cache and command[0] != 'GET' and
+                command not in LOOKUP_COMMANDS):
+            self._element_cache.clear()
         params['sessionId'] = self._session_id
-        response = self._execute_command(command, params)
-        return self._unwrap_value(response['value'])
+        with self.metrics.span(command) as span:
+            try:
+                response = self._execute_command(command, params, span)
+            except (NoSuchFrame, NoSuchWindow):
+                self._reset_context()
+                raise
+            with span.phase('deserialize'):
+                return self._unwrap_value(response['value'])
+
+    def _reset_context(self, window=True):
+        """
+        Forget the tracked frame, and the window unless `window` is False.
+        """
+        if window:
+            self._window_handle = None
+        self._frame_path = None
+
+    @staticmethod
+    def _frame_key(frame):
+        if isinstance(frame, WebElement):
+            return (WebElement, frame._id)
+        return frame
 
     def get_window_handles(self):
         return self.execute_command(command.GET_WINDOW_HANDLES)
 
     def switch_to_window(self, handle_or_name):
+        if (handle_or_name == self._window_handle and
+                self._frame_path is not None):
+            # chromedriver moves to the top level frame on every window
+            # switch, so only skip the request when that's where we are.
+            if not self._frame_path:
+                return
+            self.switch_to_main_frame()
+            return
+        self._reset_context()
         self.execute_command(command.SWITCH_TO_WINDOW, {'name': handle_or_name})
+        self._window_handle = handle_or_name
+        self._frame_path = []
 
     def get_current_window_handle(self):
-        return self.execute_command(command.GET_CURRENT_WINDOW_HANDLE)
+        handle = self.execute_command(command.GET_CURRENT_WINDOW_HANDLE)
+        self._window_handle = handle
+        return handle
 
     def close_window(self):
+        self._reset_context()
         self.execute_command(command.CLOSE)
 
     def load(self, url):
+        self._reset_context(window=False)
         self.execute_command(command.GET, {'url': url})
+        self._page_url = url
 
     def launch_app(self, app_id):
         self.execute_command(command.LAUNCH_APP, {'id': app_id})
@@ -210,8 +296,39 @@ class ChromiumDriver(object):
             command.EXECUTE_ASYNC_SCRIPT,
             {'script': script, 'args': converted_args})
 
+    def fill_form(self, mapping, root=None, raise_errors=True):
+        """
+        Set the values of many form fields in a single script, firing their
+        input and change events (see forms.FILL_FORM_SCRIPT). `mapping` maps
+        each field, a name, (strategy, target) or WebElement, to its value;
+        fields are searched inside the `root` element if given.
+
+        Raise FormFillError for the fields that couldn't be filled, the rest
+        being filled anyway, or return them when `raise_errors` is False.
+        """
+        field_keys, fields = forms.fill_form_args(mapping)
+        if not fields:
+            return {}
+        result = self.execute_script(forms.FILL_FORM_SCRIPT, root, fields)
+        errors = forms.field_errors(field_keys, result)
+        if errors and raise_errors:
+            raise FormFillError(errors)
+        return errors
+
     def switch_to_frame(self, id_or_name):
+        """
+        Switch to a child frame of the current one, or to the top level
+        frame if `id_or_name` is None.
+        """
+        if id_or_name is None and self._frame_path == []:
+            return
+        path = self._frame_path
+        self._reset_context(window=False)
         self.execute_command(command.SWITCH_TO_FRAME, {'id': id_or_name})
+        if id_or_name is None:
+            self._frame_path = []
+        elif path is not None:
+            self._frame_path = path + [self._frame_key(id_or_name)]
 
     def switch_to_frame_by_index(self, index):
         self.switch_to_frame(index)
@@ -220,7 +337,40 @@ class ChromiumDriver(object):
         self.switch_to_frame(None)
 
     def switch_to_parent_frame(self):
+        if self._frame_path == []:
+            return
+        path = self._frame_path
+        self._reset_context(window=False)
         self.execute_command(command.SWITCH_TO_PARENT_FRAME)
+        if path is not None:
+            self._frame_path = path[:-1]
+
+    def switch_to_frame_path(self, *frames):
+        """
+        Switch to the frame reached by entering each of `frames` in turn from
+        the top level frame. Only the switches needed from the current frame
+        are sent: none if it's already there, and going up to the deepest
+        common frame instead of the top level when that's shorter.
+        """
+        frame_keys = [self._frame_key(frame) for frame in frames]
+        current = self._frame_path
+        if current is None:
+            common = 0
+            self.switch_to_main_frame()
+        else:
+            common = 0
+            while (common < min(len(current), len(frame_keys)) and
+                   current[common] == frame_keys[common]):
+                common += 1
+            ups = len(current) - common
+            if ups > common + 1:
+                common = 0
+                self.switch_to_main_frame()
+            else:
+                for _ in range(ups):
+                    self.switch_to_parent_frame()
+        for frame in frames[common:]:
+            self.switch_to_frame(frame)
 
     def get_sessions(self):
         return self.execute_command(command.GET_SESSIONS)
@@ -231,28 +381,138 @@ class ChromiumDriver(object):
     def get_page_source(self):
         return self.execute_command(command.GET_PAGE_SOURCE)
 
+    def get_screenshot(self):
+        """
+        Return a PNG screenshot of the current window, base64 encoded.
+        """
+        return self.execute_command(command.SCREENSHOT)
+
+    def _stream_command(self, command, sink, params=None):
+        """
+        Execute `command` passing its string value to `sink` in pieces. Falls
+        back to a regular command if the executor can't stream.
+        """
+        params = dict(params or {}, sessionId=self._session_id)
+        execute_stream = getattr(self._executor, 'execute_stream', None)
+        with self.metrics.span(command) as span:
+            if execute_stream is None:
+                value = self._execute_command(command, params, span)['value']
+                if isinstance(value, str):
+                    sink(value)
+                return
+            with span.phase('serialize'):
+                params = self._wrap_value(params)
+            self._check_response(execute_stream(command, params, sink, span))
+
+    def _save_value(self, command, path, sink_factory, compress):
+        file = streaming.open_output(path, compress)
+        try:
+            with file:
+                sink = sink_factory(file)
+                self._stream_command(command, sink)
+                sink.close()
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    def save_screenshot(self, path, compress=None):
+        """
+        Write a PNG screenshot of the current window to `path`, decoding it
+        as it's received. See streaming.open_output() for `compress`.
+        """
+        return self._save_value(
+            command.SCREENSHOT, path, streaming.Base64Sink, compress)
+
+    def save_page_source(self, path, compress=None, encoding='utf-8'):
+        """
+        Write the source of the current page to `path` as it's received.
+        """
+        return self._save_value(
+            command.GET_PAGE_SOURCE, path,
+            lambda file: streaming.TextSink(file, encoding), compress)
+
+    def _lookup(self, parent, strategy, target, many=False):
+        """
+        Find elements from `parent` (the driver or a WebElement), remembering
+        the locator in each element so it can be found again when it goes
+        stale. With `element_cache`, lookups repeated on an unchanged page are
+        answered from the cache.
+        """
+        key = (self._page_url, None if parent is self else parent._id,
+               strategy, target, many)
+        if self.element_cache and key in self._element_cache:
+            cached = self._element_cache[key]
+            return list(cached) if many else cached
+
+        params = {'using': strategy, 'value': target}
+        if parent is self:
+            cmd = command.FIND_ELEMENTS if many else command.FIND_ELEMENT
+            result = self.execute_command(cmd, params)
+        else:
+            cmd = command.FIND_CHILD_ELEMENTS if many else command.FIND_CHILD_ELEMENT
+            result = parent._execute(cmd, params)
+
+        if many:
+            for index, element in enumerate(result):
+                element._locator = (parent, strategy, target, index)
+        else:
+            result._locator = (parent, strategy, target, None)
+        if self.element_cache:
+            self._element_cache[key] = list(result) if many else result
+        return result
+
     def find_element(self, strategy, target):
-        return self.execute_command(
-            command.FIND_ELEMENT, {'using': strategy, 'value': target})
+        return self._lookup(self, strategy, target)
 
     def find_elements(self, strategy, target):
-        return self.execute_command(
-            command.FIND_ELEMENTS, {'using': strategy, 'value': target})
+        return self._lookup(self, strategy, target, many=True)
 
     def set_timeout(self, type, timeout):
-        return self.execute_command(
+        result = self.execute_command(
             command.SET_TIMEOUT, {'type' : type, 'ms': timeout})
+        self._timeouts[type] = timeout
+        return result
+
+    @contextlib.contextmanager
+    def deadline(self, seconds):
+        """
+        Run the block in a deadline scope of `seconds` (see
+        deadline.scope()), lowering the page load, script and implicit wait
+        timeouts of the server so it doesn't keep waiting past the deadline
+        either. They're restored when the block ends.
+        """
+        lowered = {}
+        try:
+            with deadline.scope(seconds) as current:
+                ms = max(int(current.remaining() * 1000), 0)
+                for type, value in sorted(self._timeouts.items()):
+                    if value > ms:
+                        self.set_timeout(type, ms)
+                        lowered[type] = value
+                yield current
+        finally:
+            try:
+                for type, value in lowered.items():
+                    self.set_timeout(type, value)
+            except DeadlineExceeded as e:
+                # An enclosing deadline expired too; the lowered timeouts
+                # are still tracked, so the next scope starts from them
+                logger.warning('Could not restore the server timeouts: %s', e)
 
     def get_current_url(self):
         return self.execute_command(command.GET_CURRENT_URL)
 
     def go_back(self):
+        self._reset_context(window=False)
         return self.execute_command(command.GO_BACK)
 
     def go_forward(self):
+        self._reset_context(window=False)
         return self.execute_command(command.GO_FORWARD)
 
     def refresh(self):
+        self._reset_context(window=False)
         return self.execute_command(command.REFRESH)
 
     def mouse_move_to(self, element=None, x_offset=None, y_offset=None):
@@ -315,6 +575,12 @@ class ChromiumDriver(object):
     def delete_all_cookies(self):
         self.execute_command(command.DELETE_ALL_COOKIES)
 
+    def clear_local_storage(self):
+        self.execute_command(command.CLEAR_LOCAL_STORAGE)
+
+    def clear_session_storage(self):
+        self.execute_command(command.CLEAR_SESSION_STORAGE)
+
     def is_alert_open(self):
         return self.execute_command(command.GET_ALERT)
 
@@ -359,11 +625,35 @@ class ChromiumDriver(object):
         """
         Quits the browser and ends the session.
         """
-        self.execute_command(command.QUIT)
+        for collector in self._log_collectors:
+            collector.stop()
+        try:
+            self.execute_command(command.QUIT)
+        finally:
+            try:
+                for callback in self.quit_callbacks:
+                    callback(self)
+            finally:
+                # A RecordingController only writes a complete log once closed
+                close = getattr(self._executor, 'close', None)
+                if close is not None:
+                    close()
 
     def get_log(self, type):
         return self.execute_command(command.GET_LOG, {'type': type})
 
+    def collect_logs(self, types=('browser',), **options):
+        """
+        Start a LogCollector polling the logs of `types` in the background.
+        It's stopped, after a last poll, when the driver quits.
+        """
+        from core.webdriver.chromium.logs import LogCollector
+
+        collector = LogCollector(self, types, **options)
+        collector.start()
+        self._log_collectors.append(collector)
+        return collector
+
     def GetAvailableLogTypes(self):
         return self.execute_command(command.GET_AVAILABLE_LOG_TYPES)
 
@@ -405,6 +695,18 @@ class ChromiumDriver(object):
 
     def delete_network_conditions(self):
         self.execute_command(command.DELETE_NETWORK_CONDITIONS)
+        self.network_profile = None
+
+    def apply_network_profile(self, name):
+        """
+        Throttle the network with the profile `name` from NETWORK_PROFILES,
+        or with a profile dict.
+        """
+        profile = network.get_network_profile(name)
+        self.set_network_conditions(
+            profile['latency'], profile['download_throughput'],
+            profile['upload_throughput'], profile.get('offline', False))
+        self.network_profile = name
 
     def set_network_connection(self, connection_type):
         params = {'parameters': {'type': connection_type}}
@@ -424,11 +726,11 @@ class ChromiumDriver(object):
         self.execute_command(command.DELETE_SCREEN_ORIENTATION)
 
     def send_keys(self, *values):
-        typing = []
-        for value in values:
-            if isinstance(value, int):
-                value = str(value)
-            for i in range(len(value)):
-                typing.append(value[i])
-        self.execute_command(command.SEND_KEYS_TO_ACTIVE_ELEMENT, {'value': typing})
+        """
+        Type `values` into the active element.
+        """
+        for chunk in keys.chunk_keys(keys.encode_keys(values)):
+            # A chromedriver command outside of W3C, taking the legacy body
+            self.execute_command(
+                command.SEND_KEYS_TO_ACTIVE_ELEMENT, keys.keys_params(chunk))
 
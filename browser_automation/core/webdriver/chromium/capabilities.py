@@ -0,0 +1,139 @@
+"""
+Cache of the capabilities reported by new sessions.
+
+Sessions created with the same options against the same chromedriver and
+browser versions report the same capabilities, so they are parsed once and
+shared. The cache keeps its own copy and hands out a new one on each hit,
+so a session changing its capabilities doesn't affect the others.
+
+A few values differ between such sessions, like the profile directory and
+the DevTools address. They're left out of the cached dicts, kept by each
+session and put back by with_session_fields().
+"""
+import collections
+import copy
+import hashlib
+import json
+import threading
+
+# The per-session values, by (capability, key) path
+SESSION_FIELDS = (
+    ('chrome', 'userDataDir'),
+    ('goog:chromeOptions', 'debuggerAddress'),
+)
+
+
+def options_hash(params):
+    """
+    Return a digest of the NEW_SESSION request parameters.
+    """
+    if isinstance(params, dict):
+        params = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    if isinstance(params, str):
+        params = params.encode('utf-8')
+    return hashlib.sha1(params).hexdigest()
+
+
+def cache_key(raw, digest):
+    """
+    Return the cache key of the capabilities `raw` reported by a session
+    created with options hashed to `digest`, or None if they don't tell the
+    versions apart.
+    """
+    if not isinstance(raw, dict):
+        return None
+    browser_version = raw.get('browserVersion') or raw.get('version')
+    chrome = raw.get('chrome')
+    driver_version = chrome.get('chromedriverVersion') if isinstance(chrome, dict) else None
+    if not (browser_version and driver_version):
+        return None
+    return (driver_version, browser_version, digest)
+
+
+def session_fields(raw):
+    """
+    Return the per-session values of the capabilities `raw`, by path.
+    """
+    fields = {}
+    if isinstance(raw, dict):
+        for name, key in SESSION_FIELDS:
+            section = raw.get(name)
+            if isinstance(section, dict) and key in section:
+                fields[(name, key)] = section[key]
+    return fields
+
+
+def without_session_fields(capabilities):
+    """
+    Return a copy of `capabilities` without the per-session values, to be
+    cached. Only the dicts holding them are copied.
+    """
+    shared = dict(capabilities)
+    for name, key in SESSION_FIELDS:
+        section = shared.get(name)
+        if isinstance(section, dict) and key in section:
+            section = dict(section)
+            del section[key]
+            shared[name] = section
+    return shared
+
+
+def with_session_fields(shared, fields):
+    """
+    Return the cached capabilities `shared` completed with the per-session
+    `fields` returned by session_fields().
+    """
+    if not fields:
+        return shared
+    capabilities = dict(shared)
+    for (name, key), value in fields.items():
+        section = dict(capabilities.get(name) or {})
+        section[key] = value
+        capabilities[name] = section
+    return capabilities
+
+
+class CapabilitiesCache(object):
+    """
+    A bounded, least recently used mapping of cache keys to capabilities.
+    Values are deep copied on the way in and out.
+    """
+    def __init__(self, max_size=32):
+        self.max_size = max_size
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            cached = self._data[key]
+        return copy.deepcopy(cached)
+
+    def set(self, key, capabilities):
+        capabilities = copy.deepcopy(capabilities)
+        with self._lock:
+            self._data[key] = capabilities
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+cache = CapabilitiesCache()
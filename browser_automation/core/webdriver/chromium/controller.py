@@ -1,52 +1,208 @@
 import http.client as http_client
 import json
+import time
 
 import logging
 
+from core.webdriver.chromium import deadline
+from core.webdriver.chromium import retry
+from core.webdriver.chromium import transport as transports
+from core.webdriver.chromium.instrumentation import NULL_SPAN, command_name
+from core.webdriver.chromium.streaming import read_response
 
 logger = logging.getLogger(__name__)
 
 
+class _SinkError(Exception):
+    """
+    Raised in place of an error of the sink of execute_stream(), which must
+    not be taken for a failure of the server.
+    """
+
+
 class Controller(object):
-    def __init__(self, server_url):
+    """
+    Sends commands to a chromedriver server. Failed commands are retried as
+    allowed by `retry_policies` (a retry.RetryPolicies), and `breaker` stops
+    sending them while the server keeps failing; by default it's the one
+    shared by every Controller of `server_url`. See core.webdriver.chromium.retry.
+
+    Responses are waited for `timeout` seconds, or until the current
+    deadline if it's earlier, see core.webdriver.chromium.deadline.
+
+    Requests go over `transport`, by default the one for the scheme of
+    `server_url`, see core.webdriver.chromium.transport.
+    """
+    def __init__(self, server_url, retry_policies=None, breaker=None, timeout=30,
+                 transport=None):
         self._server_url = server_url
-        port = int(server_url.split(':')[2].split('/')[0])
-        self._conn = http_client.HTTPConnection('127.0.0.1', port, timeout=30)# @UndefinedVariable
+        self.transport = transport or transports.transport_for(server_url)
+        self.timeout = timeout
+        self._conn = self.transport.connect(timeout)
+        self.retry_policies = retry_policies or retry.DEFAULT_POLICIES
+        self.breaker = breaker or retry.get_breaker(self.transport.endpoint)
 
 
-    def execute(self, command, params):
+    def _send(self, command, params, span):
         """
-        Send a command to the remote server.
-
-        Any path subtitutions required for the URL mapped to the command should be
-        included in the command parameters.
+        Send the request for `command` and return the HTTP response, following
+        a redirect if needed, together with the request body.
         """
+        with span.phase('serialize'):
+            if isinstance(params, dict):
+                # Keep the parameters intact in case the command is retried
+                params = dict(params)
+            url_parts = command[1].split('/')
+            substituted_parts = []
+            for part in url_parts:
+                if part.startswith(':'):
+                    key = part[1:]
+                    substituted_parts += [params[key]]
+                    del params[key]
+                else:
+                    substituted_parts += [part]
+
+            body = None
+            if command[0] == 'POST':
+                # Parameters may come already encoded, see ChromeOptions
+                body = params if isinstance(params, str) else json.dumps(params)
+
+        with span.phase('network'):
+            self._conn.request(command[0], '/'.join(substituted_parts), body)
+        with span.phase('server'):
+            response = self._conn.getresponse()
+
+        if response.status == 303:
+            with span.phase('network'):
+                response.read()
+                self._conn.request('GET', response.getheader('location'))
+            with span.phase('server'):
+                response = self._conn.getresponse()
+        return response, body
+
+    @staticmethod
+    def _is_transient(response, result):
+        return (response.status in retry.TRANSIENT_STATUSES and
+                not (isinstance(result, dict) and 'error' in result))
 
-        url_parts = command[1].split('/')
-        substituted_parts = []
-        for part in url_parts:
-            if part.startswith(':'):
-                key = part[1:]
-                substituted_parts += [params[key]]
-                del params[key]
+    def _call(self, command, params, span, read, retryable=None):
+        """
+        Send `command` and return `read(response, body)`, which must return
+        the decoded result or None if the body isn't JSON, retrying transient
+        failures as allowed by the policy of the command, and by
+        `retryable()` if given.
+        """
+        policy = self.retry_policies.policy_for(command)
+        attempt = 1
+        while True:
+            timeout, bounded_by = deadline.timeout_for(self.timeout)
+            if bounded_by is not None and timeout <= 0:
+                raise deadline.overrun(command_name(command), bounded_by)
+            self.breaker.before_call()
+            self._set_timeout(timeout)
+            try:
+                response, body = self._send(command, params, span)
+                result = read(response, body)
+            except (OSError, http_client.HTTPException) as e:
+                # Connection errors and timeouts leave the connection unusable
+                self._conn.close()
+                if isinstance(e, TimeoutError) and bounded_by is not None:
+                    # The caller's deadline was too short, not a server failure
+                    raise deadline.overrun(command_name(command), bounded_by) from e
+                self.breaker.record_failure()
+                if (not isinstance(e, retry.TRANSIENT_ERRORS) or
+                        attempt >= policy.attempts or
+                        (retryable is not None and not retryable())):
+                    raise
+                error = e
+            except BaseException:
+                # Errors of the client itself, like an invalid body, a failing
+                # sink or an interrupt, say nothing about the server but may
+                # leave a response half read
+                self._conn.close()
+                self.breaker.record_inconclusive()
+                raise
             else:
-                substituted_parts += [part]
+                if not self._is_transient(response, result):
+                    self.breaker.record_success()
+                    if response.status != 200 and (
+                            result is None or 'error' not in result):
+                        raise RuntimeError('Server returned error: ' + response.reason)
+                    return result
+                self.breaker.record_failure()
+                if attempt >= policy.attempts:
+                    raise RuntimeError('Server returned error: ' + response.reason)
+                error = '%d %s' % (response.status, response.reason)
 
-        body = None
-        if command[0] == 'POST':
-            body = json.dumps(params)
+            delay = policy.delay(attempt)
+            current = deadline.current()
+            if current is not None and current.remaining() <= delay:
+                raise deadline.overrun(command_name(command), current)
+            logger.warning('%s failed (%s), retrying in %.2f s',
+                           command_name(command), error, delay)
+            time.sleep(delay)
+            attempt += 1
 
-        self._conn.request(command[0], '/'.join(substituted_parts), body)
-        response = self._conn.getresponse()
+    def _set_timeout(self, timeout):
+        if timeout != self._conn.timeout:
+            self._conn.timeout = timeout
+            if self._conn.sock is not None:
+                self._conn.sock.settimeout(timeout)
 
-        if response.status == 303:
-            self._conn.request('GET', response.getheader('location'))
-            response = self._conn.getresponse()
+    def execute(self, command, params, span=NULL_SPAN):
+        """
+        Send a command to the remote server.
 
-        r = response.read().decode("utf-8")
-        result = json.loads(r)
+        Any path subtitutions required for the URL mapped to the command should be
+        included in the command parameters. The time spent in each phase and the
+        payload sizes are accounted to `span`.
+        """
+        def read(response, body):
+            with span.phase('network'):
+                data = response.read()
+            span.add_bytes(len(body) if body else 0, len(data))
+            with span.phase('deserialize'):
+                return self._decode(response, data)
+        return self._call(command, params, span, read)
+
+    @staticmethod
+    def _decode(response, data):
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError:
+            # Error pages of proxies and crashed servers
+            if response.status == 200:
+                raise
+            return None
+
+    def execute_stream(self, command, params, sink, span=NULL_SPAN):
+        """
+        Like execute(), but the response is parsed while it's read and a
+        string value is passed to `sink` in pieces instead of being returned,
+        see streaming.read_response().
+        """
+        # A failure after the sink got part of the value can't be retried,
+        # as the sink can't take it back
+        written = False
 
-        if response.status != 200 and 'error' not in result:
-            raise RuntimeError('Server returned error: ' + response.reason)
-        return result
+        def write(text):
+            nonlocal written
+            written = True
+            try:
+                sink(text)
+            except Exception as e:
+                raise _SinkError() from e
 
+        def read(response, body):
+            with span.phase('network'):
+                if response.status != 200:
+                    data = response.read()
+                    span.add_bytes(len(body) if body else 0, len(data))
+                    return self._decode(response, data)
+                result, size = read_response(response, write)
+            span.add_bytes(len(body) if body else 0, size)
+            return result
+        try:
+            return self._call(command, params, span, read, retryable=lambda: not written)
+        except _SinkError as e:
+            raise e.__cause__ from None
@@ -0,0 +1,137 @@
+"""
+Deadlines for the commands sent to a chromedriver server.
+
+A deadline scope gives the code run inside it a time budget. Every command
+sent from the same thread while it's active waits on the socket for at most
+the time left, and fails with DeadlineExceeded when none is left, so a task
+with a 10 s budget can't get stuck in a 30 s socket wait:
+
+    with deadline.scope(10):
+        driver.load(url)
+        driver.find_element('css selector', '#done')
+
+Scopes nest, and an inner scope never extends the deadline of an outer one.
+ChromiumDriver.deadline() also caps the page load and script timeouts of the
+server, and execute_command() takes the deadline of a single call.
+
+Each overrun is recorded in the thread it happened in until taken with
+pop_overruns(); the task runner adds them to the results of the task.
+"""
+import contextlib
+import threading
+import time
+
+from core.webdriver.exceptions import DeadlineExceeded
+
+_local = threading.local()
+
+
+class Deadline(object):
+    """
+    A point in time `seconds` from now.
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def __repr__(self):
+        return '<%s %.3f s of %.3f s left>' % (
+            type(self).__name__, self.remaining(), self.seconds)
+
+
+class Overrun(object):
+    """
+    A command that failed because `deadline` expired, `late` seconds after it.
+    """
+    def __init__(self, command, deadline, late):
+        self.command = command
+        self.deadline = deadline
+        self.late = late
+
+    def __str__(self):
+        return '%s exceeded a %.3f s deadline by %.3f s' % (
+            self.command, self.deadline.seconds, self.late)
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, self)
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def current():
+    """
+    Return the earliest active Deadline of this thread, or None.
+    """
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+@contextlib.contextmanager
+def scope(seconds):
+    """
+    Run the block with a deadline `seconds` from now, or with the one of an
+    enclosing scope if that's earlier. Yield the effective Deadline. A None
+    `seconds` adds no deadline.
+    """
+    stack = _stack()
+    outer = stack[-1] if stack else None
+    if seconds is None:
+        yield outer
+        return
+    deadline = Deadline(seconds)
+    if outer is not None and outer.expires_at <= deadline.expires_at:
+        deadline = outer
+    stack.append(deadline)
+    try:
+        yield deadline
+    finally:
+        stack.pop()
+
+
+def timeout_for(default):
+    """
+    Return the seconds to wait for a response: `default` or the time left to
+    the current deadline, whichever is shorter. The returned deadline is None
+    when `default` applies.
+    """
+    deadline = current()
+    if deadline is None:
+        return default, None
+    remaining = deadline.remaining()
+    if default is not None and default <= remaining:
+        return default, None
+    return remaining, deadline
+
+
+def overrun(command, deadline):
+    """
+    Record that `command` overran `deadline` and return the DeadlineExceeded
+    to raise.
+    """
+    record = Overrun(command, deadline, max(-deadline.remaining(), 0))
+    overruns = getattr(_local, 'overruns', None)
+    if overruns is None:
+        overruns = _local.overruns = []
+    overruns.append(record)
+    return DeadlineExceeded(str(record))
+
+
+def pop_overruns():
+    """
+    Return and forget the overruns recorded in this thread.
+    """
+    overruns = getattr(_local, 'overruns', None) or []
+    _local.overruns = []
+    return overruns
@@ -0,0 +1,171 @@
+"""
+Filling of whole forms in a single script.
+
+Typing into a form field by field costs a find, a clear and a send keys
+command per field. fill_form() sends every field in one EXECUTE_SCRIPT
+instead: the script locates each field, sets its value the way keys.
+SET_VALUE_SCRIPT does and fires its input and change events, and returns
+the fields it couldn't fill with the reason:
+
+    driver.fill_form({
+        'first_name': 'Ada',                        # by name
+        ('css selector', '#email'): 'ada@example.com',
+        ('xpath', '//input[@type="checkbox"]'): True,
+        'country': 'UK',                            # option value or text
+        'gender': 'female',                         # radio button value
+        element: 'as a WebElement',
+    })
+
+Key events aren't fired, so fields reacting to them only must still be
+typed into with send_keys().
+"""
+from core.webdriver.chromium import keys
+from core.webdriver.chromium.webelement import WebElement
+
+# Strategy used for fields given by a plain string
+DEFAULT_STRATEGY = 'name'
+
+# arguments[0] is the element to search the fields in, or null for the
+# document; arguments[1] a list of [element, strategy, target, value]. The
+# result maps the index of each field that couldn't be filled to the error.
+FILL_FORM_SCRIPT = """
+var root = arguments[0] || document, fields = arguments[1], errors = {};
+
+function locate(strategy, target) {
+    switch (strategy) {
+    case 'css selector':
+    case 'tag name':
+        return root.querySelector(target);
+    case 'id':
+        return root.querySelector('#' + CSS.escape(target));
+    case 'name':
+        return root.querySelector('[name="' + CSS.escape(target) + '"]');
+    case 'class name':
+        return root.querySelector('.' + CSS.escape(target));
+    case 'xpath':
+        return document.evaluate(target, root, null,
+            XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    throw new Error('unsupported locator strategy ' + strategy);
+}
+
+function fire(element) {
+    element.dispatchEvent(new Event('input', {bubbles: true}));
+    element.dispatchEvent(new Event('change', {bubbles: true}));
+}
+
+function check(element, checked) {
+    // A click fires the events a user's would and runs the handlers
+    if (element.checked !== checked) {
+        element.click();
+    }
+    if (element.checked !== checked) {
+        throw new Error('the click was prevented');
+    }
+}
+
+function fill(element, value) {
+    if (element.disabled) {
+        throw new Error('element is disabled');
+    }
+    if (element.readOnly) {
+        throw new Error('element is read only');
+    }
+    var type = (element.type || '').toLowerCase();
+    if (type === 'checkbox' || (type === 'radio' && typeof value === 'boolean')) {
+        check(element, !!value);
+    } else if (type === 'radio') {
+        var radios = element.name ? root.querySelectorAll(
+            'input[type="radio"][name="' + CSS.escape(element.name) + '"]') : [element];
+        for (var i = 0; i < radios.length; i++) {
+            if (radios[i].value === value) {
+                return check(radios[i], true);
+            }
+        }
+        throw new Error('no radio button with value ' + value);
+    } else if (element instanceof HTMLSelectElement) {
+        var wanted = Array.isArray(value) ? value : [value], found = 0;
+        for (var j = 0; j < element.options.length; j++) {
+            var option = element.options[j];
+            var selected = wanted.indexOf(option.value) >= 0 ||
+                           wanted.indexOf(option.text.trim()) >= 0;
+            if (selected) {
+                found++;
+            }
+            if (selected || element.multiple) {
+                option.selected = selected;
+            }
+        }
+        if (!found) {
+            throw new Error('no option matching ' + wanted.join(', '));
+        }
+        fire(element);
+    } else if (element.isContentEditable) {
+        element.textContent = value;
+        fire(element);
+    } else {
+        var proto = element instanceof HTMLTextAreaElement ?
+                    HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(element, value);
+        fire(element);
+    }
+}
+
+for (var i = 0; i < fields.length; i++) {
+    var field = fields[i];
+    try {
+        var element = field[0] || locate(field[1], field[2]);
+        if (!element) {
+            throw new Error('no such element');
+        }
+        fill(element, field[3]);
+    } catch (e) {
+        errors[i] = e.message;
+    }
+}
+return errors;
+"""
+
+
+def field_locator(key):
+    """
+    Return the [element, strategy, target] of a fill_form() key: a
+    WebElement, a (strategy, target) tuple or a field name.
+    """
+    if isinstance(key, WebElement):
+        return [key, None, None]
+    if isinstance(key, tuple):
+        strategy, target = key
+        return [None, strategy, target]
+    return [None, DEFAULT_STRATEGY, key]
+
+
+def field_value(value):
+    """
+    Checkboxes and radio buttons take booleans and multiple selects lists;
+    anything else is set as text.
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [keys.encode_keys([item]) for item in value]
+    return keys.encode_keys([value])
+
+
+def fill_form_args(mapping):
+    """
+    Return the keys of `mapping` and the fields argument of
+    FILL_FORM_SCRIPT, in the same order.
+    """
+    keys_ = list(mapping)
+    fields = [field_locator(key) + [field_value(mapping[key])] for key in keys_]
+    return keys_, fields
+
+
+def field_errors(keys_, result):
+    """
+    Map the errors returned by FILL_FORM_SCRIPT back to the fill_form()
+    keys.
+    """
+    return {keys_[int(index)]: message for index, message in
+            sorted((result or {}).items(), key=lambda item: int(item[0]))}
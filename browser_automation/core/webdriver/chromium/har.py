@@ -0,0 +1,423 @@
+"""
+Conversion of the performance log to HAR 1.2.
+
+Enable the log with ``logging_prefs={'performance': 'ALL'}``. Its entries
+carry DevTools events; HarConverter turns the Page.* and Network.* ones
+into HAR pages and entries. Entries are handed over as soon as their request
+finishes and only the requests in flight are kept, so a HarWriter can write
+a HAR file for a long session without holding it in memory:
+
+    collector = driver.collect_logs(['performance'])
+    ...
+    summaries = save_har(collector.entries(type='performance'), 'task.har')
+
+The summaries of each file saved are also recorded in the thread until
+taken with pop_summaries(); the task runner adds them to the output and
+the results of the task, see format_summaries().
+"""
+import datetime
+import json
+import logging
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+from utils.version import get_version
+from core.webdriver.chromium import streaming
+
+logger = logging.getLogger(__name__)
+
+HAR_VERSION = '1.2'
+
+_local = threading.local()
+
+
+def parse_event(entry):
+    """
+    Return the (method, params) of the DevTools event in a performance log
+    entry, which may also be the event itself.
+    """
+    message = entry.get('message', entry)
+    if isinstance(message, str):
+        message = json.loads(message)
+    if 'message' in message:
+        message = message['message']
+    return message.get('method'), message.get('params') or {}
+
+
+def iso_time(wall_time):
+    moment = datetime.datetime.fromtimestamp(wall_time, datetime.timezone.utc)
+    return moment.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def name_value_list(mapping):
+    return [{'name': name, 'value': str(value)}
+            for name, value in sorted((mapping or {}).items())]
+
+
+def _duration(timing, start, end):
+    if timing.get(start, -1) < 0 or timing.get(end, -1) < 0:
+        return -1
+    return round(timing[end] - timing[start], 3)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class _Request(object):
+    """
+    A request in flight.
+    """
+    def __init__(self, params, page):
+        self.params = params
+        self.page = page
+        self.response = None
+        self.data_length = 0
+        # None until the size of the response on the wire is known
+        self.encoded_length = None
+        self.end = None
+        self.error = None
+
+
+class PageSummary(object):
+    """
+    Timings of a page, in milliseconds from the start of its navigation
+    request, and the number of bytes transferred to load it.
+    """
+    def __init__(self, id, url, request_id, start, wall_time):
+        self.id = id
+        self.request_id = request_id
+        self.url = url
+        self.start = start
+        self.wall_time = wall_time
+        self.ttfb = None
+        self.dom_content_loaded = None
+        self.load = None
+        self.requests = 0
+        self.bytes = 0
+
+    def to_har(self):
+        return {
+            'startedDateTime': iso_time(self.wall_time),
+            'id': self.id,
+            'title': self.url,
+            'pageTimings': {
+                'onContentLoad': self.dom_content_loaded if self.dom_content_loaded is not None else -1,
+                'onLoad': self.load if self.load is not None else -1,
+            },
+        }
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'ttfb': self.ttfb,
+            'dom_content_loaded': self.dom_content_loaded,
+            'load': self.load,
+            'requests': self.requests,
+            'bytes': self.bytes,
+        }
+
+
+class HarConverter(object):
+    """
+    Builds HAR pages and entries from DevTools events fed in order.
+    `on_entry` is called with each finished entry; when it's None they are
+    kept in `entries`.
+    """
+    def __init__(self, on_entry=None):
+        self.on_entry = on_entry
+        self.entries = []
+        self.pages = []
+        self._requests = {}
+        self._main_frame = None
+        # Timestamp of the latest event, where requests in flight are cut
+        self._last_timestamp = None
+
+    @property
+    def page(self):
+        return self.pages[-1] if self.pages else None
+
+    def feed(self, entry):
+        method, params = parse_event(entry)
+        if 'timestamp' in params:
+            self._last_timestamp = params['timestamp']
+        handler = self.HANDLERS.get(method)
+        if handler is not None:
+            handler(self, params)
+
+    def feed_all(self, entries):
+        for entry in entries:
+            self.feed(entry)
+        return self
+
+    def _request_will_be_sent(self, params):
+        request_id = params['requestId']
+        if 'redirectResponse' in params and request_id in self._requests:
+            request = self._requests.pop(request_id)
+            request.response = params['redirectResponse']
+            request.end = params['timestamp']
+            self._finish(request)
+
+        is_navigation = (params.get('type') == 'Document' and
+                         request_id == params.get('loaderId'))
+        if is_navigation and self._main_frame is None:
+            self._main_frame = params.get('frameId')
+        if (is_navigation and params.get('frameId') == self._main_frame and
+                'redirectResponse' not in params):
+            self.pages.append(PageSummary(
+                'page_%d' % (len(self.pages) + 1), params['request']['url'],
+                request_id, params['timestamp'], params.get('wallTime', params['timestamp'])))
+        self._requests[request_id] = _Request(params, self.page)
+
+    def _response_received(self, params):
+        request = self._requests.get(params['requestId'])
+        if request is not None:
+            request.response = params['response']
+
+    def _data_received(self, params):
+        request = self._requests.get(params['requestId'])
+        if request is not None:
+            request.data_length += params.get('dataLength', 0)
+            request.encoded_length = ((request.encoded_length or 0) +
+                                      params.get('encodedDataLength', 0))
+
+    def _loading_finished(self, params):
+        request = self._requests.pop(params['requestId'], None)
+        if request is not None:
+            request.end = params['timestamp']
+            if params.get('encodedDataLength') is not None:
+                request.encoded_length = params['encodedDataLength']
+            self._finish(request)
+
+    def _loading_failed(self, params):
+        request = self._requests.pop(params['requestId'], None)
+        if request is not None:
+            request.end = params['timestamp']
+            request.error = params.get('errorText', 'failed')
+            self._finish(request)
+
+    def finish_pending(self):
+        """
+        Hand over the requests still in flight as entries marked
+        incomplete, their timings cut at the latest event. Return how
+        many there were.
+        """
+        requests = list(self._requests.values())
+        self._requests.clear()
+        for request in requests:
+            request.end = max(self._last_timestamp or 0, request.params['timestamp'])
+            request.error = request.error or 'incomplete'
+            self._finish(request, incomplete=True)
+        return len(requests)
+
+    def _dom_content_event_fired(self, params):
+        if self.page is not None and self.page.dom_content_loaded is None:
+            self.page.dom_content_loaded = _ms(params['timestamp'] - self.page.start)
+
+    def _load_event_fired(self, params):
+        if self.page is not None and self.page.load is None:
+            self.page.load = _ms(params['timestamp'] - self.page.start)
+
+    HANDLERS = {
+        'Network.requestWillBeSent': _request_will_be_sent,
+        'Network.responseReceived': _response_received,
+        'Network.dataReceived': _data_received,
+        'Network.loadingFinished': _loading_finished,
+        'Network.loadingFailed': _loading_failed,
+        'Page.domContentEventFired': _dom_content_event_fired,
+        'Page.loadEventFired': _load_event_fired,
+    }
+
+    def _timings(self, request):
+        """
+        Return the HAR timings of a request and the time to its first byte,
+        all in milliseconds.
+        """
+        start = request.params['timestamp']
+        total = _ms(request.end - start)
+        response = request.response or {}
+        timing = response.get('timing')
+        if not timing:
+            return {'blocked': -1, 'dns': -1, 'connect': -1, 'ssl': -1,
+                    'send': 0, 'wait': 0, 'receive': total}, None
+
+        # Timing values are milliseconds from timing['requestTime']
+        offset = _ms(timing['requestTime'] - start)
+        first = [timing[key] for key in ('dnsStart', 'connectStart', 'sendStart')
+                 if timing.get(key, -1) >= 0]
+        blocked = round(offset + (first[0] if first else 0), 3)
+        ttfb = round(offset + timing['receiveHeadersEnd'], 3)
+        timings = {
+            'blocked': blocked,
+            'dns': _duration(timing, 'dnsStart', 'dnsEnd'),
+            'connect': _duration(timing, 'connectStart', 'connectEnd'),
+            'ssl': _duration(timing, 'sslStart', 'sslEnd'),
+            'send': max(_duration(timing, 'sendStart', 'sendEnd'), 0),
+            'wait': max(_duration(timing, 'sendEnd', 'receiveHeadersEnd'), 0),
+            'receive': max(round(total - ttfb, 3), 0),
+        }
+        return timings, ttfb
+
+    def _finish(self, request, incomplete=False):
+        params = request.params
+        http_request = params['request']
+        response = request.response or {}
+        timings, ttfb = self._timings(request)
+        post_data = http_request.get('postData')
+        headers = response.get('headers') or {}
+
+        entry = {
+            'startedDateTime': iso_time(params.get('wallTime', params['timestamp'])),
+            'time': round(sum(value for key, value in timings.items()
+                              if key != 'ssl' and value > 0), 3),
+            'request': {
+                'method': http_request.get('method', 'GET'),
+                'url': http_request['url'],
+                'httpVersion': response.get('protocol', ''),
+                'cookies': [],
+                'headers': name_value_list(http_request.get('headers')),
+                'queryString': [{'name': name, 'value': value} for name, value in
+                                parse_qsl(urlsplit(http_request['url']).query)],
+                'headersSize': -1,
+                'bodySize': len(post_data) if post_data else 0,
+            },
+            'response': {
+                'status': response.get('status', 0),
+                'statusText': response.get('statusText', request.error or ''),
+                'httpVersion': response.get('protocol', ''),
+                'cookies': [],
+                'headers': name_value_list(headers),
+                'content': {
+                    'size': request.data_length,
+                    'mimeType': response.get('mimeType', 'x-unknown'),
+                },
+                'redirectURL': headers.get('Location', headers.get('location', '')),
+                'headersSize': -1,
+                'bodySize': request.encoded_length if request.encoded_length is not None else -1,
+                '_transferSize': request.encoded_length or 0,
+            },
+            'cache': {},
+            'timings': timings,
+        }
+        if post_data:
+            entry['request']['postData'] = {
+                'mimeType': (http_request.get('headers') or {}).get('Content-Type', ''),
+                'text': post_data,
+            }
+        if response.get('remoteIPAddress'):
+            entry['serverIPAddress'] = response['remoteIPAddress']
+        if request.error:
+            entry['_error'] = request.error
+        if incomplete:
+            entry['_incomplete'] = True
+
+        page = request.page
+        if page is not None:
+            entry['pageref'] = page.id
+            page.requests += 1
+            page.bytes += request.encoded_length or 0
+            # The first byte of the document, after following any redirects
+            if (page.ttfb is None and ttfb is not None and
+                    params['requestId'] == page.request_id and
+                    response.get('status', 0) // 100 != 3):
+                page.ttfb = round(_ms(params['timestamp'] - page.start) + ttfb, 3)
+
+        if self.on_entry is None:
+            self.entries.append(entry)
+        else:
+            self.on_entry(entry)
+
+    def to_har(self):
+        """
+        Return the HAR document of the entries kept in `entries`.
+        """
+        return {'log': dict(self._log_header(), pages=[page.to_har() for page in self.pages],
+                            entries=self.entries)}
+
+    @staticmethod
+    def _log_header():
+        return {
+            'version': HAR_VERSION,
+            'creator': {'name': 'browser_automation', 'version': get_version()},
+        }
+
+
+class HarWriter(object):
+    """
+    Writes a HAR document to a binary file entry by entry. The pages, which
+    are only complete at the end, are written after the entries.
+    """
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.converter = HarConverter(on_entry=self._write_entry)
+        self._count = 0
+        header = json.dumps(HarConverter._log_header())
+        self._write('{"log": %s, "entries": [' % header[:-1])
+
+    def _write(self, text):
+        self.fileobj.write(text.encode('utf-8'))
+
+    def _write_entry(self, entry):
+        self._write((',\n' if self._count else '\n') + json.dumps(entry))
+        self._count += 1
+
+    def feed(self, entry):
+        self.converter.feed(entry)
+
+    def close(self):
+        """
+        Write the requests still in flight, the pages and end the document.
+        Return the page summaries.
+        """
+        pending = self.converter.finish_pending()
+        if pending:
+            logger.warning('%d requests were still in flight at the end of the '
+                           'log, their HAR entries are incomplete', pending)
+        pages = json.dumps([page.to_har() for page in self.converter.pages])
+        self._write('\n], "pages": %s}}\n' % pages)
+        return self.converter.pages
+
+
+def save_har(entries, path, compress=None):
+    """
+    Convert performance log `entries` to a HAR file at `path`, compressed
+    as with streaming.open_output(). Return the summaries of the pages,
+    which are also recorded for pop_summaries().
+    """
+    with streaming.open_output(path, compress) as fileobj:
+        writer = HarWriter(fileobj)
+        for entry in entries:
+            writer.feed(entry)
+        summaries = writer.close()
+    recorded = getattr(_local, 'summaries', None)
+    if recorded is None:
+        recorded = _local.summaries = []
+    recorded.extend(summaries)
+    return summaries
+
+
+def pop_summaries():
+    """
+    Return and forget the page summaries of the HAR files saved in this
+    thread.
+    """
+    summaries = getattr(_local, 'summaries', None) or []
+    _local.summaries = []
+    return summaries
+
+
+def format_summaries(summaries):
+    """
+    Return a text table with the timings of each page.
+    """
+    def cell(value):
+        return '-' if value is None else '%.0f' % value
+
+    lines = ['%-8s %8s %8s %8s %6s %10s  %s' % (
+        'page', 'ttfb', 'dcl', 'load', 'reqs', 'bytes', 'url')]
+    for page in summaries:
+        lines.append('%-8s %8s %8s %8s %6d %10d  %s' % (
+            page.id, cell(page.ttfb), cell(page.dom_content_loaded),
+            cell(page.load), page.requests, page.bytes, page.url))
+    return '\n'.join(lines)
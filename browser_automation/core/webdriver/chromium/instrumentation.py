@@ -0,0 +1,311 @@
+"""
+Latency and size metrics for the commands sent to the webdriver server.
+
+Each command is measured with a Span split into phases:
+
+``serialize``
+    wrapping the parameters and encoding the JSON body
+``network``
+    sending the request and reading the response body
+``server``
+    waiting for the response headers once the request has been sent
+``deserialize``
+    decoding the JSON response and unwrapping the returned value
+
+Durations are kept in HDR-style histograms per command and phase, and can be
+dumped as Prometheus text or JSON at the end of a run.
+"""
+import json
+import threading
+import time
+
+from core.webdriver.chromium import constants
+
+
+PHASES = ('serialize', 'network', 'server', 'deserialize')
+
+_command_names = {
+    value: name for name, value in vars(constants).items()
+    if name.isupper() and isinstance(value, tuple)
+}
+
+
+def command_name(command):
+    """
+    Return the constant name of a command tuple, e.g. 'FIND_ELEMENT'.
+    """
+    try:
+        return _command_names[command]
+    except (KeyError, TypeError):
+        return '%s %s' % tuple(command)
+
+
+class Histogram(object):
+    """
+    A log-linear histogram in the spirit of HdrHistogram. Values below
+    2 ** sub_bucket_bits are recorded exactly; larger values keep
+    `sub_bucket_bits - 1` bits of precision, i.e. a relative error below
+    1 / 2 ** (sub_bucket_bits - 1). Buckets are stored sparsely.
+    """
+    def __init__(self, sub_bucket_bits=8):
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_bucket_count = 1 << sub_bucket_bits
+        self._half = self._sub_bucket_count >> 1
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        top = value >> shift
+        return self._sub_bucket_count + (shift - 1) * self._half + (top - self._half)
+
+    def _upper_bound(self, index):
+        if index < self._sub_bucket_count:
+            return index
+        shift, top = divmod(index - self._sub_bucket_count, self._half)
+        shift += 1
+        return ((top + self._half + 1) << shift) - 1
+
+    def record(self, value, count=1):
+        value = max(int(value), 0)
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        Return the value at the given percentile (0-100).
+        """
+        if not self.count:
+            return 0
+        target = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def to_dict(self, percentiles=(50, 90, 99, 99.9)):
+        return {
+            'count': self.count,
+            'min': self.min or 0,
+            'max': self.max or 0,
+            'mean': self.mean,
+            'total': self.total,
+            'percentiles': {str(p): self.percentile(p) for p in percentiles},
+        }
+
+
+class CommandStats(object):
+    """
+    Metrics of one command type. Durations are in microseconds.
+    """
+    def __init__(self):
+        self.latency = {phase: Histogram() for phase in ('total',) + PHASES}
+        self.request_bytes = Histogram()
+        self.response_bytes = Histogram()
+        self.errors = 0
+
+    def to_dict(self):
+        return {
+            'latency_us': {phase: h.to_dict() for phase, h in self.latency.items()},
+            'request_bytes': self.request_bytes.to_dict(),
+            'response_bytes': self.response_bytes.to_dict(),
+            'errors': self.errors,
+        }
+
+
+class _Phase(object):
+    __slots__ = ('span', 'name', 'start')
+
+    def __init__(self, span, name):
+        self.span = span
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        phases = self.span.phases
+        phases[self.name] = phases.get(self.name, 0.0) + elapsed
+
+
+class Span(object):
+    """
+    Measures a single command. Use `phase(name)` as a context manager to
+    account time to one of PHASES.
+    """
+    def __init__(self, metrics, command):
+        self.metrics = metrics
+        self.command = command
+        self.name = command_name(command)
+        self.phases = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.error = None
+        self.start = None
+        self.duration = None
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add_bytes(self, sent=0, received=0):
+        self.request_bytes += sent
+        self.response_bytes += received
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self.start
+        self.error = exc_value
+        self.metrics.record(self)
+
+
+class _NullPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class NullSpan(object):
+    """
+    A span that records nothing, used when metrics are disabled.
+    """
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def add_bytes(self, sent=0, received=0):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+NULL_SPAN = NullSpan()
+
+
+class Metrics(object):
+    """
+    Collects the spans of all the commands executed by the drivers using it.
+    Listeners registered with `add_listener` are called with every finished
+    span and can be used as tracing hooks.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.commands = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def span(self, command):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, command)
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def record(self, span):
+        with self._lock:
+            stats = self.commands.get(span.name)
+            if stats is None:
+                stats = self.commands[span.name] = CommandStats()
+            stats.latency['total'].record(span.duration * 1e6)
+            for phase, elapsed in span.phases.items():
+                stats.latency[phase].record(elapsed * 1e6)
+            stats.request_bytes.record(span.request_bytes)
+            stats.response_bytes.record(span.response_bytes)
+            if span.error is not None:
+                stats.errors += 1
+        for listener in self._listeners:
+            listener(span)
+
+    def reset(self):
+        with self._lock:
+            self.commands = {}
+
+    def to_dict(self):
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in sorted(self.commands.items())}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix='webdriver', quantiles=(0.5, 0.9, 0.99)):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            '# TYPE %s_command_seconds summary' % prefix,
+        ]
+        with self._lock:
+            commands = sorted(self.commands.items())
+        for name, stats in commands:
+            for phase, histogram in sorted(stats.latency.items()):
+                if not histogram.count:
+                    continue
+                labels = 'command="%s",phase="%s"' % (name, phase)
+                for quantile in quantiles:
+                    lines.append('%s_command_seconds{%s,quantile="%s"} %.6f' % (
+                        prefix, labels, quantile,
+                        histogram.percentile(quantile * 100) / 1e6))
+                lines.append('%s_command_seconds_sum{%s} %.6f' % (
+                    prefix, labels, histogram.total / 1e6))
+                lines.append('%s_command_seconds_count{%s} %d' % (
+                    prefix, labels, histogram.count))
+        for metric, attr in (('request_bytes', 'request_bytes'),
+                             ('response_bytes', 'response_bytes')):
+            lines.append('# TYPE %s_%s_total counter' % (prefix, metric))
+            for name, stats in commands:
+                lines.append('%s_%s_total{command="%s"} %d' % (
+                    prefix, metric, name, getattr(stats, attr).total))
+        lines.append('# TYPE %s_command_errors_total counter' % prefix)
+        for name, stats in commands:
+            lines.append('%s_command_errors_total{command="%s"} %d' % (
+                prefix, name, stats.errors))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, filename):
+        """
+        Write the metrics to `filename`, as JSON when it ends with '.json'
+        and as Prometheus text otherwise.
+        """
+        if filename.endswith('.json'):
+            output = self.to_json(indent=2, sort_keys=True)
+        else:
+            output = self.to_prometheus()
+        with open(filename, 'w') as _file:
+            _file.write(output)
+
+
+# Shared by every driver that isn't given its own Metrics instance
+metrics = Metrics()
@@ -0,0 +1,65 @@
+"""
+Encoding of the text typed by send_keys.
+
+The wire protocol takes the keys as a list of strings which chromedriver
+joins, so text is sent as whole strings instead of one item per character.
+Very long text is split over several commands so no request body grows
+without bound, except when it holds special keys (the U+E000-U+F8FF range,
+e.g. SHIFT), as chromedriver releases modifier keys at the end of each
+command.
+"""
+import re
+
+# Characters sent per command when typing long text
+CHUNK_SIZE = 16 * 1024
+
+SPECIAL_KEYS = re.compile(r'[\ue000-\uf8ff]')
+
+# Sets the value of a form field like typing would, through the native value
+# setter so frameworks tracking the property see the change, then fires the
+# input and change events. Content editable elements get their text set.
+SET_VALUE_SCRIPT = """
+var element = arguments[0], value = arguments[1], append = arguments[2];
+if (element.isContentEditable) {
+    element.textContent = append ? element.textContent + value : value;
+} else {
+    var proto = element instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype :
+                element instanceof HTMLSelectElement ? HTMLSelectElement.prototype :
+                HTMLInputElement.prototype;
+    var setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+    setter.call(element, append ? element.value + value : value);
+}
+element.dispatchEvent(new Event('input', {bubbles: true}));
+element.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+
+def encode_keys(values):
+    """
+    Join the values given to send_keys into the text to type.
+    """
+    return ''.join(value if isinstance(value, str) else str(value) for value in values)
+
+
+def has_special_keys(text):
+    return SPECIAL_KEYS.search(text) is not None
+
+
+def chunk_keys(text, size=None):
+    """
+    Return the pieces `text` is sent in, one per command.
+    """
+    size = size or CHUNK_SIZE
+    if len(text) <= size or has_special_keys(text):
+        return [text]
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+def keys_params(text, w3c=False):
+    """
+    Return the parameters of a send keys command typing `text`: W3C Element
+    Send Keys only takes the text, the legacy commands a list of strings.
+    """
+    if w3c:
+        return {'text': text}
+    return {'value': [text]}
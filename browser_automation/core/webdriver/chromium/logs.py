@@ -0,0 +1,217 @@
+"""
+Incremental collection of the browser logs of a session.
+
+chromedriver returns (and forgets) the entries buffered since the previous
+GET_LOG call, so a LogCollector polling it in the background never asks for
+much at a time. Entries are appended to a JSONL file, one per line, and only
+the last few are kept in memory; the rest are read back from the file when
+iterated:
+
+    collector = driver.collect_logs(['browser', 'performance'])
+    ...
+    for entry in collector.entries(level='WARNING', url=r'example\\.com'):
+        ...
+"""
+import collections
+import json
+import logging
+import os
+import re
+import threading
+
+from conf import config
+from core.webdriver.chromium import constants as command
+from core.webdriver.chromium.controller import Controller
+from core.webdriver.exceptions import WebDriverException
+
+
+logger = logging.getLogger(__name__)
+
+# Levels in increasing order of severity
+LEVELS = ['ALL', 'DEBUG', 'INFO', 'WARNING', 'SEVERE']
+
+URL_PATTERN = re.compile(r'^(?:https?|file|chrome[-\w]*|data|about):\S*')
+
+
+def level_value(level):
+    try:
+        return LEVELS.index(level)
+    except ValueError:
+        return len(LEVELS)
+
+
+def entry_url(entry):
+    """
+    Return the URL an entry is about, or None. Browser log messages start
+    with it; performance log messages carry a DevTools event.
+    """
+    message = entry.get('message') or ''
+    if entry.get('type') == 'performance':
+        try:
+            params = json.loads(message)['message']['params']
+        except (ValueError, KeyError, TypeError):
+            return None
+        for key in ('request', 'response'):
+            if isinstance(params.get(key), dict) and 'url' in params[key]:
+                return params[key]['url']
+        return params.get('documentURL') or params.get('url')
+    match = URL_PATTERN.match(message)
+    return match.group(0) if match else None
+
+
+def make_filter(type=None, level=None, source=None, url=None):
+    """
+    Return a predicate selecting the entries of log `type`, at least as
+    severe as `level`, from `source`, and whose URL matches the `url` regex.
+    """
+    minimum = level_value(level) if level else None
+    url_regex = re.compile(url) if isinstance(url, str) else url
+
+    def predicate(entry):
+        if type is not None and entry.get('type') != type:
+            return False
+        if minimum is not None and level_value(entry.get('level')) < minimum:
+            return False
+        if source is not None and entry.get('source') != source:
+            return False
+        if url_regex is not None:
+            location = entry_url(entry)
+            if location is None or not url_regex.search(location):
+                return False
+        return True
+    return predicate
+
+
+class LogCollector(threading.Thread):
+    """
+    Thread that polls the logs of `types` every `interval` seconds and
+    appends the entries, tagged with their type, to `filename` (by default
+    <WEBDRIVER_LOG_DIR>/<session id>.jsonl). The last `tail_size` entries
+    are kept in `tail`.
+
+    The polls go through their own connection to the server, so they don't
+    interleave with the commands sent by the task.
+    """
+    def __init__(self, driver, types=('browser',), filename=None, interval=1.0,
+                 tail_size=200, executor=None):
+        super(LogCollector, self).__init__()
+        self.daemon = True
+        self.driver = driver
+        self.types = list(types)
+        if filename is None:
+            directory = config.get('webdriver_log_dir', None) or '.'
+            filename = os.path.join(directory, '%s.jsonl' % driver._session_id)
+        self.filename = filename
+        self.interval = interval
+        self.tail = collections.deque(maxlen=tail_size)
+        self.count = 0
+        if executor is None:
+            if driver.server_url is None:
+                executor = driver._executor
+            else:
+                executor = Controller(driver.server_url)
+        self._executor = executor
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(filename))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._file = open(filename, 'a', encoding='utf-8')
+
+    def _fetch(self, log_type):
+        params = {'sessionId': self.driver._session_id, 'type': log_type}
+        response = self._executor.execute(command.GET_LOG, params)
+        self.driver._check_response(response)
+        return response['value'] or []
+
+    def poll(self):
+        """
+        Fetch and store the entries logged since the previous poll. Return
+        how many there were.
+
+        The server drops the entries it returns, so those of each type are
+        written as soon as they are fetched. If fetching a type fails, the
+        others are still collected and the first error is raised at the end.
+        """
+        with self._lock:
+            if self._file is None:
+                return 0
+            count = 0
+            error = None
+            for log_type in self.types:
+                try:
+                    entries = self._fetch(log_type)
+                except (WebDriverException, OSError, RuntimeError) as e:
+                    error = error or e
+                    continue
+                count += self._write(log_type, entries)
+            if error is not None:
+                raise error
+            return count
+
+    def _write(self, log_type, entries):
+        lines = []
+        for entry in entries:
+            entry['type'] = log_type
+            self.tail.append(entry)
+            lines.append(json.dumps(entry, separators=(',', ':')) + '\n')
+        if lines:
+            self._file.write(''.join(lines))
+            self._file.flush()
+            self.count += len(lines)
+        return len(lines)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except (WebDriverException, OSError, RuntimeError) as e:
+                logger.warning('Error collecting logs of session %s: %s',
+                               self.driver._session_id, e)
+
+    def stop(self, final_poll=True):
+        """
+        Stop polling, collect what's left unless `final_poll` is False and
+        close the file.
+        """
+        self._stopped.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+        if final_poll:
+            try:
+                self.poll()
+            except (WebDriverException, OSError, RuntimeError) as e:
+                logger.warning('Error collecting logs of session %s: %s',
+                               self.driver._session_id, e)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._executor is not self.driver._executor:
+            close = getattr(self._executor, 'close', None)
+            if close is not None:
+                close()
+
+    def entries(self, type=None, level=None, source=None, url=None):
+        """
+        Iterate over every entry collected so far, read back from the file,
+        that matches the filters (see make_filter()).
+        """
+        predicate = make_filter(type, level, source, url)
+        with open(self.filename, encoding='utf-8') as file:
+            for line in file:
+                if not line.endswith('\n'):
+                    break
+                entry = json.loads(line)
+                if predicate(entry):
+                    yield entry
+
+    def recent(self, type=None, level=None, source=None, url=None):
+        """
+        Like entries(), over the in-memory tail only.
+        """
+        predicate = make_filter(type, level, source, url)
+        with self._lock:
+            tail = list(self.tail)
+        return [entry for entry in tail if predicate(entry)]
@@ -0,0 +1,64 @@
+"""
+Named network throttling profiles.
+
+Profiles are defined in the NETWORK_PROFILES setting as dicts with the
+'latency' (milliseconds), 'download_throughput' and 'upload_throughput'
+(bytes per second) keys that ChromiumDriver.set_network_conditions() takes.
+
+While a profile is active (see activate()), every new ChromiumDriver session
+is throttled with it; the runner's matrix mode uses this to repeat the tasks
+under several network conditions.
+"""
+import contextlib
+
+from conf import config
+from core.exceptions import ImproperlyConfigured
+
+PROFILE_KEYS = ('latency', 'download_throughput', 'upload_throughput')
+
+# Name of the active profile
+_active = None
+
+
+def get_network_profile(name):
+    """
+    Return the profile named `name` in NETWORK_PROFILES. A dict is returned
+    as is, after checking it has the required keys.
+    """
+    if isinstance(name, dict):
+        profile = name
+    else:
+        profiles = config.get('network_profiles', None) or {}
+        if name not in profiles:
+            raise ImproperlyConfigured(
+                'Unknown network profile %r, it must be one of NETWORK_PROFILES: %s'
+                % (name, ', '.join(sorted(profiles))))
+        profile = profiles[name]
+    missing = [key for key in PROFILE_KEYS if key not in profile]
+    if missing:
+        raise ImproperlyConfigured(
+            'Network profile %r is missing %s' % (name, ', '.join(missing)))
+    return profile
+
+
+def active_profile():
+    """
+    Return the name of the active profile, or None.
+    """
+    return _active
+
+
+@contextlib.contextmanager
+def activate(name):
+    """
+    Make `name` the active profile within the block.
+    """
+    global _active
+
+    if name is not None:
+        get_network_profile(name)
+    previous, _active = _active, name
+    try:
+        yield name
+    finally:
+        _active = previous
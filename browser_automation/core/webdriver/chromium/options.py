@@ -0,0 +1,135 @@
+"""
+Builder of the NEW_SESSION request for ChromiumDriver.
+
+A ChromeOptions object validates its arguments and serializes the request
+body once, so the same object can be shared by every session created with
+those options, e.g. by a SessionPool:
+
+    options = ChromeOptions(chrome_switches=['headless'],
+                            logging_prefs={'browser': 'ALL'})
+    pool = SessionPool(lambda: ChromiumDriver(url, options=options))
+"""
+import json
+import platform
+import sys
+
+from core.webdriver.chromium.capabilities import options_hash
+
+LOG_TYPES = ('client', 'driver', 'browser', 'server', 'performance')
+LOG_LEVELS = ('ALL', 'DEBUG', 'INFO', 'WARNING', 'SEVERE', 'OFF')
+
+_no_sandbox = None
+
+
+def needs_no_sandbox():
+    """
+    Whether Chrome must run with --no-sandbox here. Computed once, as
+    platform.architecture() runs the 'file' command on the interpreter.
+    """
+    global _no_sandbox
+
+    if _no_sandbox is None:
+        # TODO(samuong): speculative fix for crbug.com/611886
+        _no_sandbox = (sys.platform.startswith('linux') and
+                       platform.architecture()[0] == '32bit')
+    return _no_sandbox
+
+
+def _check_type(name, value, expected):
+    if value and not isinstance(value, expected):
+        raise TypeError('%s must be a %s, not %s' % (
+            name, expected.__name__, type(value).__name__))
+
+
+class ChromeOptions(object):
+    """
+    Capabilities of a new Chrome session. The arguments are the options of
+    ChromiumDriver; they are validated and the request built when the object
+    is created. `params` is the request and `body` its JSON encoding, and
+    neither must be modified.
+    """
+    def __init__(self, chrome_binary=None, android_package=None,
+                 android_activity=None, android_process=None,
+                 android_use_running_app=None, chrome_switches=None,
+                 chrome_extensions=None, chrome_log_path=None,
+                 debugger_address=None, logging_prefs=None,
+                 mobile_emulation=None, experimental_options=None,
+                 download_dir=None, network_connection=None,
+                 send_w3c_capability=None, send_w3c_request=None,
+                 page_load_strategy=None, unexpected_alert_behaviour=None):
+        _check_type('experimental_options', experimental_options, dict)
+        _check_type('chrome_switches', chrome_switches, list)
+        _check_type('mobile_emulation', mobile_emulation, dict)
+        _check_type('chrome_extensions', chrome_extensions, list)
+        _check_type('chrome_log_path', chrome_log_path, str)
+        _check_type('debugger_address', debugger_address, str)
+        _check_type('logging_prefs', logging_prefs, dict)
+        _check_type('page_load_strategy', page_load_strategy, str)
+        _check_type('unexpected_alert_behaviour', unexpected_alert_behaviour, str)
+
+        options = dict(experimental_options or {})
+
+        if android_package:
+            options['androidPackage'] = android_package
+            if android_activity:
+                options['androidActivity'] = android_activity
+            if android_process:
+                options['androidProcess'] = android_process
+            if android_use_running_app:
+                options['androidUseRunningApp'] = android_use_running_app
+        elif chrome_binary:
+            options['binary'] = chrome_binary
+
+        chrome_switches = list(chrome_switches or [])
+        if needs_no_sandbox():
+            chrome_switches.append('no-sandbox')
+        if chrome_switches:
+            options['args'] = chrome_switches
+
+        if mobile_emulation:
+            options['mobileEmulation'] = mobile_emulation
+        if chrome_extensions:
+            options['extensions'] = list(chrome_extensions)
+        if chrome_log_path:
+            options['logPath'] = chrome_log_path
+        if debugger_address:
+            options['debuggerAddress'] = debugger_address
+
+        logging_prefs = dict(logging_prefs or {})
+        for log_type, log_level in logging_prefs.items():
+            if log_type not in LOG_TYPES:
+                raise ValueError('Unknown log type %r, expected one of %s'
+                                 % (log_type, ', '.join(LOG_TYPES)))
+            if log_level not in LOG_LEVELS:
+                raise ValueError('Unknown log level %r, expected one of %s'
+                                 % (log_level, ', '.join(LOG_LEVELS)))
+
+        if download_dir:
+            prefs = options['prefs'] = dict(options.get('prefs') or {})
+            download = prefs['download'] = dict(prefs.get('download') or {})
+            download['default_directory'] = download_dir
+
+        if send_w3c_capability:
+            options['w3c'] = send_w3c_capability
+
+        capabilities = {
+            'chromeOptions': options,
+            'loggingPrefs': logging_prefs,
+        }
+        if page_load_strategy:
+            capabilities['pageLoadStrategy'] = page_load_strategy
+        if unexpected_alert_behaviour:
+            capabilities['unexpectedAlertBehaviour'] = unexpected_alert_behaviour
+        if network_connection:
+            capabilities['networkConnectionEnabled'] = network_connection
+
+        params = {'desiredCapabilities': capabilities}
+        if send_w3c_request:
+            params = {'capabilities': params}
+
+        self.params = params
+        self.body = json.dumps(params)
+        self.digest = options_hash(params)
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, self.body)
@@ -0,0 +1,292 @@
+"""
+A pool of browser sessions that are reset between uses instead of being
+quit and launched again.
+"""
+import collections
+import contextlib
+import functools
+import logging
+import threading
+import time
+
+from core.webdriver.exceptions import PoolTimeout, WebDriverException
+
+
+logger = logging.getLogger(__name__)
+
+CLEAR_STORAGE_SCRIPT = (
+    'try { window.localStorage.clear(); } catch (e) {}'
+    'try { window.sessionStorage.clear(); } catch (e) {}'
+)
+
+USED_MEMORY_SCRIPT = (
+    'return window.performance && window.performance.memory ? '
+    'window.performance.memory.usedJSHeapSize : null;'
+)
+
+
+class _Lease(object):
+    __slots__ = ('uses', 'created', 'stale')
+
+    def __init__(self):
+        self.uses = 1
+        self.created = time.monotonic()
+        # Set when the server of the session has gone away
+        self.stale = False
+
+
+class SessionPool(object):
+    """
+    Hands out existing sessions created by `factory` and resets them when they
+    are released: extra windows are closed, storage and cookies are cleared and
+    the remaining window goes to `blank_url`.
+
+    A session is quit instead of being reused when it has been leased
+    `max_uses` times, is older than `max_age` seconds, its JS heap is above
+    `max_memory` bytes, or its reset fails.
+    """
+    def __init__(self, factory, max_size=4, max_uses=50, max_age=None,
+                 max_memory=None, blank_url='about:blank'):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.max_memory = max_memory
+        self.blank_url = blank_url
+        self._idle = collections.deque()
+        self._leases = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        # Pool that takes over the acquisitions after merge_into()
+        self._target = None
+
+    @property
+    def size(self):
+        """
+        Number of live sessions, leased or idle.
+        """
+        return len(self._leases)
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        target = None
+        with self._condition:
+            while True:
+                if self._target is not None:
+                    target = self._target
+                    break
+                if self._closed:
+                    raise WebDriverException('Session pool is closed')
+                if self._idle:
+                    driver = self._idle.pop()
+                    self._leases[driver].uses += 1
+                    return driver
+                if len(self._leases) < self.max_size:
+                    # Reserve the slot before creating the session outside
+                    # the lock, since launching a browser is slow.
+                    placeholder = object()
+                    self._leases[placeholder] = None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout('No browser session available')
+                self._condition.wait(remaining)
+
+        if target is not None:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            return target.acquire(remaining)
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._condition:
+                del self._leases[placeholder]
+                self._condition.notify()
+            raise
+        with self._condition:
+            del self._leases[placeholder]
+            self._leases[driver] = _Lease()
+        return driver
+
+    def release(self, driver, discard=False):
+        """
+        Return a session to the pool. With `discard` the session is quit.
+        """
+        with self._condition:
+            lease = self._leases.get(driver)
+            target = self._target
+            discard = discard or self._closed or (lease is not None and lease.stale)
+        if lease is None:
+            if target is not None:
+                return target.release(driver, discard)
+            raise ValueError('Session does not belong to this pool')
+
+        if discard or self._should_recycle(driver, lease):
+            self._quit(driver)
+        else:
+            try:
+                self.reset_session(driver)
+            except Exception as e:
+                logger.warning('Unable to reset browser session, discarding it: %s', e)
+                self._quit(driver)
+            else:
+                with self._condition:
+                    self._idle.append(driver)
+                    self._condition.notify()
+
+    @contextlib.contextmanager
+    def lease(self, timeout=None):
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    def _should_recycle(self, driver, lease):
+        if self.max_uses and lease.uses >= self.max_uses:
+            return True
+        if self.max_age and time.monotonic() - lease.created >= self.max_age:
+            return True
+        if self.max_memory:
+            try:
+                used = driver.execute_script(USED_MEMORY_SCRIPT)
+            except WebDriverException:
+                used = None
+            if used is not None and used >= self.max_memory:
+                return True
+        return False
+
+    def reset_session(self, driver):
+        """
+        Bring a session back to a blank state. Override to reset more.
+        """
+        handles = driver.get_window_handles()
+        if len(handles) > 1:
+            for handle in handles[1:]:
+                driver.switch_to_window(handle)
+                driver.close_window()
+        driver.switch_to_window(handles[0])
+        driver.switch_to_main_frame()
+
+        try:
+            driver.clear_local_storage()
+            driver.clear_session_storage()
+        except WebDriverException:
+            driver.execute_script(CLEAR_STORAGE_SCRIPT)
+        driver.delete_all_cookies()
+        driver.load(self.blank_url)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning('Error quitting browser session: %s', e)
+        finally:
+            with self._condition:
+                self._leases.pop(driver, None)
+                self._condition.notify()
+
+    def invalidate(self):
+        """
+        Forget the current sessions, e.g. because their server was restarted:
+        idle ones are quit now and leased ones when released, and new ones
+        are created by the factory.
+        """
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            for lease in self._leases.values():
+                if lease is not None:
+                    lease.stale = True
+        for driver in idle:
+            self._quit(driver)
+
+    def merge_into(self, other):
+        """
+        Hand the future acquisitions of this pool to `other`, e.g. because
+        both now create sessions on the same server. Sessions of this pool
+        are dropped as by invalidate(), and those leased are released to it.
+        """
+        with self._condition:
+            self._target = other
+            self._condition.notify_all()
+        self.invalidate()
+
+    def close(self):
+        """
+        Quit every idle session; leased ones are quit when released.
+        """
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for driver in idle:
+            self._quit(driver)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(server_url, **options):
+    """
+    Return the pool of ChromiumDriver sessions shared by the tasks that use
+    `server_url`. Pool options are only used when the pool is created; the
+    remaining options are passed to ChromiumDriver.
+    """
+    from core.webdriver.chromium import ChromiumDriver
+
+    pool_options = {key: options.pop(key) for key in
+                    ('max_size', 'max_uses', 'max_age', 'max_memory', 'blank_url')
+                    if key in options}
+    with _pools_lock:
+        pool = _pools.get(server_url)
+        if pool is None:
+            factory = functools.partial(ChromiumDriver, server_url, **options)
+            pool = _pools[server_url] = SessionPool(factory, **pool_options)
+            pool.driver_options = options
+        return pool
+
+
+def rehome(old_url, new_url):
+    """
+    Move the pool of `old_url` to `new_url`, where its server now runs, or
+    close it if `new_url` is None. If `new_url` already has a pool, the pool
+    of `old_url` is merged into it. Its sessions on the old server are
+    dropped. Return the pool now serving `new_url`, or None.
+    """
+    from core.webdriver.chromium import ChromiumDriver
+
+    with _pools_lock:
+        pool = _pools.pop(old_url, None)
+        if pool is None:
+            return None
+        existing = _pools.get(new_url) if new_url is not None else None
+        if new_url is not None and existing is None:
+            pool.factory = functools.partial(ChromiumDriver, new_url, **pool.driver_options)
+            _pools[new_url] = pool
+    if new_url is None:
+        pool.close()
+        pool.invalidate()
+        logger.info('Sessions pooled for %s closed', old_url)
+        return None
+    if existing is not None:
+        pool.merge_into(existing)
+        logger.info('Sessions pooled for %s merged into the pool of %s', old_url, new_url)
+        return existing
+    pool.invalidate()
+    logger.info('Sessions pooled for %s moved to %s', old_url, new_url)
+    return pool
+
+
+def close_all():
+    """
+    Close every pool returned by get_pool(), e.g. at the end of a run.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
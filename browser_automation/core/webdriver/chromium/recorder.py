@@ -0,0 +1,157 @@
+"""
+Record and replay of the traffic between a ChromiumDriver and its server.
+
+A RecordingController writes every command and its response to a log file
+(gzip compressed when the name ends with '.gz'), one JSON document per line.
+A ReplayController feeds those responses back without any server, so a task
+can be profiled or regression tested at full speed and production incidents
+can be replayed deterministically:
+
+    driver = ChromiumDriver(None, executor=ReplayController('session.jsonl.gz'))
+"""
+import copy
+import gzip
+import json
+import sys
+import threading
+import time
+
+from core.webdriver.chromium.controller import Controller
+from core.webdriver.chromium.instrumentation import NULL_SPAN, command_name
+from core.webdriver.exceptions import ReplayError
+
+
+FORMAT_VERSION = 1
+
+
+def open_log(filename, mode):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode + 't', encoding='utf-8')
+    return open(filename, mode, encoding='utf-8')
+
+
+class RecordingController(Controller):
+    """
+    A Controller that also writes each request/response pair to `filename`.
+    """
+    def __init__(self, server_url, filename):
+        super(RecordingController, self).__init__(server_url)
+        self.filename = filename
+        self._file = open_log(filename, 'w')
+        self._file.write(json.dumps({'version': FORMAT_VERSION}) + '\n')
+        self._lock = threading.Lock()
+
+    # Streamed values would be missing from the log, so ChromiumDriver falls
+    # back to execute() for them.
+    execute_stream = None
+
+    def execute(self, command, params, span=NULL_SPAN):
+        # Encoded parameters (see ChromeOptions) are logged decoded
+        sent = json.loads(params) if isinstance(params, str) else copy.deepcopy(params)
+        start = time.perf_counter()
+        try:
+            result = super(RecordingController, self).execute(command, params, span)
+        except Exception as e:
+            self._write(command, sent, start, error=e)
+            raise
+        self._write(command, sent, start, result=result)
+        return result
+
+    def _write(self, command, params, start, result=None, error=None):
+        entry = {
+            'c': command_name(command),
+            'm': command[0],
+            'u': command[1],
+            'p': params,
+            't': round(time.perf_counter() - start, 6),
+        }
+        if error is not None:
+            entry['e'] = str(error)
+            entry['x'] = '%s.%s' % (type(error).__module__, type(error).__qualname__)
+        else:
+            entry['r'] = result
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplayController(object):
+    """
+    Replays a log written by RecordingController.
+
+    `latency` is 'original' to wait as long as the recorded command took, or
+    'zero' to answer immediately. With `strict`, every command must match the
+    recorded one, except for the session id which changes on each run.
+    """
+    def __init__(self, filename, latency='zero', strict=True):
+        if latency not in ('original', 'zero'):
+            raise ValueError("latency must be 'original' or 'zero'")
+        self.filename = filename
+        self.latency = latency
+        self.strict = strict
+        with open_log(filename, 'r') as _file:
+            header = json.loads(_file.readline())
+            if header.get('version') != FORMAT_VERSION:
+                raise ReplayError('Unsupported replay log version: %s' % header)
+            self.entries = [json.loads(line) for line in _file if line.strip()]
+        self.position = 0
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            if self.position >= len(self.entries):
+                raise ReplayError('No more recorded responses in %s' % self.filename)
+            entry = self.entries[self.position]
+            self.position += 1
+        return entry
+
+    def _check(self, entry, command, params):
+        if (entry['m'], entry['u']) != tuple(command):
+            raise ReplayError('Expected %s but got %s (entry %d)' % (
+                entry['c'], command_name(command), self.position))
+        recorded = dict(entry['p'])
+        received = json.loads(params) if isinstance(params, str) else dict(params)
+        recorded.pop('sessionId', None)
+        received.pop('sessionId', None)
+        if recorded != json.loads(json.dumps(received)):
+            raise ReplayError('Parameters of %s differ from the recorded ones (entry %d)' % (
+                entry['c'], self.position))
+
+    def execute(self, command, params, span=NULL_SPAN):
+        entry = self._next()
+        if self.strict:
+            self._check(entry, command, params)
+        if self.latency == 'original':
+            with span.phase('server'):
+                time.sleep(entry['t'])
+        if 'e' in entry:
+            raise self._error(entry)
+        return copy.deepcopy(entry['r'])
+
+    @staticmethod
+    def _error(entry):
+        """
+        Return an exception of the recorded class with the recorded message,
+        or a ReplayError if the class isn't loaded or can't be built so.
+        """
+        cls = None
+        module, _, name = entry.get('x', '').rpartition('.')
+        if module in sys.modules:
+            # Only classes already imported, the log must not import modules
+            cls = getattr(sys.modules[module], name, None)
+        if isinstance(cls, type) and issubclass(cls, Exception):
+            try:
+                return cls(entry['e'])
+            except Exception:
+                pass
+        return ReplayError('Recorded error for %s: %s' % (entry['c'], entry['e']))
+
+    @property
+    def finished(self):
+        return self.position >= len(self.entries)
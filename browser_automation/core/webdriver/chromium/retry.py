@@ -0,0 +1,176 @@
+"""
+Retry policies and circuit breakers for the commands sent by a Controller.
+
+A command is retried after a transient failure (a connection error or an
+HTTP 5xx answer without a WebDriver error) only if its policy allows it. By
+default that's the case for GET requests and the POST requests that only
+look elements up; any other command may have had an effect on the browser
+before failing, so it's never sent twice.
+
+Every Controller talking to the same server shares a CircuitBreaker. After
+`failure_threshold` consecutive failures it opens and commands fail at once
+with CircuitOpen instead of each waiting for its own timeout. Once
+`reset_timeout` seconds have passed a single command is let through, and
+closes the breaker again if it succeeds. Only transport errors and 5xx
+answers count as failures; errors of the client itself, like an invalid
+response body or a failing sink, don't.
+"""
+import http.client as http_client
+import logging
+import random
+import threading
+import time
+
+from core.webdriver.chromium import constants as command
+from core.webdriver.exceptions import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+# Failures of the transport, after which the request may not have arrived
+TRANSIENT_ERRORS = (ConnectionError, http_client.HTTPException)
+
+# Statuses of the answers of a proxy or server that couldn't handle a request
+TRANSIENT_STATUSES = frozenset([500, 502, 503, 504])
+
+
+class RetryPolicy(object):
+    """
+    Try a command up to `attempts` times, waiting `backoff` seconds before
+    the first retry and `multiplier` times longer before each following one,
+    up to `max_backoff`. Waits are randomized by +-`jitter` of their length
+    so clients failing together don't retry together.
+    """
+    def __init__(self, attempts=1, backoff=0.05, multiplier=2, max_backoff=1.0,
+                 jitter=0.2):
+        if attempts < 1:
+            raise ValueError('attempts must be at least 1')
+        self.attempts = attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+    def delay(self, retry):
+        """
+        Return the seconds to wait before retry number `retry` (from 1).
+        """
+        delay = min(self.backoff * self.multiplier ** (retry - 1), self.max_backoff)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return delay
+
+    def __repr__(self):
+        return '<%s attempts=%d backoff=%s>' % (type(self).__name__, self.attempts, self.backoff)
+
+
+NO_RETRY = RetryPolicy()
+
+SAFE_RETRY = RetryPolicy(attempts=3)
+
+# POST commands without side effects
+LOOKUP_COMMANDS = frozenset([
+    command.FIND_ELEMENT, command.FIND_ELEMENTS,
+    command.FIND_CHILD_ELEMENT, command.FIND_CHILD_ELEMENTS,
+    command.GET_ACTIVE_ELEMENT,
+])
+
+
+class RetryPolicies(object):
+    """
+    The policy of each command: the one given for the command itself in
+    `commands`, else the one for its HTTP method in `methods`, else
+    `default`.
+    """
+    def __init__(self, methods=None, commands=None, default=NO_RETRY):
+        self.methods = dict(methods or {})
+        self.commands = dict(commands or {})
+        self.default = default
+
+    def policy_for(self, cmd):
+        policy = self.commands.get(cmd)
+        if policy is None:
+            policy = self.methods.get(cmd[0], self.default)
+        return policy
+
+
+DEFAULT_POLICIES = RetryPolicies(
+    methods={'GET': SAFE_RETRY},
+    commands={cmd: SAFE_RETRY for cmd in LOOKUP_COMMANDS})
+
+
+class CircuitBreaker(object):
+    """
+    Counts the consecutive failures of the commands sent to `endpoint`, see
+    the module documentation. Safe to share between threads.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, endpoint, failure_threshold=5, reset_timeout=30.0):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Raise CircuitOpen unless a command may be sent now.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if (self.state == self.OPEN and
+                    time.monotonic() - self._opened_at >= self.reset_timeout):
+                # Let this command through to probe the server
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpen('Circuit to %s is open after %d failures' % (
+                self.endpoint, self.failures))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info('Circuit to %s closed', self.endpoint)
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if (self.state == self.HALF_OPEN or
+                    self.failures >= self.failure_threshold):
+                if self.state != self.OPEN:
+                    logger.warning('Circuit to %s opened after %d failures',
+                                   self.endpoint, self.failures)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def record_inconclusive(self):
+        """
+        End a command that failed without telling anything about the server,
+        e.g. interrupted or failed locally. If it was the probe of a half-open
+        breaker, the next command probes instead.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def reset(self):
+        self.record_success()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint):
+    """
+    Return the CircuitBreaker shared by all the clients of `endpoint`.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
@@ -0,0 +1,215 @@
+"""
+Streaming of large string values (screenshots, page sources) from a command
+response to a file.
+
+read_response() parses the JSON response while it's read from the socket and
+hands the top level "value" string to a sink in pieces, so neither the
+response body nor the decoded value are ever held in memory as a whole.
+"""
+import binascii
+import bz2
+import codecs
+import gzip
+import json
+import lzma
+import os
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+COMPRESSORS = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+
+EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+}
+
+# Characters ending a run of plain characters inside a JSON string
+SPECIAL = re.compile(r'["\\]')
+
+
+def _is_high_surrogate(escape):
+    return escape[1] == 'u' and 0xd800 <= int(escape[2:6], 16) <= 0xdbff
+
+
+def _split_string(text):
+    """
+    Return (raw, end) where `raw` is the longest prefix of `text`, the inside
+    of a JSON string, that can be decoded on its own, and `end` the index of
+    the closing quote or None if the string goes on.
+    """
+    index = 0
+    length = len(text)
+    while True:
+        match = SPECIAL.search(text, index)
+        if match is None:
+            return text, None
+        index = match.start()
+        if text[index] == '"':
+            return text[:index], index
+        # An escape sequence, which must not be split
+        if index + 1 >= length:
+            return text[:index], None
+        if text[index + 1] != 'u':
+            index += 2
+            continue
+        if index + 6 > length:
+            return text[:index], None
+        if _is_high_surrogate(text[index:index + 6]):
+            if index + 12 > length:
+                return text[:index], None
+            index += 12
+        else:
+            index += 6
+
+
+def _decode_string(raw):
+    if '\\' not in raw:
+        return raw
+    return json.loads('"%s"' % raw, strict=False)
+
+
+def read_response(fileobj, sink, chunk_size=CHUNK_SIZE):
+    """
+    Parse the JSON object read from `fileobj`. If its top level "value" is a
+    string, it's passed decoded to `sink` in pieces and replaced by None in
+    the returned object; any other value is parsed as usual.
+
+    Return the object and the number of bytes read.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    head = []       # text before the value, or the whole body
+    tail = []       # text after a streamed value
+    pending = ''    # undecoded part of the value
+    state = 'head'
+    depth = 0
+    in_string = escaped = False
+    key = []
+    last_key = None
+    size = 0
+
+    while True:
+        data = fileobj.read(chunk_size)
+        size += len(data)
+        text = decoder.decode(data, final=not data)
+
+        if state in ('head', 'colon'):
+            for index, char in enumerate(text):
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                        last_key = ''.join(key)
+                    elif depth == 1:
+                        key.append(char)
+                elif char == '"':
+                    if state == 'colon':
+                        state = 'value'
+                        head.append(text[:index] + 'null')
+                        text = text[index + 1:]
+                        break
+                    in_string = True
+                    key = []
+                elif char in '{[':
+                    if state == 'colon':
+                        # Not a string, parse everything as usual
+                        state = 'plain'
+                        break
+                    depth += 1
+                elif char in '}]':
+                    depth -= 1
+                elif char == ':' and depth == 1 and last_key == 'value':
+                    state = 'colon'
+                elif state == 'colon' and not char.isspace():
+                    state = 'plain'
+                    break
+            else:
+                head.append(text)
+                text = ''
+            if state == 'plain':
+                head.append(text)
+                text = ''
+
+        if state == 'value':
+            pending += text
+            raw, end = _split_string(pending)
+            if raw:
+                sink(_decode_string(raw))
+            if end is None:
+                pending = pending[len(raw):]
+            else:
+                tail.append(pending[end + 1:])
+                pending = ''
+                state = 'tail'
+        elif state == 'tail':
+            tail.append(text)
+        elif state == 'plain':
+            head.append(text)
+
+        if not data:
+            break
+
+    if state == 'value':
+        raise ValueError('Unterminated string value in response')
+    return json.loads(''.join(head) + ''.join(tail)), size
+
+
+class TextSink(object):
+    """
+    Writes the pieces of a text value to a binary file.
+    """
+    def __init__(self, fileobj, encoding='utf-8'):
+        self.fileobj = fileobj
+        self.encoding = encoding
+
+    def __call__(self, text):
+        self.fileobj.write(text.encode(self.encoding))
+
+    def close(self):
+        pass
+
+
+class Base64Sink(object):
+    """
+    Decodes the pieces of a base64 value into a binary file, in groups of
+    four characters so no piece depends on the next one.
+    """
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self._rest = ''
+
+    def __call__(self, text):
+        text = self._rest + text
+        cut = len(text) - len(text) % 4
+        self._rest = text[cut:]
+        if cut:
+            self.fileobj.write(binascii.a2b_base64(text[:cut]))
+
+    def close(self):
+        if self._rest:
+            self.fileobj.write(binascii.a2b_base64(self._rest))
+            self._rest = ''
+
+
+def open_output(path, compress=None):
+    """
+    Open `path` for binary writing. `compress` is one of COMPRESSORS or True
+    for gzip; when it's None it's guessed from the extension of `path`.
+    """
+    if compress is None:
+        compress = EXTENSIONS.get(os.path.splitext(path)[1])
+    elif compress is True:
+        compress = 'gzip'
+    if not compress:
+        return open(path, 'wb')
+    if compress not in COMPRESSORS:
+        raise ValueError('Unknown compression %r' % compress)
+    return COMPRESSORS[compress](path, 'wb')
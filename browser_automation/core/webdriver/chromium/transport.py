@@ -0,0 +1,110 @@
+"""
+Transports the Controller sends its HTTP requests over.
+
+The transport is chosen by the scheme of the server URL:
+
+    http://127.0.0.1:9515           TCP
+    unix:///run/chromedriver.sock   AF_UNIX socket at that path
+
+A Unix socket skips the TCP stack on same-host setups and uses no port per
+connection. chromedriver only listens on TCP, so it's reached through a
+core.services.proxy.UnixSocketProxy, whose relay costs more than the socket
+saves: compare ``python -m benchmarks.bench_driver --transport proxy`` with
+``--transport tcp``. Other schemes can be added with register_transport().
+"""
+import http.client as http_client
+import socket
+from urllib.parse import unquote, urlsplit
+
+
+# Ports of the server URLs that don't give one
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class TcpTransport(object):
+    """
+    HTTP over a TCP connection to `host`:`port`.
+    """
+    def __init__(self, host, port):
+        # Skip the resolution of 'localhost', which may also try IPv6 first
+        self.host = '127.0.0.1' if host in (None, '', 'localhost') else host
+        self.port = port
+
+    @classmethod
+    def from_url(cls, parts):
+        port = parts.port
+        if port is None:
+            port = DEFAULT_PORTS.get(parts.scheme, 80)
+        return cls(parts.hostname, port)
+
+    @property
+    def endpoint(self):
+        return '%s:%d' % (self.host, self.port)
+
+    def connect(self, timeout):
+        return http_client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+
+class UnixHTTPConnection(http_client.HTTPConnection):
+    """
+    An HTTPConnection over the Unix socket at `path`.
+    """
+    def __init__(self, path, timeout=None):
+        super(UnixHTTPConnection, self).__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class UnixTransport(object):
+    """
+    HTTP over the Unix socket at `path`.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def from_url(cls, parts):
+        # unix:///path, or unix://%2Fpath with the path quoted as the host
+        return cls(unquote(parts.netloc) + parts.path if parts.netloc else parts.path)
+
+    @property
+    def endpoint(self):
+        return 'unix:%s' % self.path
+
+    def connect(self, timeout):
+        return UnixHTTPConnection(self.path, timeout=timeout)
+
+
+TRANSPORTS = {
+    'http': TcpTransport.from_url,
+    'unix': UnixTransport.from_url,
+}
+
+
+def register_transport(scheme, factory):
+    """
+    Use `factory`, called with the urlsplit() parts of the server URL, to
+    create the transports of the URLs with `scheme`.
+    """
+    TRANSPORTS[scheme] = factory
+
+
+def transport_for(server_url):
+    """
+    Return the transport to the server at `server_url`.
+    """
+    parts = urlsplit(server_url)
+    factory = TRANSPORTS.get(parts.scheme)
+    if factory is None:
+        raise ValueError('Unsupported server URL %r, expected one of the schemes %s'
+                         % (server_url, ', '.join(sorted(TRANSPORTS))))
+    return factory(parts)
@@ -1,27 +1,66 @@
 from core.webdriver.chromium import constants as command
+from core.webdriver.chromium import keys
+from core.webdriver.exceptions import StaleElementReference
 
 
 class WebElement(object):
     """
     Represents an HTML element.
+
+    Elements returned by find_element(s) remember the locator they came from
+    (parent, strategy, target and index), so a command that fails because the
+    element went stale re-resolves it once and is retried.
+
+    Instances are interned per driver by element id (see
+    ChromiumDriver._element()), so every reference to the same element in the
+    responses of a session is the same object.
     """
+    __slots__ = ('_chromedriver', '_id', '_locator', '__weakref__')
+
     def __init__(self, chromedriver, id_):
         self._chromedriver = chromedriver
         self._id = id_
+        self._locator = None
 
     def _execute(self, cmd, params=None):
         if params is None:
             params = {}
-        params['id'] = self._id;
-        return self._chromedriver.execute_command(cmd, params)
+        try:
+            return self._chromedriver.execute_command(cmd, dict(params, id=self._id))
+        except StaleElementReference:
+            if self._locator is None:
+                raise
+            self._resolve()
+        return self._chromedriver.execute_command(cmd, dict(params, id=self._id))
+
+    def _resolve(self):
+        """
+        Find the element again using its locator and take the new id.
+        """
+        parent, strategy, target, index = self._locator
+        params = {'using': strategy, 'value': target}
+        if parent is self._chromedriver:
+            one, many = command.FIND_ELEMENT, command.FIND_ELEMENTS
+            execute = parent.execute_command
+        else:
+            one, many = command.FIND_CHILD_ELEMENT, command.FIND_CHILD_ELEMENTS
+            execute = parent._execute
+
+        if index is None:
+            fresh = execute(one, params)
+        else:
+            elements = execute(many, params)
+            if index >= len(elements):
+                raise StaleElementReference(
+                    'Element %d of %s %r is no longer in the page' % (index, strategy, target))
+            fresh = elements[index]
+        self._chromedriver._rebind_element(self, fresh._id)
 
     def find_element(self, strategy, target):
-        return self._execute(
-            command.FIND_CHILD_ELEMENT, {'using': strategy, 'value': target})
+        return self._chromedriver._lookup(self, strategy, target)
 
     def find_elements(self, strategy, target):
-        return self._execute(
-            command.FIND_CHILD_ELEMENTS, {'using': strategy, 'value': target})
+        return self._chromedriver._lookup(self, strategy, target, many=True)
 
     def get_text(self):
         return self._execute(command.GET_ELEMENT_TEXT)
@@ -47,14 +86,27 @@ class WebElement(object):
     def clear(self):
         self._execute(command.CLEAR_ELEMENT)
 
-    def send_keys(self, *values):
-        typing = []
-        for value in values:
-          if isinstance(value, int):
-            value = str(value)
-          for i in range(len(value)):
-            typing.append(value[i])
-        self._execute(command.SEND_KEYS_TO_ELEMENT, {'value': typing})
+    def send_keys(self, *values, via_script=False):
+        """
+        Type `values` into the element. With `via_script` the text is
+        appended to the value of the field in a single script instead, firing
+        input and change events but no key events.
+        """
+        text = keys.encode_keys(values)
+        if via_script:
+            self.set_value(text, append=True)
+            return
+        w3c = self._chromedriver.w3c_compliant
+        for chunk in keys.chunk_keys(text):
+            self._execute(command.SEND_KEYS_TO_ELEMENT, keys.keys_params(chunk, w3c))
+
+    def set_value(self, value, append=False):
+        """
+        Set the value of the form field with a script, see
+        keys.SET_VALUE_SCRIPT.
+        """
+        self._chromedriver.execute_script(
+            keys.SET_VALUE_SCRIPT, self, keys.encode_keys([value]), append)
 
     def get_location(self):
         return self._execute(command.GET_ELEMENT_LOCATION)
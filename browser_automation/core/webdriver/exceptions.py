@@ -75,6 +75,14 @@ class Timeout(WebDriverException):
     pass
 
 
+class DeadlineExceeded(Timeout):
+    """
+    Thrown when a command can't complete before the deadline of the call
+    or of the enclosing deadline scope.
+    """
+    pass
+
+
 class NoSuchWindow(WebDriverException):
     """
     Thrown when window target to be switched doesn't exist.
@@ -140,6 +148,39 @@ class UnknownError(WebDriverException):
     pass
 
 
+class PoolTimeout(WebDriverException):
+    """
+    Thrown when no pooled session becomes available in time.
+    """
+    pass
+
+
+class CircuitOpen(WebDriverException):
+    """
+    Thrown instead of sending a command to a server that keeps failing.
+    """
+    pass
+
+
+class ReplayError(WebDriverException):
+    """
+    Thrown when a replayed session runs out of recorded responses or
+    receives a command that differs from the recorded one.
+    """
+    pass
+
+
+class FormFillError(WebDriverException):
+    """
+    Thrown when some fields of a form could not be filled. `errors` maps
+    each of them, as given to fill_form(), to the reason.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        super(FormFillError, self).__init__('%d field(s) could not be filled: %s' % (
+            len(errors), '; '.join('%s: %s' % item for item in errors.items())))
+
+
 def exception_for_legacy_response(response):
     exception_class_map = {
         6: NoSuchSession,
@@ -0,0 +1,54 @@
+from conf import LazyConfig
+from conf.config import Config
+from conf.snapshot import ConfigSnapshot
+
+
+class TestLazyConfig:
+
+    def configured(self, **defaults):
+        lazy = LazyConfig()
+        lazy._wrapped = Config(defaults=defaults)
+        return lazy
+
+    def test_lookups_are_cached(self):
+        lazy = self.configured(DEBUG=True)
+        assert lazy.debug is True
+        assert lazy.__dict__['debug'] is True
+        assert lazy['debug'] is True
+
+    def test_setitem_invalidates_cache(self):
+        lazy = self.configured(DEBUG=True)
+        assert lazy.debug is True
+        lazy['debug'] = False
+        assert lazy.debug is False
+        assert lazy['debug'] is False
+
+    def test_reload_invalidates_cache(self, tmpdir):
+        lazy = self.configured(DEBUG=True)
+        assert lazy.debug is True
+        path = tmpdir.join('local.json')
+        path.write('{"debug": false}')
+        lazy._wrapped.reload(str(path))
+        assert lazy.debug is False
+
+    def test_mutable_values_are_not_cached(self):
+        lazy = LazyConfig()
+        lazy.use_snapshot(ConfigSnapshot({'logging': {'version': 1}}))
+        lazy.logging['version'] = 2
+        assert 'logging' not in lazy.__dict__
+        assert lazy.logging == {'version': 1}
+
+    def test_direct_write_invalidates_cache(self):
+        lazy = self.configured(DEBUG=True)
+        assert lazy.debug is True
+        lazy._wrapped['debug'] = False
+        assert lazy.debug is False
+        lazy._wrapped.clear()
+        assert 'debug' not in lazy.__dict__
+
+    def test_callback_registered_once(self):
+        lazy = self.configured(DEBUG=True)
+        config = lazy._wrapped
+        lazy._wrapped = config
+        lazy._wrapped = config
+        assert config._Config__write_callbacks.count(lazy._uncache) == 1
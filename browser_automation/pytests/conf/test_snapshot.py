@@ -0,0 +1,59 @@
+import logging.config
+import pickle
+import pytest
+
+from conf import LazyConfig
+from conf.config import Config
+from conf.snapshot import ConfigSnapshot
+
+
+class TestConfigSnapshot:
+
+    def test_read_only(self):
+        snapshot = ConfigSnapshot({'debug': True})
+        assert snapshot['debug'] is True
+        assert snapshot.get('missing', 1) == 1
+        with pytest.raises(TypeError):
+            snapshot['debug'] = False
+        with pytest.raises(TypeError):
+            del snapshot['debug']
+        with pytest.raises(TypeError):
+            snapshot.debug = False
+
+    def test_nested_values_are_plain_copies(self):
+        snapshot = ConfigSnapshot({'logging': {'handlers': ['console']}, 'tags': {'a'}})
+        logging_config = snapshot['logging']
+        assert type(logging_config) is dict
+        assert type(logging_config['handlers']) is list
+        assert type(snapshot.get('tags')) is set
+        logging_config['handlers'].append('file')
+        assert snapshot['logging'] == {'handlers': ['console']}
+
+    def test_dict_config(self):
+        snapshot = ConfigSnapshot({'logging': {
+            'version': 1,
+            'disable_existing_loggers': False,
+            'handlers': {'null': {'class': 'logging.NullHandler'}},
+            'loggers': {'snapshot-test': {'handlers': ['null']}},
+        }})
+        logging.config.dictConfig(snapshot['logging'])
+
+    def test_dumps_loads(self):
+        snapshot = ConfigSnapshot({'service_port': '4444', 'logging': {'Version': 1}})
+        assert ConfigSnapshot.loads(snapshot.dumps()) == snapshot
+        assert pickle.loads(pickle.dumps(snapshot)) == snapshot
+
+    def test_config_snapshot(self):
+        config = Config(defaults={'DEBUG': True, 'SERVICE_HOST': 'localhost'})
+        snapshot = config.snapshot()
+        config['debug'] = False
+        assert snapshot['debug'] is True
+        assert snapshot['service_host'] == 'localhost'
+
+    def test_lazy_config_use_snapshot(self):
+        lazy = LazyConfig()
+        lazy.use_snapshot(ConfigSnapshot({'debug': True}).dumps())
+        assert lazy.configured
+        assert lazy['debug'] is True
+        assert lazy.get('missing', None) is None
+        assert lazy.snapshot() == {'debug': True}
@@ -0,0 +1,93 @@
+import json
+import time
+
+from conf.config import Config
+from conf.watcher import ConfigWatcher, PollingBackend, get_backend
+
+
+def write_config(path, content):
+    with open(str(path), 'w') as _file:
+        json.dump({'format': 1, 'file': 1}, _file)
+        json.dump(content, _file)
+
+
+class TestConfigReload:
+
+    def test_reload_applies_changed_keys(self, tmpdir):
+        path = tmpdir.join('local.json')
+        config = Config(defaults={'DEBUG': True, 'SERVICE_HOST': 'localhost'})
+        calls = []
+        config.register_set_function('debug', lambda k, v: calls.append((k, v)), False)
+        config.register_set_function('service_host', lambda k, v: calls.append((k, v)), False)
+
+        write_config(path, {'debug': True, 'service_host': 'example.com'})
+        assert config.reload(str(path)) == ['service_host']
+        assert config['service_host'] == 'example.com'
+        assert calls == [('service_host', 'example.com')]
+
+    def test_reload_calls_change_callbacks(self, tmpdir):
+        path = tmpdir.join('local.json')
+        config = Config(defaults={'DEBUG': True})
+        changes = []
+        config.register_change_callback(lambda k, v: changes.append((k, v)))
+
+        write_config(path, {'debug': False})
+        config.reload(str(path))
+        assert changes == [('debug', False)]
+
+    def test_reload_ignores_type_changes(self, tmpdir):
+        path = tmpdir.join('local.json')
+        config = Config(defaults={'DEBUG': True})
+
+        write_config(path, {'debug': 'yes'})
+        assert config.reload(str(path)) == []
+        assert config['debug'] is True
+
+
+    def test_reload_handles_removed_keys(self, tmpdir):
+        path = tmpdir.join('local.json')
+        config = Config(defaults={'DEBUG': True})
+        changes = []
+        config.register_change_callback(lambda k, v: changes.append((k, v)))
+
+        write_config(path, {'debug': False, 'extra': 1})
+        config.reload(str(path))
+        write_config(path, {})
+        assert config.reload(str(path)) == ['debug', 'extra']
+        assert config['debug'] is True
+        assert 'extra' not in config
+        assert changes[2:] == [('debug', True), ('extra', None)]
+
+
+class TestConfigWatcher:
+
+    def test_backend(self, tmpdir):
+        path = tmpdir.join('local.json')
+        write_config(path, {})
+        backend = get_backend(str(path), interval=0.01)
+        try:
+            assert not backend.wait(0.05)
+            write_config(path, {'debug': False})
+            assert backend.wait(1)
+        finally:
+            backend.close()
+
+    def test_debounced_reload(self, tmpdir):
+        path = tmpdir.join('local.json')
+        write_config(path, {'debug': True})
+        config = Config(defaults={'DEBUG': True})
+        reloads = []
+        config.register_change_callback(lambda k, v: reloads.append(v))
+
+        watcher = ConfigWatcher(config, str(path), debounce=0.1,
+                                backend=PollingBackend(str(path), interval=0.01))
+        watcher.start()
+        try:
+            for value in range(5):
+                write_config(path, {'debug': True, 'retries': value})
+                time.sleep(0.01)
+            time.sleep(0.5)
+        finally:
+            watcher.stop()
+            watcher.join()
+        assert reloads == [4]
@@ -0,0 +1,39 @@
+import pytest
+
+from core.services.fakedriver import FakeChromeDriver
+
+
+@pytest.fixture
+def fake_options():
+    """
+    Keyword arguments of the FakeChromeDriver started by `fake`. Override it
+    in a module to change the size of the fake pages.
+    """
+    return {}
+
+
+@pytest.fixture
+def fake(fake_options):
+    """
+    A running FakeChromeDriver. Modules add their canned responses with a
+    fixture of the same name requesting this one, or with `record`.
+    """
+    with FakeChromeDriver(**fake_options) as server:
+        server.sent = []
+        yield server
+
+
+@pytest.fixture
+def record(fake):
+    """
+    Return a function answering the commands `names` of `fake` by appending
+    `value(params)`, or the parameters themselves, to fake.sent and returning
+    `result()`, or None.
+    """
+    def record(*names, value=None, result=None):
+        def response(params, state):
+            fake.sent.append(params if value is None else value(params))
+            return result() if result is not None else None
+        for name in names:
+            fake.state.responses[name] = response
+    return record
@@ -0,0 +1,113 @@
+import logging
+import logging.config
+import os
+import time
+
+from core.logging.handlers import BatchFileHandler, QueueHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def make_record(msg):
+    return logging.LogRecord('test', logging.INFO, __file__, 1, msg, None, None)
+
+
+class TestQueueHandler:
+
+    def test_records_reach_targets(self):
+        target = ListHandler()
+        handler = QueueHandler([target])
+        for i in range(10):
+            handler.handle(make_record('message %d' % i))
+        handler.close()
+        assert target.messages == ['message %d' % i for i in range(10)]
+
+    def test_drop_on_overflow(self):
+        target = ListHandler()
+        handler = QueueHandler([target], queue_size=5)
+        handler.listener.stop()
+        for i in range(8):
+            handler.handle(make_record('message %d' % i))
+        assert handler.dropped == 3
+        handler.listener = None
+        handler.close()
+
+    def test_dict_config(self, tmpdir):
+        filename = str(tmpdir.join('debug.log'))
+        logging.config.dictConfig({
+            'version': 1,
+            'disable_existing_loggers': False,
+            'handlers': {
+                'file': {
+                    'class': 'core.logging.handlers.BatchFileHandler',
+                    'filename': filename,
+                    'delay': True,
+                },
+                'queue': {
+                    '()': 'core.logging.handlers.QueueHandler',
+                    'handlers': ['file'],
+                },
+            },
+            'loggers': {
+                'pytests.queue': {'handlers': ['queue'], 'level': 'INFO'},
+            },
+        })
+        logger = logging.getLogger('pytests.queue')
+        logger.info('hello')
+        handler = logger.handlers[0]
+        file_handler = handler.listener.handlers[0]
+        logger.removeHandler(handler)
+        handler.close()
+        file_handler.close()
+        with open(filename) as _file:
+            assert _file.read() == 'hello\n'
+
+
+class TestBatchFileHandler:
+
+    def test_batches_writes(self, tmpdir):
+        filename = str(tmpdir.join('debug.log'))
+        handler = BatchFileHandler(filename, delay=True, capacity=3, flush_interval=60)
+        handler.handle(make_record('one'))
+        handler.handle(make_record('two'))
+        assert not os.path.exists(filename)
+        handler.handle(make_record('three'))
+        with open(filename) as _file:
+            assert _file.read() == 'one\ntwo\nthree\n'
+        handler.handle(make_record('four'))
+        handler.close()
+        with open(filename) as _file:
+            assert _file.read().endswith('four\n')
+
+    def test_flushes_after_interval(self, tmpdir):
+        filename = str(tmpdir.join('debug.log'))
+        handler = BatchFileHandler(filename, delay=True, capacity=100, flush_interval=0.05)
+        handler.handle(make_record('quiet'))
+        deadline = time.monotonic() + 5
+        while not os.path.exists(filename) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with open(filename) as _file:
+            assert _file.read() == 'quiet\n'
+        handler.close()
+
+    def test_failed_write_keeps_listener_alive(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(logging, 'raiseExceptions', False)
+        failing = BatchFileHandler(str(tmpdir.join('missing', 'x.log')), delay=True,
+                                   capacity=2)
+        target = ListHandler()
+        handler = QueueHandler([failing, target])
+        for i in range(4):
+            handler.handle(make_record('message %d' % i))
+        handler.queue.join()
+        assert handler.listener._thread.is_alive()
+        handler.close()
+        assert target.messages == ['message %d' % i for i in range(4)]
+        assert failing.buffer == []
+        failing.close()
@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from core.services.fakedriver import FakeChromeDriver
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium.webelement import WebElement
+from core.webdriver.exceptions import NoSuchElement, UnknownError
+
+
+class TestFakeChromeDriver:
+
+    def test_session(self):
+        with FakeChromeDriver() as fake:
+            driver = ChromiumDriver(fake.url)
+            assert driver.capabilities['browserName'] == 'chrome'
+            assert driver.get_title() == 'Fake page'
+            driver.quit()
+            assert fake.state.sessions == {}
+            assert fake.state.requests == {'NEW_SESSION': 1, 'GET_TITLE': 1, 'QUIT': 1}
+
+    def test_concurrent_sessions(self):
+        with FakeChromeDriver() as fake:
+            with ThreadPoolExecutor(8) as executor:
+                drivers = list(executor.map(lambda _: ChromiumDriver(fake.url), range(16)))
+            assert len(fake.state.sessions) == 16
+            addresses = set(driver.capabilities['goog:chromeOptions']['debuggerAddress']
+                            for driver in drivers)
+            assert len(addresses) == 16
+            with ThreadPoolExecutor(8) as executor:
+                list(executor.map(lambda driver: driver.quit(), drivers))
+            assert fake.state.sessions == {}
+
+    def test_elements(self):
+        with FakeChromeDriver(elements_count=3) as fake:
+            driver = ChromiumDriver(fake.url)
+            element = driver.find_element('css selector', 'a')
+            assert isinstance(element, WebElement)
+            children = element.find_elements('css selector', 'span')
+            assert len(children) == 3
+            assert len(set(child._id for child in children)) == 3
+
+    def test_payload_size(self):
+        with FakeChromeDriver(page_source_size=5000) as fake:
+            driver = ChromiumDriver(fake.url)
+            assert len(driver.get_page_source()) == 5000
+
+    def test_custom_responses(self):
+        responses = {'EXECUTE_SCRIPT': lambda params, state: params['args'][0] * 2}
+        with FakeChromeDriver(responses=responses) as fake:
+            driver = ChromiumDriver(fake.url)
+            assert driver.execute_script('return arguments[0] * 2', 21) == 42
+
+    def test_error_injection(self):
+        with FakeChromeDriver(errors={'FIND_ELEMENT': 7}, error_rate=1,
+                              error_status=13) as fake:
+            fake.state.error_rate = 0
+            driver = ChromiumDriver(fake.url)
+            with pytest.raises(NoSuchElement):
+                driver.find_element('css selector', 'a')
+            fake.state.error_rate = 1
+            with pytest.raises(UnknownError):
+                driver.get_title()
+
+    def test_latency(self):
+        with FakeChromeDriver(latency=lambda name: 0.05 if name == 'GET_TITLE' else 0) as fake:
+            driver = ChromiumDriver(fake.url)
+            start = time.perf_counter()
+            driver.get_title()
+            assert time.perf_counter() - start >= 0.05
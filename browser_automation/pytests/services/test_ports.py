@@ -0,0 +1,104 @@
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from core.services import connection
+from core.services.connection import LiveServerThread
+from core.services.ports import NoFreePort, PortAllocator
+
+
+@pytest.fixture
+def lock_dir(tmpdir):
+    return str(tmpdir.join('ports'))
+
+
+def free_ports(count):
+    sockets = [socket.socket() for _ in range(count)]
+    for sock in sockets:
+        sock.bind(('127.0.0.1', 0))
+    ports = [sock.getsockname()[1] for sock in sockets]
+    for sock in sockets:
+        sock.close()
+    return ports
+
+
+class TestPortAllocator:
+
+    def test_reservations_are_exclusive(self, lock_dir):
+        ports = free_ports(2)
+        allocator = PortAllocator('localhost', ports, lock_dir)
+        first = allocator.allocate()
+        second = PortAllocator('localhost', ports, lock_dir).allocate()
+        assert {first.port, second.port} == set(ports)
+        with pytest.raises(NoFreePort):
+            allocator.allocate()
+        first.release()
+        assert allocator.allocate().port == first.port
+
+    def test_ports_in_use_are_skipped(self, lock_dir):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        try:
+            busy = listener.getsockname()[1]
+            assert PortAllocator('127.0.0.1', [busy], lock_dir).reserve(busy) is None
+        finally:
+            listener.close()
+
+    def test_lock_files_are_shared_between_users(self, lock_dir):
+        reservation = PortAllocator('127.0.0.1', free_ports(1), lock_dir).allocate()
+        assert stat.S_IMODE(os.stat(lock_dir).st_mode) == 0o1777
+        path = os.path.join(lock_dir, '%d.lock' % reservation.port)
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o666
+
+    def test_unwritable_lock_file_is_a_taken_port(self, lock_dir, monkeypatch):
+        ports = free_ports(2)
+        allocator = PortAllocator('127.0.0.1', ports, lock_dir)
+        other_users = os.path.join(lock_dir, '%d.lock' % ports[0])
+        os_open = os.open
+
+        def open_(path, *args):
+            if path == other_users:
+                raise PermissionError(13, 'Permission denied', path)
+            return os_open(path, *args)
+        monkeypatch.setattr(os, 'open', open_)
+        assert allocator.reserve(ports[0]) is None
+        assert allocator.allocate().port == ports[1]
+
+    def test_ephemeral(self, lock_dir):
+        reservation = PortAllocator('127.0.0.1', [0], lock_dir).allocate()
+        assert reservation.port > 0
+        assert PortAllocator('127.0.0.1', None, lock_dir).allocate().port != reservation.port
+
+    def test_parallel_workers(self, lock_dir):
+        ports = free_ports(8)
+        reservations = []
+
+        def worker():
+            reservations.append(PortAllocator('127.0.0.1', ports, lock_dir).allocate())
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(reservation.port for reservation in reservations) == sorted(ports)
+
+
+class TestLiveServerThread:
+
+    def test_port_is_reserved_until_terminate(self, lock_dir, monkeypatch):
+        monkeypatch.setattr(connection, 'config', {'service_port_lock_dir': lock_dir})
+        monkeypatch.setattr(LiveServerThread, '_create_server', lambda self, port: None)
+        ports = free_ports(1)
+        servers = [LiveServerThread('localhost', ports) for _ in range(2)]
+        for server in servers:
+            server.start()
+            server.join()
+        assert servers[0].port == ports[0]
+        assert isinstance(servers[1].error, NoFreePort)
+        servers[0].terminate()
+        assert servers[0].reservation is None
+        assert PortAllocator('localhost', ports, lock_dir).allocate().port == ports[0]
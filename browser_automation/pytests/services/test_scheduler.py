@@ -0,0 +1,76 @@
+import threading
+import pytest
+
+from core.services.fakedriver import FakeChromeDriver
+from core.services.scheduler import ServiceScheduler
+from core.webdriver.exceptions import PoolTimeout
+
+
+class FakeServerThread(threading.Thread):
+    """
+    Mimics LiveServerThread with an in-process fake chromedriver.
+    """
+    started = []
+
+    def __init__(self, host, possible_ports):
+        super(FakeServerThread, self).__init__()
+        self.host = host
+        self.port = None
+        self.possible_ports = possible_ports
+        self.is_ready = threading.Event()
+        self.error = None
+        self.fake = None
+
+    def run(self):
+        self.fake = FakeChromeDriver(self.host, self.possible_ports[0]).start()
+        self.port = self.fake.port
+        self.started.append(self)
+        self.is_ready.set()
+
+    def get_url(self):
+        return self.fake.url
+
+    def is_running(self):
+        return True
+
+    def terminate(self):
+        self.fake.stop()
+
+
+@pytest.fixture
+def scheduler():
+    FakeServerThread.started = []
+    scheduler = ServiceScheduler('127.0.0.1:0', max_processes=2, sessions_per_process=2,
+                                 server_factory=FakeServerThread)
+    yield scheduler
+    scheduler.close()
+
+
+class TestServiceScheduler:
+
+    def test_sessions_share_processes(self, scheduler):
+        drivers = [scheduler.create_session() for _ in range(4)]
+        assert len(scheduler.services) == 2
+        assert [service.sessions for service in scheduler.services] == [2, 2]
+        for server in FakeServerThread.started:
+            assert server.fake.state.requests['NEW_SESSION'] == 2
+        for driver in drivers:
+            driver.quit()
+        assert [service.sessions for service in scheduler.services] == [0, 0]
+
+    def test_least_loaded(self, scheduler):
+        first = scheduler.acquire()
+        second = scheduler.acquire()
+        third = scheduler.acquire()
+        assert first == second
+        assert third != first
+        scheduler.release(first)
+        scheduler.release(second)
+        assert scheduler.acquire() == first
+        assert len(scheduler.services) == 2
+
+    def test_capacity(self, scheduler):
+        for _ in range(4):
+            scheduler.acquire()
+        with pytest.raises(PoolTimeout):
+            scheduler.acquire(timeout=0.05)
@@ -0,0 +1,194 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from core.services import supervisor as supervisor_module
+from core.services.fakedriver import FakeChromeDriver
+from core.services.scheduler import ServiceScheduler
+from core.services.supervisor import ServiceSupervisor
+from core.webdriver.chromium import pool
+
+
+class FakeProcess(object):
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+
+class FakeServerThread(threading.Thread):
+    """
+    Mimics LiveServerThread with an in-process fake chromedriver and a fake
+    process whose exit code can be set.
+    """
+    def __init__(self, host, possible_ports):
+        super(FakeServerThread, self).__init__()
+        self.host = host
+        self.port = None
+        self.possible_ports = possible_ports
+        self.is_ready = threading.Event()
+        self.error = None
+        self.fake = None
+        self.process = FakeProcess()
+
+    def run(self):
+        self.fake = FakeChromeDriver(self.host, self.possible_ports[0]).start()
+        self.port = self.fake.port
+        self.is_ready.set()
+
+    def get_url(self):
+        return self.fake.url
+
+    def is_running(self):
+        return True
+
+    def terminate(self):
+        if self.fake._thread is not None:
+            self.fake.stop()
+
+
+@pytest.fixture(autouse=True)
+def pools(monkeypatch):
+    monkeypatch.setattr(pool, '_pools', {})
+    return pool._pools
+
+
+@pytest.fixture
+def supervisor():
+    supervisor = ServiceSupervisor(heartbeat_timeout=0.5, max_missed_heartbeats=2,
+                                   backoff=10, server_factory=FakeServerThread)
+    supervisor.restarts = []
+    supervisor.add_listener(lambda old, new: supervisor.restarts.append((old, new)))
+    yield supervisor
+    for server_thread in supervisor.server_threads:
+        server_thread.terminate()
+
+
+def start(supervisor, ports=(0,)):
+    server_thread = supervisor_module.start_server_thread(
+        FakeServerThread('127.0.0.1', list(ports)), 1)
+    supervisor.watch(server_thread)
+    return server_thread
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestSupervisor:
+
+    def test_healthy(self, supervisor):
+        start(supervisor)
+        supervisor.check()
+        assert supervisor.restarts == []
+
+    def test_crash_rehomes_pooled_sessions(self, supervisor, pools):
+        server_thread = start(supervisor)
+        old_url = server_thread.get_url()
+        sessions = pool.get_pool(old_url)
+        leased = sessions.acquire()
+
+        server_thread.process.returncode = -11
+        supervisor.check()
+        [(old, new)] = supervisor.restarts
+        assert old is server_thread and new is not server_thread
+        assert list(pools) == [new.get_url()]
+        assert sessions._leases[leased].stale
+
+        sessions.release(leased)
+        fresh = sessions.acquire()
+        assert fresh is not leased and fresh.server_url == new.get_url()
+        assert new.fake.state.requests['NEW_SESSION'] == 1
+
+    def test_restart_on_another_port(self, supervisor):
+        ports = [free_port(), free_port()]
+        server_thread = start(supervisor, ports)
+        assert server_thread.port == ports[0]
+        server_thread.process.returncode = 1
+        supervisor.check()
+        [(old, new)] = supervisor.restarts
+        assert new.port == ports[1]
+
+    def test_missed_heartbeats(self, supervisor):
+        server_thread = start(supervisor)
+        server_thread.fake.stop()
+        supervisor.check()
+        assert supervisor.restarts == []
+        supervisor.check()
+        assert len(supervisor.restarts) == 1
+
+    def test_rss_growth(self, supervisor, monkeypatch):
+        samples = iter([100, 200, 400])
+        monkeypatch.setattr(supervisor_module, 'process_rss', lambda pid: next(samples))
+        start(supervisor)
+        supervisor.check()
+        supervisor.check()
+        assert supervisor.restarts == []
+        supervisor.check()
+        assert len(supervisor.restarts) == 1
+
+    def test_backoff_and_give_up(self, supervisor, monkeypatch):
+        server_thread = start(supervisor)
+        supervisor.max_restarts = 1
+        server_thread.process.returncode = 1
+        supervisor.check()
+        [(_, new)] = supervisor.restarts
+
+        # Failing again right away waits for the backoff
+        new.process.returncode = 1
+        now = supervisor_module.time.monotonic()
+        supervisor.check()
+        assert len(supervisor.restarts) == 1
+        monkeypatch.setattr(supervisor_module.time, 'monotonic', lambda: now + 11)
+        supervisor.check()
+        assert supervisor.restarts[-1] == (new, None)
+        assert supervisor.server_threads == []
+
+    def test_process_rss(self):
+        rss = supervisor_module.process_rss(os.getpid())
+        assert rss is None or rss > 0
+
+
+class TestScheduler:
+
+    def test_slots_move_to_the_new_url(self, supervisor):
+        scheduler = ServiceScheduler('127.0.0.1:0', max_processes=1,
+                                     server_factory=FakeServerThread, supervisor=supervisor)
+        old_url = scheduler.acquire()
+        [server_thread] = supervisor.server_threads
+        server_thread.process.returncode = 1
+        supervisor.check()
+        [service] = scheduler.services
+        assert service.url != old_url and service.sessions == 0
+        scheduler.release(old_url)
+        assert scheduler.acquire() == service.url
+        scheduler.close()
+        assert supervisor.server_threads == []
+
+    def test_old_sessions_keep_the_slots_on_the_same_url(self, supervisor):
+        scheduler = ServiceScheduler('127.0.0.1:%d' % free_port(), max_processes=1,
+                                     server_factory=FakeServerThread, supervisor=supervisor)
+        old_session = scheduler.create_session()
+        [server_thread] = supervisor.server_threads
+        server_thread.process.returncode = 1
+        supervisor.check()
+        [service] = scheduler.services
+        assert service.url == old_session.server_url
+
+        new_session = scheduler.create_session()
+        assert service.sessions == 1
+        # Its session died with the old process
+        old_session.quit()
+        assert service.sessions == 1
+        new_session.quit()
+        assert service.sessions == 0
+        scheduler.close()
@@ -2,6 +2,7 @@ from argparse import ArgumentParser
 import unittest
 import pytest
 
+from core.test import builder
 from core.test.builder import Builder
 
 
@@ -11,6 +12,37 @@ class TestBuilder:
         runner = Builder()
         assert runner.parallel == 0
 
+    def test_config_watcher(self, monkeypatch):
+        watchers = []
+
+        class Watcher(object):
+            def __init__(self, config):
+                self.running = False
+                watchers.append(self)
+
+            def start(self):
+                self.running = True
+
+            def stop(self):
+                self.running = False
+        monkeypatch.setattr(builder, 'ConfigWatcher', Watcher)
+        monkeypatch.setattr(builder, 'config', {'config_watch': True})
+        runner = Builder()
+        runner.setup_test_environment()
+        [watcher] = watchers
+        assert watcher.running
+        runner.teardown_test_environment()
+        assert not watcher.running
+
+    def test_teardown_closes_pools(self, monkeypatch):
+        closed = []
+        monkeypatch.setattr(builder.pool, 'close_all', lambda: closed.append(True))
+        monkeypatch.setattr(builder, 'config', {})
+        runner = Builder()
+        runner.setup_test_environment()
+        runner.teardown_test_environment()
+        assert closed == [True]
+
     def test_add_arguments_parallel(self):
         parser = ArgumentParser()
         Builder.add_arguments(parser)
@@ -0,0 +1,198 @@
+import unittest
+from argparse import ArgumentParser
+
+import pytest
+
+from core.exceptions import ImproperlyConfigured
+from core.test.builder import Builder
+from core.test.decorators import throttle_network
+from core.test.suites import NetworkProfileSuite, format_network_matrix
+from core.webdriver.chromium import ChromiumDriver, network
+
+PROFILES = {
+    'slow': {'latency': 100, 'download_throughput': 1000, 'upload_throughput': 500},
+    'fast': {'latency': 1, 'download_throughput': 100000, 'upload_throughput': 50000},
+}
+
+
+@pytest.fixture(autouse=True)
+def profiles(monkeypatch):
+    monkeypatch.setattr(network, 'config', {'network_profiles': PROFILES})
+
+
+@pytest.fixture
+def fake(fake, record):
+    record('SET_NETWORK_CONDITIONS', value=lambda params: params['network_conditions'])
+    return fake
+
+
+class TestNetworkProfiles:
+
+    def test_unknown_profile(self):
+        with pytest.raises(ImproperlyConfigured):
+            network.get_network_profile('dialup')
+        with pytest.raises(ImproperlyConfigured):
+            network.get_network_profile({'latency': 1})
+
+    def test_apply_profile(self, fake):
+        driver = ChromiumDriver(fake.url)
+        driver.apply_network_profile('slow')
+        assert driver.network_profile == 'slow'
+        assert fake.sent == [{'offline': False, 'latency': 100,
+                                    'download_throughput': 1000, 'upload_throughput': 500}]
+        driver.delete_network_conditions()
+        assert driver.network_profile is None
+
+    def test_active_profile_applies_to_new_sessions(self, fake):
+        with network.activate('fast'):
+            driver = ChromiumDriver(fake.url)
+        assert driver.network_profile == 'fast'
+        assert network.active_profile() is None
+        assert ChromiumDriver(fake.url).network_profile is None
+
+
+class TestThrottleNetwork:
+
+    def test_class_decorator(self, fake):
+        @throttle_network('slow')
+        class Task(unittest.TestCase):
+            def setUp(self):
+                self.driver = ChromiumDriver(fake.url)
+
+            def test_page(self):
+                self.profile = self.driver.network_profile
+
+        task = Task('test_page')
+        result = task.run()
+        assert result.wasSuccessful()
+        assert task.profile == 'slow'
+        assert task.driver.network_profile is None
+        assert fake.state.requests['DELETE_NETWORK_CONDITIONS'] == 1
+
+    def test_class_decorator_tears_down_when_enable_fails(self, fake):
+        fake.state.errors['SET_NETWORK_CONDITIONS'] = 13
+
+        @throttle_network('slow')
+        class Task(unittest.TestCase):
+            def setUp(self):
+                self.driver = ChromiumDriver(fake.url)
+
+            def tearDown(self):
+                self.driver.quit()
+
+            def test_page(self):
+                pass
+
+        task = Task('test_page')
+        result = task.run()
+        assert len(result.errors) == 1
+        assert fake.state.sessions == {}
+
+    def test_method_decorator(self, fake):
+        class Task(unittest.TestCase):
+            driver = ChromiumDriver(fake.url)
+
+            @throttle_network('fast')
+            def test_page(self):
+                self.profile = self.driver.network_profile
+
+        task = Task('test_page')
+        assert task.run().wasSuccessful()
+        assert task.profile == 'fast'
+
+    def test_context_manager(self, fake):
+        driver = ChromiumDriver(fake.url)
+        with throttle_network('slow', driver=driver):
+            assert driver.network_profile == 'slow'
+        assert driver.network_profile is None
+
+    def test_nested_restores_outer_profile(self, fake):
+        @throttle_network('slow')
+        class Task(unittest.TestCase):
+            def setUp(self):
+                self.driver = ChromiumDriver(fake.url)
+
+            @throttle_network('fast')
+            def step(self):
+                self.profile = self.driver.network_profile
+
+            def test_page(self):
+                self.step()
+                self.after = self.driver.network_profile
+
+        task = Task('test_page')
+        assert task.run().wasSuccessful()
+        assert task.profile == 'fast'
+        assert task.after == 'slow'
+        assert [conditions['latency'] for conditions in fake.sent] == [100, 1, 100]
+        assert task.driver.network_profile is None
+        assert fake.state.requests['DELETE_NETWORK_CONDITIONS'] == 1
+
+
+class TestNetworkMatrix:
+
+    def test_suite_runs_under_profile(self, fake):
+        profiles = []
+
+        class Task(unittest.TestCase):
+            def test_page(self):
+                profiles.append(ChromiumDriver(fake.url).network_profile)
+
+        suites = [
+            NetworkProfileSuite(unittest.TestSuite([Task('test_page')]), profile)
+            for profile in ('slow', 'fast')
+        ]
+        result = unittest.TestResult()
+        unittest.TestSuite(suites).run(result)
+        assert result.testsRun == 2
+        assert profiles == ['slow', 'fast']
+        assert all(list(suite.timings) == [Task('test_page').id()] for suite in suites)
+
+        table = format_network_matrix(suites).splitlines()
+        assert table[0].split() == ['test', 'slow', 'fast']
+        assert table[1].startswith(Task('test_page').id())
+
+    def test_class_fixtures_per_profile(self, fake):
+        events = []
+
+        class Task(unittest.TestCase):
+            @classmethod
+            def setUpClass(cls):
+                cls.driver = ChromiumDriver(fake.url)
+                events.append(('setUpClass', cls.driver.network_profile))
+
+            @classmethod
+            def tearDownClass(cls):
+                events.append(('tearDownClass', network.active_profile()))
+                cls.driver.quit()
+
+            def test_page(self):
+                events.append(('test', self.driver.network_profile))
+
+        suites = [
+            NetworkProfileSuite(unittest.TestSuite([Task('test_page')]), profile)
+            for profile in ('slow', 'fast')
+        ]
+        result = unittest.TestResult()
+        unittest.TestSuite(suites).run(result)
+        assert result.wasSuccessful()
+        assert events == [
+            ('setUpClass', 'slow'), ('test', 'slow'), ('tearDownClass', 'slow'),
+            ('setUpClass', 'fast'), ('test', 'fast'), ('tearDownClass', 'fast'),
+        ]
+        assert fake.state.requests['NEW_SESSION'] == 2
+        assert fake.state.sessions == {}
+
+    def test_builder_arguments(self):
+        parser = ArgumentParser()
+        Builder.add_arguments(parser)
+        ns = parser.parse_args(['--network-profile', '3g', '--network-profile', 'cable'])
+        assert ns.network_profiles == ['3g', 'cable']
+
+    def test_build_network_matrix(self):
+        builder = Builder(network_profiles=['slow', 'fast'], parallel=4)
+        suites = builder.build_network_matrix(
+            ['misc.tests.test_discovery_sample.do_sample.TestVanillaUnittest'])
+        assert [suite.profile for suite in suites] == ['slow', 'fast']
+        assert all(suite.countTestCases() == 1 for suite in suites)
+        assert builder.parallel == 4
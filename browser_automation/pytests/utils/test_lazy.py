@@ -2,7 +2,8 @@ import copy
 import pickle
 import pytest
 
-from utils.lazy import LazyObject, empty
+from utils.lazy import (
+    CachedLazyObject, LazyObject, SimpleLazyObject, cached_property, empty)
 
 
 class Foo(object):
@@ -279,3 +280,81 @@ class TestLazyObject:
         assert obj2._wrapped is empty
 
 
+class TestCachedLazyObject(TestLazyObject):
+    def lazy_wrap(self, wrapped_object):
+        class AdHocLazyObject(CachedLazyObject):
+            def _setup(self):
+                self._wrapped = wrapped_object
+
+        return AdHocLazyObject()
+
+    def test_getattr_is_cached(self):
+        obj = self.lazy_wrap(Foo())
+        assert obj.foo == 'bar'
+        assert obj.__dict__['foo'] == 'bar'
+
+    def test_setattr_invalidates_cache(self):
+        obj = self.lazy_wrap(Foo())
+        assert obj.foo == 'bar'
+        obj.foo = 'BAR'
+        assert obj.foo == 'BAR'
+        del obj.foo
+        assert obj.foo == 'bar'
+
+    def test_replace_wrapped_invalidates_cache(self):
+        obj = self.lazy_wrap(Foo())
+        assert obj.foo == 'bar'
+        other = Foo()
+        other.foo = 'baz'
+        obj._wrapped = other
+        assert obj.foo == 'baz'
+
+
+class TestSimpleLazyObject(TestLazyObject):
+    def lazy_wrap(self, wrapped_object):
+        return SimpleLazyObject(lambda: wrapped_object)
+
+    def test_repr(self):
+        obj = self.lazy_wrap(42)
+        assert repr(obj).startswith('<SimpleLazyObject: <function')
+        assert obj._wrapped is empty
+        str(obj)
+        assert repr(obj) == '<SimpleLazyObject: 42>'
+
+    def test_setup_called_once(self):
+        calls = []
+
+        def setup():
+            calls.append(1)
+            return Foo()
+
+        obj = SimpleLazyObject(setup)
+        assert obj.foo == 'bar'
+        assert obj.foo == 'bar'
+        assert len(calls) == 1
+
+    def test_getattr_is_not_cached(self):
+        target = Foo()
+        obj = self.lazy_wrap(target)
+        assert obj.foo == 'bar'
+        target.foo = 'baz'
+        assert obj.foo == 'baz'
+        assert 'foo' not in obj.__dict__
+
+
+class TestCachedProperty:
+    def test_cached_property(self):
+        class Counter(object):
+            calls = 0
+
+            @cached_property
+            def value(self):
+                self.calls += 1
+                return self.calls
+
+        obj = Counter()
+        assert obj.value == 1
+        assert obj.value == 1
+        del obj.value
+        assert obj.value == 2
+        assert isinstance(Counter.value, cached_property)
@@ -0,0 +1,100 @@
+import pytest
+
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium import capabilities
+from core.webdriver.chromium.capabilities import (
+    CapabilitiesCache, cache_key, options_hash, session_fields, with_session_fields,
+    without_session_fields)
+
+
+@pytest.fixture
+def fake(fake):
+    capabilities.cache.clear()
+    yield fake
+    capabilities.cache.clear()
+
+
+class TestCapabilities:
+
+    def test_parsed_lazily_and_shared(self, fake):
+        first = ChromiumDriver(fake.url)
+        assert first._capabilities is None
+        assert first.capabilities['browserName'] == 'chrome'
+        assert first._raw_capabilities is None
+
+        second = ChromiumDriver(fake.url)
+        assert second._raw_capabilities is None
+        assert second.capabilities['browserName'] == 'chrome'
+        assert capabilities.cache.hits == 1
+        assert 'GET_SESSION_CAPABILITIES' not in fake.state.requests
+
+    def test_session_fields_are_not_shared(self, fake):
+        first = ChromiumDriver(fake.url)
+        first_dir = first.capabilities['chrome']['userDataDir']
+        second = ChromiumDriver(fake.url)
+        assert capabilities.cache.hits == 0
+        assert second.capabilities['chrome']['userDataDir'] != first_dir
+        assert second.capabilities['chrome']['userDataDir'].endswith(second._session_id)
+        assert (second.capabilities['goog:chromeOptions']['debuggerAddress'] !=
+                first.capabilities['goog:chromeOptions']['debuggerAddress'])
+        assert second.capabilities['chrome']['chromedriverVersion'] == 'fake'
+        assert capabilities.cache.hits == 1
+        assert first.capabilities['chrome']['userDataDir'] == first_dir
+
+    def test_options_are_part_of_the_key(self, fake):
+        first = ChromiumDriver(fake.url)
+        second = ChromiumDriver(fake.url, chrome_switches=['headless'])
+        assert first.capabilities is not second.capabilities
+
+    def test_fetched_after_eviction(self, fake):
+        first = ChromiumDriver(fake.url)
+        first.capabilities
+        second = ChromiumDriver(fake.url)
+        capabilities.cache.clear()
+        assert second.capabilities['browserName'] == 'chrome'
+        assert fake.state.requests['GET_SESSION_CAPABILITIES'] == 1
+
+    def test_unknown_versions_are_not_cached(self, fake):
+        fake.state.responses['NEW_SESSION'] = {'browserName': 'chrome'}
+        driver = ChromiumDriver(fake.url)
+        assert driver.capabilities == {'browserName': 'chrome'}
+        assert len(capabilities.cache) == 0
+
+
+class TestCapabilitiesCache:
+
+    def test_session_fields(self):
+        raw = {'version': '70', 'chrome': {'chromedriverVersion': '2.44', 'userDataDir': '/a'}}
+        fields = session_fields(raw)
+        assert fields == {('chrome', 'userDataDir'): '/a'}
+        shared = without_session_fields(raw)
+        assert shared == {'version': '70', 'chrome': {'chromedriverVersion': '2.44'}}
+        assert raw['chrome']['userDataDir'] == '/a'
+        assert with_session_fields(shared, fields) == raw
+        assert with_session_fields(shared, {}) is shared
+
+    def test_cache_key(self):
+        raw = {'version': '70', 'chrome': {'chromedriverVersion': '2.44'}}
+        assert cache_key(raw, 'digest') == ('2.44', '70', 'digest')
+        assert cache_key({'version': '70'}, 'digest') is None
+
+    def test_options_hash_is_stable(self):
+        assert options_hash({'a': 1, 'b': [1, 2]}) == options_hash({'b': [1, 2], 'a': 1})
+        assert options_hash({'a': 1}) != options_hash({'a': 2})
+
+    def test_lru_eviction(self):
+        cache = CapabilitiesCache(max_size=2)
+        cache.set('a', {})
+        cache.set('b', {})
+        cache.get('a')
+        cache.set('c', {})
+        assert 'a' in cache and 'c' in cache
+        assert 'b' not in cache
+
+    def test_nested_values_are_not_shared(self):
+        cache = CapabilitiesCache()
+        stored = {'timeouts': {'script': 30000}}
+        cache.set('a', stored)
+        stored['timeouts']['script'] = 0
+        cache.get('a')['timeouts']['implicit'] = 0
+        assert cache.get('a') == {'timeouts': {'script': 30000}}
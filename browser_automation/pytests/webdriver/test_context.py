@@ -0,0 +1,97 @@
+import pytest
+
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.exceptions import NoSuchFrame
+
+
+@pytest.fixture
+def driver(fake):
+    return ChromiumDriver(fake.url)
+
+
+def requests(fake, name):
+    return fake.state.requests.get(name, 0)
+
+
+class TestWindowContext:
+
+    def test_same_window_is_skipped(self, fake, driver):
+        driver.switch_to_window('w1')
+        driver.switch_to_window('w1')
+        assert requests(fake, 'SWITCH_TO_WINDOW') == 1
+        driver.switch_to_window('w2')
+        assert requests(fake, 'SWITCH_TO_WINDOW') == 2
+
+    def test_current_handle_is_remembered(self, fake, driver):
+        handle = driver.get_current_window_handle()
+        driver.switch_to_window(handle)
+        assert requests(fake, 'SWITCH_TO_WINDOW') == 0
+
+    def test_same_window_leaves_frames(self, fake, driver):
+        driver.switch_to_window('w1')
+        driver.switch_to_frame('a')
+        driver.switch_to_window('w1')
+        assert requests(fake, 'SWITCH_TO_WINDOW') == 1
+        assert requests(fake, 'SWITCH_TO_FRAME') == 2
+
+    def test_close_window_invalidates(self, fake, driver):
+        driver.switch_to_window('w1')
+        driver.close_window()
+        driver.switch_to_window('w1')
+        assert requests(fake, 'SWITCH_TO_WINDOW') == 2
+
+
+class TestFrameContext:
+
+    def test_main_frame_is_skipped(self, fake, driver):
+        driver.switch_to_main_frame()
+        driver.switch_to_parent_frame()
+        assert requests(fake, 'SWITCH_TO_FRAME') == 0
+        assert requests(fake, 'SWITCH_TO_PARENT_FRAME') == 0
+
+    def test_frame_stack(self, fake, driver):
+        driver.switch_to_frame('a')
+        driver.switch_to_frame('b')
+        driver.switch_to_parent_frame()
+        driver.switch_to_parent_frame()
+        driver.switch_to_parent_frame()
+        driver.switch_to_main_frame()
+        assert requests(fake, 'SWITCH_TO_FRAME') == 2
+        assert requests(fake, 'SWITCH_TO_PARENT_FRAME') == 2
+
+    def test_frame_path(self, fake, driver):
+        driver.switch_to_frame_path('a', 'b')
+        driver.switch_to_frame_path('a', 'b')
+        assert requests(fake, 'SWITCH_TO_FRAME') == 2
+
+        driver.switch_to_frame_path('a', 'c')
+        assert requests(fake, 'SWITCH_TO_PARENT_FRAME') == 1
+        assert requests(fake, 'SWITCH_TO_FRAME') == 3
+
+        driver.switch_to_frame_path()
+        assert requests(fake, 'SWITCH_TO_FRAME') == 4
+
+    def test_frame_path_with_elements(self, fake, driver):
+        frame = driver.find_element('tag name', 'iframe')
+        driver.switch_to_frame_path(frame)
+        driver.switch_to_frame_path(frame)
+        assert requests(fake, 'SWITCH_TO_FRAME') == 1
+
+    @pytest.mark.parametrize('navigate', [
+        lambda driver: driver.load('about:blank'),
+        lambda driver: driver.go_back(),
+        lambda driver: driver.refresh(),
+    ])
+    def test_navigation_invalidates(self, fake, driver, navigate):
+        driver.switch_to_frame_path('a')
+        navigate(driver)
+        driver.switch_to_frame_path('a')
+        assert requests(fake, 'SWITCH_TO_FRAME') == 3
+
+    def test_missing_frame_invalidates(self, fake, driver):
+        fake.state.errors['SWITCH_TO_FRAME'] = (
+            lambda params, state: 8 if params['id'] == 'missing' else None)
+        with pytest.raises(NoSuchFrame):
+            driver.switch_to_frame('missing')
+        driver.switch_to_main_frame()
+        assert requests(fake, 'SWITCH_TO_FRAME') == 2
@@ -0,0 +1,87 @@
+import time
+import unittest
+
+import pytest
+
+from core.test.runner import _TestResult
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium import constants as command
+from core.webdriver.chromium import deadline
+from core.webdriver.exceptions import DeadlineExceeded
+
+
+@pytest.fixture
+def fake(fake, record):
+    record('SET_TIMEOUT', value=lambda params: (params['type'], params['ms']))
+    yield fake
+    deadline.pop_overruns()
+
+
+class TestScope:
+
+    def test_nesting(self):
+        assert deadline.current() is None
+        with deadline.scope(10) as outer:
+            with deadline.scope(60) as inner:
+                assert inner is outer
+            with deadline.scope(1) as inner:
+                assert deadline.current() is inner
+            assert deadline.current() is outer
+            with deadline.scope(None) as same:
+                assert same is outer
+        assert deadline.current() is None
+
+    def test_timeout_for(self):
+        assert deadline.timeout_for(30) == (30, None)
+        with deadline.scope(5) as current:
+            timeout, bounded_by = deadline.timeout_for(30)
+            assert 4 < timeout <= 5 and bounded_by is current
+            assert deadline.timeout_for(1) == (1, None)
+
+
+class TestDeadlines:
+
+    def test_per_call(self, fake):
+        driver = ChromiumDriver(fake.url)
+        fake.state.latency = lambda name: 1 if name == 'GET_TITLE' else 0
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            driver.execute_command(command.GET_TITLE, {}, timeout=0.1)
+        assert time.monotonic() - start < 0.9
+        [overrun] = deadline.pop_overruns()
+        assert overrun.command == 'GET_TITLE'
+        assert overrun.deadline.seconds == 0.1
+        # The overrun is the caller's, not a failure of the server
+        assert driver._executor.breaker.failures == 0
+
+    def test_expired_scope_sends_nothing(self, fake):
+        driver = ChromiumDriver(fake.url)
+        with deadline.scope(0):
+            with pytest.raises(DeadlineExceeded):
+                driver.get_title()
+        assert 'GET_TITLE' not in fake.state.requests
+        assert len(deadline.pop_overruns()) == 1
+
+    def test_server_timeouts(self, fake):
+        driver = ChromiumDriver(fake.url)
+        driver.set_timeout('implicit', 5000)
+        with driver.deadline(10):
+            lowered = fake.sent[1:]
+            assert [type for type, ms in lowered] == ['page load', 'script']
+            assert all(9000 < ms <= 10000 for type, ms in lowered)
+        assert fake.sent[3:] == [('page load', 300000), ('script', 30000)]
+        assert driver._timeouts['implicit'] == 5000
+
+
+class TestResults:
+
+    def test_overruns_are_reported(self):
+        class Task(unittest.TestCase):
+            def runTest(self):
+                deadline.overrun('GET', deadline.Deadline(0))
+
+        result = _TestResult()
+        Task().run(result)
+        [(test, overrun)] = result.overruns
+        assert isinstance(test, Task)
+        assert 'Deadline overrun: GET exceeded' in result.result[0][2]
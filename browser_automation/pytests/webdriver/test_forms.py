@@ -0,0 +1,71 @@
+import pytest
+
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium import forms
+from core.webdriver.exceptions import FormFillError
+
+
+@pytest.fixture
+def fake(fake, record):
+    fake.script_result = {}
+    record('EXECUTE_SCRIPT', result=lambda: fake.script_result)
+    return fake
+
+
+class TestFillFormArgs:
+
+    def test_locators(self):
+        keys_, fields = forms.fill_form_args({
+            'first_name': 'Ada',
+            ('css selector', '#email'): 'ada@example.com',
+        })
+        assert keys_ == ['first_name', ('css selector', '#email')]
+        assert fields == [[None, 'name', 'first_name', 'Ada'],
+                          [None, 'css selector', '#email', 'ada@example.com']]
+
+    def test_values(self):
+        assert forms.field_value(True) is True
+        assert forms.field_value(42) == '42'
+        assert forms.field_value(('a', 1)) == ['a', '1']
+
+    def test_errors_by_key(self):
+        errors = forms.field_errors(['a', 'b', 'c'], {'2': 'no such element', '0': 'disabled'})
+        assert errors == {'a': 'disabled', 'c': 'no such element'}
+
+
+class TestFillForm:
+
+    def test_single_round_trip(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', 'textarea')
+        mapping = {'field_%d' % i: 'value %d' % i for i in range(40)}
+        mapping[element] = 'notes'
+        assert driver.fill_form(mapping) == {}
+        [params] = fake.sent
+        assert params['script'] == forms.FILL_FORM_SCRIPT
+        root, fields = params['args']
+        assert root is None
+        assert len(fields) == 41
+        assert fields[-1] == [{'ELEMENT': element._id}, None, None, 'notes']
+        assert fake.state.requests == {'NEW_SESSION': 1, 'FIND_ELEMENT': 1, 'EXECUTE_SCRIPT': 1}
+
+    def test_root(self, fake):
+        driver = ChromiumDriver(fake.url)
+        form = driver.find_element('tag name', 'form')
+        driver.fill_form({'q': 'query'}, root=form)
+        assert fake.sent[0]['args'][0] == {'ELEMENT': form._id}
+
+    def test_errors(self, fake):
+        fake.script_result = {'1': 'no such element'}
+        driver = ChromiumDriver(fake.url)
+        mapping = {'name': 'Ada', 'missing': 'x', 'agree': True}
+        with pytest.raises(FormFillError) as excinfo:
+            driver.fill_form(mapping)
+        assert excinfo.value.errors == {'missing': 'no such element'}
+        assert 'missing: no such element' in str(excinfo.value)
+        assert driver.fill_form(mapping, raise_errors=False) == {'missing': 'no such element'}
+
+    def test_empty_mapping(self, fake):
+        driver = ChromiumDriver(fake.url)
+        assert driver.fill_form({}) == {}
+        assert 'EXECUTE_SCRIPT' not in fake.state.requests
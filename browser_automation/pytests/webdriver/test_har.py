@@ -0,0 +1,158 @@
+import gzip
+import json
+import unittest
+
+from core.test.runner import _TestResult
+from core.webdriver.chromium import har
+from core.webdriver.chromium.har import HarConverter, format_summaries, save_har
+
+
+def event(method, **params):
+    message = {'message': {'method': method, 'params': params}, 'webview': 'x'}
+    return {'level': 'INFO', 'message': json.dumps(message), 'timestamp': 0}
+
+
+def timing(request_time, **values):
+    result = dict(requestTime=request_time, dnsStart=-1, dnsEnd=-1, connectStart=-1,
+                  connectEnd=-1, sslStart=-1, sslEnd=-1, sendStart=1, sendEnd=2,
+                  receiveHeadersEnd=50)
+    result.update(values)
+    return result
+
+
+def page_load():
+    """
+    A document redirected once, a script, a failed image and the page events.
+    """
+    return [
+        event('Network.requestWillBeSent', requestId='1', loaderId='1', frameId='F',
+              type='Document', timestamp=10.0, wallTime=1500000000.0,
+              request={'url': 'http://a.test/', 'method': 'GET', 'headers': {}}),
+        event('Network.requestWillBeSent', requestId='1', loaderId='1', frameId='F',
+              type='Document', timestamp=10.1, wallTime=1500000000.1,
+              request={'url': 'http://a.test/home?x=1', 'method': 'GET', 'headers': {}},
+              redirectResponse={'status': 301, 'statusText': 'Moved',
+                                'headers': {'Location': '/home?x=1'},
+                                'timing': timing(10.0)}),
+        event('Network.responseReceived', requestId='1', type='Document',
+              response={'status': 200, 'statusText': 'OK', 'protocol': 'http/1.1',
+                        'mimeType': 'text/html', 'headers': {'Content-Type': 'text/html'},
+                        'timing': timing(10.1, dnsStart=0, dnsEnd=5, connectStart=5,
+                                         connectEnd=10, sendStart=10, sendEnd=11,
+                                         receiveHeadersEnd=100)}),
+        event('Network.dataReceived', requestId='1', dataLength=3000, encodedDataLength=1000),
+        event('Network.loadingFinished', requestId='1', timestamp=10.3, encodedDataLength=1200),
+        event('Network.requestWillBeSent', requestId='2', loaderId='1', frameId='F',
+              type='Script', timestamp=10.35, wallTime=1500000000.35,
+              request={'url': 'http://a.test/app.js', 'method': 'GET', 'headers': {}}),
+        event('Network.requestWillBeSent', requestId='3', loaderId='1', frameId='F',
+              type='Image', timestamp=10.36, wallTime=1500000000.36,
+              request={'url': 'http://a.test/logo.png', 'method': 'GET', 'headers': {}}),
+        event('Network.responseReceived', requestId='2', type='Script',
+              response={'status': 200, 'statusText': 'OK', 'mimeType': 'text/javascript',
+                        'headers': {}, 'timing': timing(10.35)}),
+        event('Network.loadingFinished', requestId='2', timestamp=10.45, encodedDataLength=500),
+        event('Network.loadingFailed', requestId='3', timestamp=10.4,
+              errorText='net::ERR_NAME_NOT_RESOLVED'),
+        event('Page.domContentEventFired', timestamp=10.5),
+        event('Page.loadEventFired', timestamp=10.8),
+        event('Page.loadEventFired', timestamp=11.0),
+    ]
+
+
+class TestHarConverter:
+
+    def test_entries(self):
+        converter = HarConverter().feed_all(page_load())
+        entries = converter.entries
+        assert [entry['request']['url'] for entry in entries] == [
+            'http://a.test/', 'http://a.test/home?x=1',
+            'http://a.test/app.js', 'http://a.test/logo.png']
+        redirect, document, script, image = entries
+
+        assert redirect['response']['status'] == 301
+        assert redirect['response']['redirectURL'] == '/home?x=1'
+
+        assert document['startedDateTime'] == '2017-07-14T02:40:00.100Z'
+        assert document['request']['queryString'] == [{'name': 'x', 'value': '1'}]
+        assert document['response']['content'] == {'size': 3000, 'mimeType': 'text/html'}
+        assert document['response']['_transferSize'] == 1200
+        assert document['timings'] == {
+            'blocked': 0, 'dns': 5, 'connect': 5, 'ssl': -1,
+            'send': 1, 'wait': 89, 'receive': 100}
+        assert document['time'] == 200
+
+        assert image['response']['status'] == 0
+        assert image['_error'] == 'net::ERR_NAME_NOT_RESOLVED'
+        assert all(entry['pageref'] == 'page_1' for entry in entries)
+
+    def test_page_summary(self):
+        converter = HarConverter().feed_all(page_load())
+        [page] = converter.pages
+        assert page.url == 'http://a.test/'
+        assert page.ttfb == 200
+        assert page.dom_content_loaded == 500
+        assert page.load == 800
+        assert page.requests == 4
+        assert page.bytes == 1700
+        assert 'page_1' in format_summaries(converter.pages)
+
+    def test_new_page_only_for_main_frame(self):
+        events = page_load() + [
+            event('Network.requestWillBeSent', requestId='4', loaderId='4', frameId='G',
+                  type='Document', timestamp=11.0,
+                  request={'url': 'http://b.test/frame', 'method': 'GET', 'headers': {}}),
+            event('Network.requestWillBeSent', requestId='5', loaderId='5', frameId='F',
+                  type='Document', timestamp=12.0,
+                  request={'url': 'http://a.test/next', 'method': 'GET', 'headers': {}}),
+        ]
+        converter = HarConverter().feed_all(events)
+        assert [page.url for page in converter.pages] == ['http://a.test/', 'http://a.test/next']
+
+    def test_save_har(self, tmpdir):
+        path = str(tmpdir.join('session.har.gz'))
+        summaries = save_har(page_load(), path)
+        with gzip.open(path, 'rt') as f:
+            har = json.load(f)
+        assert har['log']['version'] == '1.2'
+        assert len(har['log']['entries']) == 4
+        assert har['log']['pages'] == [page.to_har() for page in summaries]
+        assert har['log']['pages'][0]['pageTimings'] == {'onContentLoad': 500, 'onLoad': 800}
+
+    def test_in_flight_requests_are_written(self, tmpdir):
+        path = str(tmpdir.join('session.har'))
+        events = page_load() + [
+            event('Network.requestWillBeSent', requestId='4', loaderId='1', frameId='F',
+                  type='XHR', timestamp=11.0, wallTime=1500000001.0,
+                  request={'url': 'http://a.test/poll', 'method': 'GET', 'headers': {}}),
+            event('Page.frameNavigated', timestamp=11.5),
+        ]
+        save_har(events, path)
+        with open(path) as f:
+            entries = json.load(f)['log']['entries']
+        assert len(entries) == 5
+        assert entries[-1]['_incomplete'] and entries[-1]['time'] == 500
+        assert entries[-1]['response']['bodySize'] == -1
+
+    def test_empty_body_size(self):
+        events = [page_load()[5], event('Network.loadingFinished', requestId='2',
+                                        timestamp=10.45, encodedDataLength=0)]
+        [entry] = HarConverter().feed_all(events).entries
+        assert entry['response']['bodySize'] == 0
+
+
+class TestResults:
+
+    def test_summaries_are_reported(self, tmpdir):
+        path = str(tmpdir.join('session.har'))
+
+        class Task(unittest.TestCase):
+            def runTest(self):
+                save_har(page_load(), path)
+
+        har.pop_summaries()
+        result = _TestResult()
+        Task().run(result)
+        [(test, [summary])] = result.har_summaries
+        assert isinstance(test, Task) and summary.url == 'http://a.test/'
+        assert format_summaries([summary]) in result.result[0][2]
@@ -0,0 +1,86 @@
+import json
+import pytest
+
+from core.webdriver.chromium import constants as command
+from core.webdriver.chromium.instrumentation import (
+    Histogram, Metrics, NULL_SPAN, command_name)
+
+
+class TestHistogram:
+
+    def test_exact_small_values(self):
+        histogram = Histogram()
+        for value in range(1, 101):
+            histogram.record(value)
+        assert histogram.count == 100
+        assert histogram.min == 1
+        assert histogram.max == 100
+        assert histogram.percentile(50) == 50
+        assert histogram.percentile(100) == 100
+
+    def test_relative_error(self):
+        for value in (1000, 123456, 9876543):
+            histogram = Histogram(sub_bucket_bits=8)
+            histogram.record(value)
+            histogram.record(value * 2)
+            assert value <= histogram.percentile(50) <= value * (1 + 1 / 128.0)
+
+    def test_empty(self):
+        assert Histogram().percentile(99) == 0
+        assert Histogram().mean == 0
+
+
+class TestMetrics:
+
+    def test_command_name(self):
+        assert command_name(command.FIND_ELEMENT) == 'FIND_ELEMENT'
+        assert command_name(('GET', '/custom')) == 'GET /custom'
+
+    def test_span_records_phases(self):
+        metrics = Metrics()
+        with metrics.span(command.GET_TITLE) as span:
+            with span.phase('serialize'):
+                pass
+            with span.phase('network'):
+                pass
+            span.add_bytes(10, 20)
+        stats = metrics.commands['GET_TITLE']
+        assert stats.latency['total'].count == 1
+        assert stats.latency['serialize'].count == 1
+        assert stats.latency['server'].count == 0
+        assert stats.request_bytes.total == 10
+        assert stats.response_bytes.total == 20
+        assert stats.errors == 0
+
+    def test_span_counts_errors(self):
+        metrics = Metrics()
+        with pytest.raises(ValueError):
+            with metrics.span(command.GET_TITLE):
+                raise ValueError
+        assert metrics.commands['GET_TITLE'].errors == 1
+
+    def test_listeners(self):
+        metrics = Metrics()
+        spans = []
+        metrics.add_listener(spans.append)
+        with metrics.span(command.GET_TITLE):
+            pass
+        assert [span.name for span in spans] == ['GET_TITLE']
+
+    def test_disabled(self):
+        metrics = Metrics(enabled=False)
+        assert metrics.span(command.GET_TITLE) is NULL_SPAN
+
+    def test_dumps(self, tmpdir):
+        metrics = Metrics()
+        with metrics.span(command.GET_TITLE) as span:
+            span.add_bytes(1, 2)
+        data = json.loads(metrics.to_json())
+        assert data['GET_TITLE']['latency_us']['total']['count'] == 1
+        text = metrics.to_prometheus()
+        assert 'webdriver_command_seconds_count{command="GET_TITLE",phase="total"} 1' in text
+        assert 'webdriver_response_bytes_total{command="GET_TITLE"} 2' in text
+        filename = str(tmpdir.join('metrics.json'))
+        metrics.dump(filename)
+        with open(filename) as _file:
+            assert json.load(_file) == data
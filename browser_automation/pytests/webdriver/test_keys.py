@@ -0,0 +1,67 @@
+import pytest
+
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium import keys
+
+
+@pytest.fixture
+def fake(fake, record):
+    record('SEND_KEYS_TO_ELEMENT', 'SEND_KEYS_TO_ACTIVE_ELEMENT', 'EXECUTE_SCRIPT')
+    return fake
+
+
+class TestEncoding:
+
+    def test_encode_keys(self):
+        assert keys.encode_keys(['abc', 12, 'd']) == 'abc12d'
+
+    def test_chunks(self):
+        assert keys.chunk_keys('abc', size=2) == ['ab', 'c']
+        assert keys.chunk_keys('abc', size=3) == ['abc']
+
+    def test_special_keys_are_not_split(self):
+        text = '\ue008' + 'a' * 10
+        assert keys.chunk_keys(text, size=4) == [text]
+
+
+class TestSendKeys:
+
+    def test_whole_strings(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', 'input')
+        element.send_keys('hello ', 'world', 42)
+        assert fake.sent[0]['value'] == ['hello world42']
+        driver.send_keys('active')
+        assert fake.sent[1]['value'] == ['active']
+
+    def test_w3c_sends_text_only(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', 'input')
+        driver.w3c_compliant = True
+        element.send_keys('hello ', 'world')
+        assert fake.sent[0] == {'sessionId': driver._session_id, 'id': element._id,
+                                'text': 'hello world'}
+        driver.send_keys('active')
+        assert fake.sent[1]['value'] == ['active']
+
+    def test_large_text_is_chunked(self, fake, monkeypatch):
+        monkeypatch.setattr(keys, 'CHUNK_SIZE', 4)
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', 'input')
+        element.send_keys('abcdefghij')
+        assert [params['value'] for params in fake.sent] == [['abcd'], ['efgh'], ['ij']]
+
+    def test_via_script(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', 'input')
+        element.send_keys('bulk ', 'text', via_script=True)
+        [params] = fake.sent
+        assert params['script'] == keys.SET_VALUE_SCRIPT
+        assert params['args'] == [{'ELEMENT': element._id}, 'bulk text', True]
+        assert 'SEND_KEYS_TO_ELEMENT' not in fake.state.requests
+
+    def test_set_value(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', 'input')
+        element.set_value(7)
+        assert fake.sent[0]['args'][1:] == ['7', False]
@@ -0,0 +1,129 @@
+import json
+import threading
+
+import pytest
+
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium import logs
+from core.webdriver.chromium.logs import LogCollector, entry_url
+
+
+def performance_entry(method, url):
+    message = {'message': {'method': method, 'params': {'request': {'url': url}}}}
+    return {'level': 'INFO', 'message': json.dumps(message), 'timestamp': 1}
+
+
+class FakeLogs(object):
+    """
+    Serves queued entries through GET_LOG, each one only once.
+    """
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def add(self, log_type, *entries):
+        with self.lock:
+            self.pending.setdefault(log_type, []).extend(entries)
+
+    def __call__(self, params, state):
+        with self.lock:
+            return self.pending.pop(params['type'], [])
+
+
+@pytest.fixture
+def fake(fake):
+    fake.logs = FakeLogs()
+    fake.state.responses['GET_LOG'] = fake.logs
+    return fake
+
+
+class TestLogCollector:
+
+    def test_poll_appends_to_file(self, fake, tmpdir):
+        driver = ChromiumDriver(fake.url)
+        filename = str(tmpdir.join('session.jsonl'))
+        collector = LogCollector(driver, ['browser'], filename=filename, tail_size=2)
+        fake.logs.add('browser', *[
+            {'level': 'INFO', 'message': 'line %d' % i, 'timestamp': i} for i in range(3)])
+        assert collector.poll() == 3
+        assert collector.poll() == 0
+        collector.stop()
+        with open(filename) as f:
+            lines = [json.loads(line) for line in f]
+        assert [line['message'] for line in lines] == ['line 0', 'line 1', 'line 2']
+        assert all(line['type'] == 'browser' for line in lines)
+        assert [entry['message'] for entry in collector.tail] == ['line 1', 'line 2']
+
+    def test_poll_keeps_entries_of_other_types_on_error(self, fake, tmpdir, monkeypatch):
+        driver = ChromiumDriver(fake.url)
+        collector = LogCollector(driver, ['browser', 'performance', 'driver'],
+                                 filename=str(tmpdir.join('session.jsonl')))
+        fetch = collector._fetch
+
+        def failing_fetch(log_type):
+            if log_type == 'performance':
+                raise OSError('connection reset')
+            return fetch(log_type)
+        monkeypatch.setattr(collector, '_fetch', failing_fetch)
+        fake.logs.add('browser', {'level': 'INFO', 'message': 'page', 'timestamp': 1})
+        fake.logs.add('driver', {'level': 'INFO', 'message': 'driver', 'timestamp': 2})
+        with pytest.raises(OSError):
+            collector.poll()
+        assert [entry['message'] for entry in collector.entries()] == ['page', 'driver']
+        assert collector.count == 2
+        collector.stop(final_poll=False)
+
+    def test_filters(self, fake, tmpdir):
+        driver = ChromiumDriver(fake.url)
+        collector = LogCollector(driver, ['browser', 'performance'],
+                                 filename=str(tmpdir.join('session.jsonl')))
+        fake.logs.add('browser',
+                      {'level': 'SEVERE', 'source': 'network',
+                       'message': 'http://a.test/x.js - Failed to load resource'},
+                      {'level': 'INFO', 'source': 'console-api',
+                       'message': 'http://b.test/app.js 1:2 "ready"'},
+                      {'level': 'WARNING', 'source': 'console-api', 'message': 'no url'})
+        fake.logs.add('performance',
+                      performance_entry('Network.requestWillBeSent', 'http://a.test/'))
+        collector.poll()
+
+        def messages(entries):
+            return [entry['message'][:9] for entry in entries]
+
+        assert len(list(collector.entries())) == 4
+        assert messages(collector.entries(level='WARNING')) == ['http://a.', 'no url']
+        assert messages(collector.entries(source='console-api')) == ['http://b.', 'no url']
+        assert len(list(collector.entries(url=r'a\.test'))) == 2
+        assert len(list(collector.entries(type='performance', url=r'a\.test'))) == 1
+        assert messages(collector.recent(level='SEVERE')) == ['http://a.']
+        collector.stop()
+
+    def test_background_collection_and_quit(self, fake, tmpdir):
+        driver = ChromiumDriver(fake.url)
+        collector = driver.collect_logs(
+            filename=str(tmpdir.join('session.jsonl')), interval=0.01)
+        fake.logs.add('browser', {'level': 'INFO', 'message': 'first'})
+        driver.get_title()
+        fake.logs.add('browser', {'level': 'INFO', 'message': 'last'})
+        driver.quit()
+        assert not collector.is_alive()
+        assert [entry['message'] for entry in collector.entries()] == ['first', 'last']
+
+    def test_default_filename(self, fake, tmpdir, monkeypatch):
+        monkeypatch.setattr(logs, 'config', {'webdriver_log_dir': str(tmpdir.join('browser'))})
+        driver = ChromiumDriver(fake.url)
+        collector = LogCollector(driver)
+        collector.stop()
+        assert tmpdir.join('browser', '%s.jsonl' % driver._session_id).exists()
+
+
+class TestEntryUrl:
+
+    def test_browser_entry(self):
+        assert entry_url({'message': 'https://a.test/x.js 10:3 Uncaught'}) == 'https://a.test/x.js'
+        assert entry_url({'message': 'console message'}) is None
+
+    def test_performance_entry(self):
+        entry = performance_entry('Network.requestWillBeSent', 'http://a.test/')
+        entry['type'] = 'performance'
+        assert entry_url(entry) == 'http://a.test/'
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from core.services.fakedriver import FakeChromeDriver
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium.options import ChromeOptions
+
+
+class TestChromeOptions:
+
+    def test_payload(self):
+        options = ChromeOptions(
+            chrome_binary='/usr/bin/chrome', chrome_switches=['headless'],
+            logging_prefs={'browser': 'ALL'}, download_dir='/tmp/downloads',
+            experimental_options={'prefs': {'intl': {'accept_languages': 'en'}}},
+            page_load_strategy='eager')
+        capabilities = json.loads(options.body)['desiredCapabilities']
+        chrome = capabilities['chromeOptions']
+        assert chrome['binary'] == '/usr/bin/chrome'
+        assert 'headless' in chrome['args']
+        assert chrome['prefs'] == {'intl': {'accept_languages': 'en'},
+                                   'download': {'default_directory': '/tmp/downloads'}}
+        assert capabilities['loggingPrefs'] == {'browser': 'ALL'}
+        assert capabilities['pageLoadStrategy'] == 'eager'
+
+    def test_w3c_request(self):
+        options = ChromeOptions(send_w3c_request=True)
+        assert list(options.params) == ['capabilities']
+
+    def test_arguments_are_not_modified(self):
+        switches = ['headless']
+        prefs = {'prefs': {'a': 1}}
+        ChromeOptions(chrome_switches=switches, experimental_options=prefs,
+                      download_dir='/tmp')
+        assert switches == ['headless']
+        assert prefs == {'prefs': {'a': 1}}
+
+    @pytest.mark.parametrize('kwargs, error', [
+        ({'chrome_switches': 'headless'}, TypeError),
+        ({'logging_prefs': {'network': 'ALL'}}, ValueError),
+        ({'logging_prefs': {'browser': 'LOUD'}}, ValueError),
+        ({'mobile_emulation': ['iPhone']}, TypeError),
+    ])
+    def test_validation(self, kwargs, error):
+        with pytest.raises(error):
+            ChromeOptions(**kwargs)
+
+    def test_digest_depends_on_options(self):
+        assert ChromeOptions().digest == ChromeOptions().digest
+        assert ChromeOptions().digest != ChromeOptions(chrome_switches=['x']).digest
+
+    def test_shared_between_sessions(self):
+        options = ChromeOptions(logging_prefs={'performance': 'ALL'})
+        with FakeChromeDriver() as fake:
+            first = ChromiumDriver(fake.url, options=options)
+            second = ChromiumDriver(fake.url, options=options)
+            assert first.options is second.options
+            assert len(fake.state.sessions) == 2
+            for params in fake.state.sessions.values():
+                assert params == options.params
@@ -0,0 +1,114 @@
+import threading
+import pytest
+
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium.pool import SessionPool, close_all, get_pool, rehome
+from core.webdriver.exceptions import PoolTimeout
+
+
+def make_pool(fake, **options):
+    return SessionPool(lambda: ChromiumDriver(fake.url), **options)
+
+
+class TestSessionPool:
+
+    def test_reuses_sessions(self, fake):
+        pool = make_pool(fake)
+        with pool.lease() as first:
+            pass
+        with pool.lease() as second:
+            pass
+        assert first is second
+        assert fake.state.requests['NEW_SESSION'] == 1
+        assert fake.state.requests['DELETE_ALL_COOKIES'] == 2
+        assert fake.state.requests['CLEAR_LOCAL_STORAGE'] == 2
+        assert fake.state.requests['GET'] == 2
+        assert 'QUIT' not in fake.state.requests
+        pool.close()
+        assert fake.state.requests['QUIT'] == 1
+
+    def test_closes_extra_windows(self, fake):
+        fake.state.responses['GET_WINDOW_HANDLES'] = ['w1', 'w2', 'w3']
+        pool = make_pool(fake)
+        with pool.lease():
+            pass
+        assert fake.state.requests['CLOSE'] == 2
+        assert fake.state.requests['SWITCH_TO_WINDOW'] == 3
+
+    def test_recycle_after_max_uses(self, fake):
+        pool = make_pool(fake, max_uses=2)
+        for _ in range(3):
+            with pool.lease():
+                pass
+        assert fake.state.requests['NEW_SESSION'] == 2
+        assert fake.state.requests['QUIT'] == 1
+
+    def test_recycle_on_memory(self, fake):
+        fake.state.responses['EXECUTE_SCRIPT'] = 10 * 1024 * 1024
+        pool = make_pool(fake, max_memory=1024 * 1024)
+        with pool.lease() as first:
+            pass
+        with pool.lease() as second:
+            pass
+        assert first is not second
+        assert pool.size == 0
+        assert fake.state.requests['QUIT'] == 2
+
+    def test_discard_on_error(self, fake):
+        pool = make_pool(fake)
+        with pytest.raises(ValueError):
+            with pool.lease():
+                raise ValueError
+        assert pool.size == 0
+        assert fake.state.requests['QUIT'] == 1
+
+    def test_max_size(self, fake):
+        pool = make_pool(fake, max_size=1)
+        driver = pool.acquire()
+        with pytest.raises(PoolTimeout):
+            pool.acquire(timeout=0.05)
+
+        timer = threading.Timer(0.05, pool.release, [driver])
+        timer.start()
+        assert pool.acquire(timeout=5) is driver
+        timer.join()
+
+    def test_merge_into(self, fake):
+        old, new = make_pool(fake), make_pool(fake)
+        leased = old.acquire()
+        old.merge_into(new)
+        assert old._leases[leased].stale
+
+        driver = old.acquire()
+        assert driver is not leased and new.size == 1
+        old.release(driver)
+        old.release(leased)
+        assert old.size == 0 and new.size == 1
+        assert new.acquire() is driver
+
+
+class TestRehome:
+
+    @pytest.fixture(autouse=True)
+    def pools(self, monkeypatch):
+        pools = {}
+        monkeypatch.setattr('core.webdriver.chromium.pool._pools', pools)
+        return pools
+
+    def test_merges_into_existing_pool(self, fake, pools):
+        old = get_pool('http://old')
+        existing = get_pool(fake.url)
+        assert rehome('http://old', fake.url) is existing
+        assert pools == {fake.url: existing}
+        assert not existing._closed and not old._closed
+        driver = old.acquire()
+        assert existing.size == 1 and old.size == 0
+        old.release(driver)
+
+    def test_close_all(self, fake, pools):
+        sessions = get_pool(fake.url)
+        with sessions.lease():
+            pass
+        close_all()
+        assert pools == {} and sessions._closed
+        assert fake.state.requests['QUIT'] == 1
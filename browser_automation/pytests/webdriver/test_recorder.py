@@ -0,0 +1,90 @@
+import pytest
+
+from core.services.fakedriver import DROP_CONNECTION, FakeChromeDriver
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium.recorder import RecordingController, ReplayController
+from core.webdriver.exceptions import NoSuchElement, ReplayError
+
+
+def record_session(filename, **options):
+    with FakeChromeDriver(**options) as fake:
+        executor = RecordingController(fake.url, filename)
+        driver = ChromiumDriver(fake.url, executor=executor)
+        driver.load('http://example.com')
+        element = driver.find_element('css selector', 'a')
+        element.click()
+        title = driver.get_title()
+        driver.quit()
+    return title
+
+
+class TestRecordReplay:
+
+    def test_quit_closes_recording(self, tmpdir):
+        filename = str(tmpdir.join('session.jsonl.gz'))
+        with FakeChromeDriver() as fake:
+            executor = RecordingController(fake.url, filename)
+            ChromiumDriver(fake.url, executor=executor).quit()
+            assert executor._file is None
+        assert len(ReplayController(filename).entries) == 2
+
+    @pytest.mark.parametrize('name', ['session.jsonl', 'session.jsonl.gz'])
+    def test_replay(self, tmpdir, name):
+        filename = str(tmpdir.join(name))
+        title = record_session(filename)
+
+        replay = ReplayController(filename)
+        driver = ChromiumDriver(None, executor=replay)
+        driver.load('http://example.com')
+        element = driver.find_element('css selector', 'a')
+        element.click()
+        assert driver.get_title() == title
+        driver.quit()
+        assert replay.finished
+
+    def test_replay_errors(self, tmpdir):
+        filename = str(tmpdir.join('session.jsonl'))
+        with FakeChromeDriver(errors={'FIND_ELEMENT': 7}) as fake:
+            executor = RecordingController(fake.url, filename)
+            driver = ChromiumDriver(fake.url, executor=executor)
+            with pytest.raises(NoSuchElement):
+                driver.find_element('css selector', 'a')
+            executor.close()
+
+        driver = ChromiumDriver(None, executor=ReplayController(filename))
+        with pytest.raises(NoSuchElement):
+            driver.find_element('css selector', 'a')
+
+    def test_replay_transport_errors(self, tmpdir):
+        filename = str(tmpdir.join('session.jsonl'))
+        with FakeChromeDriver(http_errors={'CLICK_ELEMENT': DROP_CONNECTION}) as fake:
+            executor = RecordingController(fake.url, filename)
+            driver = ChromiumDriver(fake.url, executor=executor)
+            element = driver.find_element('css selector', 'a')
+            with pytest.raises(ConnectionError) as recorded:
+                element.click()
+            executor.close()
+
+        driver = ChromiumDriver(None, executor=ReplayController(filename))
+        element = driver.find_element('css selector', 'a')
+        with pytest.raises(type(recorded.value)) as replayed:
+            element.click()
+        assert str(replayed.value) == str(recorded.value)
+
+    def test_strict_mismatch(self, tmpdir):
+        filename = str(tmpdir.join('session.jsonl'))
+        record_session(filename)
+
+        driver = ChromiumDriver(None, executor=ReplayController(filename))
+        with pytest.raises(ReplayError):
+            driver.load('http://example.org')
+
+    def test_exhausted(self, tmpdir):
+        filename = str(tmpdir.join('session.jsonl'))
+        record_session(filename)
+
+        driver = ChromiumDriver(None, executor=ReplayController(filename, strict=False))
+        for _ in range(5):
+            driver.get_title()
+        with pytest.raises(ReplayError):
+            driver.get_title()
@@ -0,0 +1,165 @@
+import os
+
+import pytest
+
+from core.services.fakedriver import DROP_CONNECTION, RESET_MID_BODY
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium import constants as command
+from core.webdriver.chromium import retry
+from core.webdriver.chromium.controller import Controller
+from core.webdriver.chromium.instrumentation import NULL_SPAN
+from core.webdriver.exceptions import CircuitOpen
+
+
+def failing(times, status=503):
+    """
+    Return an http_errors callable failing the first `times` requests.
+    """
+    calls = []
+
+    def error(params, state):
+        calls.append(params)
+        return status if len(calls) <= times else None
+    return error
+
+
+def fast_policies(attempts=3):
+    policy = retry.RetryPolicy(attempts=attempts, backoff=0, jitter=0)
+    return retry.RetryPolicies(
+        methods={'GET': policy},
+        commands={cmd: policy for cmd in retry.LOOKUP_COMMANDS})
+
+
+class TestRetryPolicy:
+
+    def test_backoff(self):
+        policy = retry.RetryPolicy(attempts=5, backoff=0.1, max_backoff=0.3, jitter=0)
+        assert [policy.delay(n) for n in (1, 2, 3)] == [0.1, 0.2, 0.3]
+
+    def test_policy_for(self):
+        policies = retry.DEFAULT_POLICIES
+        assert policies.policy_for(command.GET_TITLE) is retry.SAFE_RETRY
+        assert policies.policy_for(command.FIND_ELEMENT) is retry.SAFE_RETRY
+        assert policies.policy_for(command.CLICK_ELEMENT) is retry.NO_RETRY
+        assert policies.policy_for(command.QUIT) is retry.NO_RETRY
+
+
+class TestRetries:
+
+    def make_driver(self, fake, **options):
+        executor = Controller(fake.url, retry_policies=fast_policies(),
+                              breaker=retry.CircuitBreaker(fake.url, **options))
+        return ChromiumDriver(fake.url, executor=executor)
+
+    def test_get_is_retried(self, fake):
+        driver = self.make_driver(fake)
+        fake.state.http_errors['GET_TITLE'] = failing(2)
+        assert driver.get_title() == 'Fake page'
+        assert fake.state.requests['GET_TITLE'] == 3
+
+    def test_dropped_connection_is_retried(self, fake):
+        driver = self.make_driver(fake)
+        fake.state.http_errors['FIND_ELEMENT'] = failing(1, DROP_CONNECTION)
+        driver.find_element('css selector', 'a')
+        assert fake.state.requests['FIND_ELEMENT'] == 2
+
+    def test_stream_is_retried_before_any_output(self, fake, tmpdir):
+        driver = self.make_driver(fake)
+        fake.state.http_errors['SCREENSHOT'] = failing(1, DROP_CONNECTION)
+        path = driver.save_screenshot(str(tmpdir.join('shot.png')))
+        assert os.path.getsize(path) == fake.state.screenshot_size
+        assert fake.state.requests['SCREENSHOT'] == 2
+
+    def test_stream_is_not_retried_after_partial_output(self, fake, tmpdir):
+        driver = self.make_driver(fake)
+        fake.state.screenshot_size = 100 * 1024
+        fake.state.http_errors['SCREENSHOT'] = failing(1, RESET_MID_BODY)
+        path = str(tmpdir.join('shot.png'))
+        with pytest.raises(retry.TRANSIENT_ERRORS):
+            driver.save_screenshot(path)
+        assert fake.state.requests['SCREENSHOT'] == 1
+        assert not os.path.exists(path)
+
+    def test_post_is_not_retried(self, fake):
+        driver = self.make_driver(fake)
+        fake.state.http_errors['CLICK_ELEMENT'] = failing(1)
+        element = driver.find_element('css selector', 'a')
+        with pytest.raises(RuntimeError):
+            element.click()
+        assert fake.state.requests['CLICK_ELEMENT'] == 1
+
+    def test_gives_up(self, fake):
+        driver = self.make_driver(fake)
+        fake.state.http_errors['GET_TITLE'] = 503
+        with pytest.raises(RuntimeError):
+            driver.get_title()
+        assert fake.state.requests['GET_TITLE'] == 3
+
+
+class TestCircuitBreaker:
+
+    def test_opens_and_fails_fast(self, fake):
+        breaker = retry.CircuitBreaker(fake.url, failure_threshold=2, reset_timeout=60)
+        controller = Controller(fake.url, retry_policies=retry.RetryPolicies(), breaker=breaker)
+        driver = ChromiumDriver(fake.url, executor=controller)
+        fake.state.http_errors['GET_TITLE'] = 503
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                driver.get_title()
+        assert breaker.state == breaker.OPEN
+        with pytest.raises(CircuitOpen):
+            driver.get_current_url()
+        assert 'GET_CURRENT_URL' not in fake.state.requests
+
+    def test_half_open_probe(self, fake, monkeypatch):
+        breaker = retry.CircuitBreaker(fake.url, failure_threshold=1, reset_timeout=10)
+        controller = Controller(fake.url, retry_policies=retry.RetryPolicies(), breaker=breaker)
+        driver = ChromiumDriver(fake.url, executor=controller)
+        fake.state.http_errors['GET_TITLE'] = failing(1)
+        with pytest.raises(RuntimeError):
+            driver.get_title()
+        now = retry.time.monotonic()
+        monkeypatch.setattr(retry.time, 'monotonic', lambda: now + 11)
+        assert driver.get_title() == 'Fake page'
+        assert breaker.state == breaker.CLOSED
+
+    def test_local_errors_are_not_failures(self, fake):
+        breaker = retry.CircuitBreaker(fake.url, failure_threshold=1)
+        controller = Controller(fake.url, retry_policies=retry.RetryPolicies(), breaker=breaker)
+        driver = ChromiumDriver(fake.url, executor=controller)
+        error = OSError('disk full')
+
+        def sink(text):
+            raise error
+        with pytest.raises(OSError) as raised:
+            driver._stream_command(command.SCREENSHOT, sink)
+        assert raised.value is error
+
+        def read(response, body):
+            raise ValueError('invalid JSON')
+        with pytest.raises(ValueError):
+            controller._call(command.GET_TITLE, {'sessionId': driver._session_id},
+                             NULL_SPAN, read)
+        assert breaker.state == breaker.CLOSED and breaker.failures == 0
+        assert driver.get_title() == 'Fake page'
+
+    def test_local_error_of_probe(self, fake, monkeypatch):
+        breaker = retry.CircuitBreaker(fake.url, failure_threshold=1, reset_timeout=10)
+        breaker.record_failure()
+        now = retry.time.monotonic()
+        monkeypatch.setattr(retry.time, 'monotonic', lambda: now + 11)
+        breaker.before_call()
+        breaker.record_inconclusive()
+        assert breaker.state == breaker.OPEN
+        breaker.before_call()
+        assert breaker.state == breaker.HALF_OPEN
+
+    def test_reset(self):
+        breaker = retry.CircuitBreaker('test', failure_threshold=1)
+        breaker.record_failure()
+        breaker.reset()
+        assert breaker.state == breaker.CLOSED and breaker.failures == 0
+
+    def test_shared_per_endpoint(self):
+        assert retry.get_breaker('127.0.0.1:1') is retry.get_breaker('127.0.0.1:1')
+        assert Controller('http://localhost:1').breaker is retry.get_breaker('127.0.0.1:1')
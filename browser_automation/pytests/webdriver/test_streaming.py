@@ -0,0 +1,100 @@
+import base64
+import gzip
+import io
+import json
+
+import pytest
+
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium.recorder import RecordingController
+from core.webdriver.chromium.streaming import Base64Sink, read_response
+from core.webdriver.exceptions import UnknownError
+
+
+@pytest.fixture
+def fake_options():
+    return {'page_source_size': 200000, 'screenshot_size': 300000}
+
+
+def stream(payload, chunk_size=7, ensure_ascii=True):
+    data = json.dumps(payload, ensure_ascii=ensure_ascii).encode('utf-8')
+    pieces = []
+    result, size = read_response(io.BytesIO(data), pieces.append, chunk_size)
+    assert size == len(data)
+    return result, pieces
+
+
+class TestReadResponse:
+
+    @pytest.mark.parametrize('ensure_ascii', [True, False])
+    def test_string_value_is_streamed(self, ensure_ascii):
+        value = 'a "quoted" \\ line\nwith unicode é \U0001f600 and / slashes ' * 20
+        result, pieces = stream(
+            {'sessionId': 'x', 'status': 0, 'value': value}, ensure_ascii=ensure_ascii)
+        assert ''.join(pieces) == value
+        assert len(pieces) > 1
+        assert result == {'sessionId': 'x', 'status': 0, 'value': None}
+
+    @pytest.mark.parametrize('value', [
+        {'message': 'no such element', 'value': 'x'}, [1, 'value'], 12, None, True])
+    def test_other_values_are_parsed(self, value):
+        payload = {'status': 13, 'value': value}
+        result, pieces = stream(payload)
+        assert result == payload
+        assert pieces == []
+
+    def test_nested_value_keys_are_ignored(self):
+        payload = {'extra': {'value': 'nested'}, 'value': 'top', 'after': 'value'}
+        result, pieces = stream(payload, chunk_size=1)
+        assert pieces == ['t', 'o', 'p']
+        assert result['extra'] == {'value': 'nested'}
+        assert result['after'] == 'value'
+
+    def test_base64_sink(self):
+        data = bytes(range(256)) * 5
+        encoded = base64.b64encode(data).decode('ascii')
+        output = io.BytesIO()
+        sink = Base64Sink(output)
+        for start in range(0, len(encoded), 7):
+            sink(encoded[start:start + 7])
+        sink.close()
+        assert output.getvalue() == data
+
+
+class TestSaveValue:
+
+    def test_save_screenshot(self, fake, tmpdir):
+        driver = ChromiumDriver(fake.url)
+        path = str(tmpdir.join('shot.png'))
+        assert driver.save_screenshot(path) == path
+        with open(path, 'rb') as f:
+            assert f.read() == b'\0' * 300000
+
+    def test_save_page_source_compressed(self, fake, tmpdir):
+        driver = ChromiumDriver(fake.url)
+        path = driver.save_page_source(str(tmpdir.join('page.html.gz')))
+        with gzip.open(path, 'rt') as f:
+            assert f.read() == driver.get_page_source()
+
+    def test_explicit_compression(self, fake, tmpdir):
+        driver = ChromiumDriver(fake.url)
+        path = driver.save_page_source(str(tmpdir.join('page.html')), compress=True)
+        with gzip.open(path, 'rb') as f:
+            assert f.read().startswith(b'<html>')
+
+    def test_error_removes_file(self, fake, tmpdir):
+        fake.state.errors['SCREENSHOT'] = 13
+        driver = ChromiumDriver(fake.url)
+        path = tmpdir.join('shot.png')
+        with pytest.raises(UnknownError):
+            driver.save_screenshot(str(path))
+        assert not path.exists()
+
+    def test_executor_without_streaming(self, fake, tmpdir):
+        executor = RecordingController(fake.url, str(tmpdir.join('log.jsonl')))
+        driver = ChromiumDriver(fake.url, executor=executor)
+        path = driver.save_page_source(str(tmpdir.join('page.html')))
+        with open(path) as f:
+            assert f.read() == driver.get_page_source()
+        executor.close()
+        assert '"GET_PAGE_SOURCE"' in tmpdir.join('log.jsonl').read()
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from core.services.fakedriver import FakeChromeDriver
+from core.services.proxy import UnixSocketProxy
+from core.webdriver.chromium import ChromiumDriver
+from core.webdriver.chromium import transport
+from core.webdriver.chromium.controller import Controller
+
+
+class TestTransportFor:
+
+    def test_tcp(self):
+        tcp = transport.transport_for('http://localhost:9515/')
+        assert isinstance(tcp, transport.TcpTransport)
+        assert tcp.endpoint == '127.0.0.1:9515'
+        assert transport.transport_for('http://10.0.0.2:4444').host == '10.0.0.2'
+
+    def test_tcp_default_port(self):
+        assert transport.transport_for('http://localhost/').endpoint == '127.0.0.1:80'
+        assert Controller('http://example.com').transport.port == 80
+
+    def test_unix(self):
+        unix = transport.transport_for('unix:///run/chromedriver.sock')
+        assert isinstance(unix, transport.UnixTransport)
+        assert unix.path == '/run/chromedriver.sock'
+        assert transport.transport_for('unix://%2Ftmp%2Fa.sock').path == '/tmp/a.sock'
+
+    def test_unknown_scheme(self):
+        with pytest.raises(ValueError):
+            transport.transport_for('ftp://localhost:21')
+
+    def test_register(self, monkeypatch):
+        monkeypatch.setitem(transport.TRANSPORTS, 'test', lambda parts: transport.TcpTransport('h', 1))
+        assert Controller('test://anything').transport.endpoint == 'h:1'
+
+
+class TestUnixSockets:
+
+    def test_direct(self, tmpdir):
+        path = str(tmpdir.join('fake.sock'))
+        with FakeChromeDriver(unix_socket=path) as fake:
+            driver = ChromiumDriver(fake.url)
+            assert driver.get_title() == 'Fake page'
+            driver.quit()
+            assert fake.state.requests['GET_TITLE'] == 1
+        assert not os.path.exists(path)
+
+    def test_proxy(self, tmpdir):
+        path = str(tmpdir.join('proxy', 'driver.sock'))
+        with FakeChromeDriver() as fake, UnixSocketProxy(path, (fake.host, fake.port)) as proxy:
+            assert proxy.url == 'unix://' + path
+            driver = ChromiumDriver(proxy.url)
+            for _ in range(3):
+                driver.find_element('css selector', 'a').click()
+            driver.quit()
+            assert fake.state.requests['CLICK_ELEMENT'] == 3
+        assert not os.path.exists(path)
@@ -0,0 +1,149 @@
+import gc
+
+import pytest
+
+from core.webdriver.chromium import ChromiumDriver, constants as command
+from core.webdriver.exceptions import StaleElementReference
+
+
+@pytest.fixture
+def fake_options():
+    return {'elements_count': 3}
+
+
+def stale_ids(*ids):
+    """
+    Error hook answering StaleElementReference for the given element ids.
+    """
+    return lambda params, state: 10 if params.get('id') in ids else None
+
+
+class TestElementCache:
+
+    def test_repeated_lookup_is_cached(self, fake):
+        driver = ChromiumDriver(fake.url, element_cache=True)
+        driver.load('http://example.com')
+        first = driver.find_element('css selector', '#a')
+        second = driver.find_element('css selector', '#a')
+        assert first is second
+        assert fake.state.requests['FIND_ELEMENT'] == 1
+
+        assert len(driver.find_elements('css selector', 'li')) == 3
+        driver.find_elements('css selector', 'li')
+        assert fake.state.requests['FIND_ELEMENTS'] == 1
+
+    def test_cache_is_per_page(self, fake):
+        driver = ChromiumDriver(fake.url, element_cache=True)
+        driver.load('http://example.com/1')
+        driver.find_element('css selector', '#a')
+        driver.load('http://example.com/2')
+        driver.find_element('css selector', '#a')
+        assert fake.state.requests['FIND_ELEMENT'] == 2
+
+    def test_commands_invalidate_cache(self, fake):
+        driver = ChromiumDriver(fake.url, element_cache=True)
+        element = driver.find_element('css selector', '#a')
+        element.get_text()
+        assert driver.find_element('css selector', '#a') is element
+        element.click()
+        assert driver.find_element('css selector', '#a') is not element
+
+    def test_disabled_by_default(self, fake):
+        driver = ChromiumDriver(fake.url)
+        assert len(driver.find_elements('css selector', 'li')) == 3
+        # The DOM changes without any command, e.g. from a timer
+        fake.state.responses['FIND_ELEMENTS'] = []
+        assert driver.find_elements('css selector', 'li') == []
+        assert fake.state.requests['FIND_ELEMENTS'] == 2
+
+
+class TestStaleElement:
+
+    def test_element_is_resolved_again(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', '#a')
+        old_id = element._id
+        fake.state.errors['CLICK_ELEMENT'] = stale_ids(old_id)
+        element.click()
+        assert element._id != old_id
+        assert fake.state.requests['CLICK_ELEMENT'] == 2
+        assert fake.state.requests['FIND_ELEMENT'] == 2
+
+    def test_element_from_list_keeps_its_index(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_elements('css selector', 'li')[1]
+        old_id = element._id
+        fake.state.errors['CLICK_ELEMENT'] = stale_ids(old_id)
+        fake.state.responses['FIND_ELEMENTS'] = [
+            {'ELEMENT': 'new-0'}, {'ELEMENT': 'new-1'}]
+        element.click()
+        assert element._id == 'new-1'
+
+    def test_element_missing_after_reload(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_elements('css selector', 'li')[2]
+        fake.state.errors['CLICK_ELEMENT'] = stale_ids(element._id)
+        fake.state.responses['FIND_ELEMENTS'] = [{'ELEMENT': 'new-0'}]
+        with pytest.raises(StaleElementReference):
+            element.click()
+
+    def test_child_element(self, fake):
+        driver = ChromiumDriver(fake.url)
+        parent = driver.find_element('css selector', 'form')
+        child = parent.find_element('name', 'q')
+        old_id = child._id
+        fake.state.errors['CLEAR_ELEMENT'] = stale_ids(old_id)
+        child.clear()
+        assert child._id != old_id
+        assert fake.state.requests['FIND_CHILD_ELEMENT'] == 2
+
+    def test_retries_once(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', '#a')
+        fake.state.errors['CLICK_ELEMENT'] = 10
+        with pytest.raises(StaleElementReference):
+            element.click()
+        assert fake.state.requests['CLICK_ELEMENT'] == 2
+
+    def test_unwrapped_element_is_not_retried(self, fake):
+        driver = ChromiumDriver(fake.url)
+        fake.state.responses['EXECUTE_SCRIPT'] = {'ELEMENT': 'from-script'}
+        element = driver.execute_script('return document.body')
+        fake.state.errors['CLICK_ELEMENT'] = 10
+        with pytest.raises(StaleElementReference):
+            element.click()
+        assert fake.state.requests['CLICK_ELEMENT'] == 1
+
+
+class TestElementInterning:
+
+    def test_same_id_is_same_object(self, fake):
+        fake.state.responses['FIND_ELEMENT'] = {'ELEMENT': 'same'}
+        fake.state.responses['GET_ACTIVE_ELEMENT'] = {'ELEMENT': 'same'}
+        driver = ChromiumDriver(fake.url, element_cache=False)
+        element = driver.find_element('css selector', '#a')
+        assert driver.find_element('css selector', '#b') is element
+        assert driver.execute_command(command.GET_ACTIVE_ELEMENT) is element
+
+    def test_elements_are_released(self, fake):
+        driver = ChromiumDriver(fake.url, element_cache=False)
+        elements = driver.find_elements('css selector', 'li')
+        assert len(driver._elements) == 3
+        del elements
+        gc.collect()
+        assert len(driver._elements) == 0
+
+    def test_slots(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', '#a')
+        assert not hasattr(element, '__dict__')
+        with pytest.raises(AttributeError):
+            element.extra = 1
+
+    def test_resolved_element_is_rebound(self, fake):
+        driver = ChromiumDriver(fake.url)
+        element = driver.find_element('css selector', '#a')
+        fake.state.errors['CLICK_ELEMENT'] = stale_ids(element._id)
+        element.click()
+        fake.state.responses['GET_ACTIVE_ELEMENT'] = {'ELEMENT': element._id}
+        assert driver.execute_command(command.GET_ACTIVE_ELEMENT) is element
@@ -6,9 +6,11 @@ empty = object()
 
 def new_method_proxy(func):
     def inner(self, *args):
-        if self._wrapped is empty:
+        _wrapped = self._wrapped
+        if _wrapped is empty:
             self._setup()
-        return func(self._wrapped, *args)
+            _wrapped = self._wrapped
+        return func(_wrapped, *args)
     return inner
 
 def unpickle_lazyobject(wrapped):
@@ -125,4 +127,118 @@ class LazyObject(object):
     __iter__ = new_method_proxy(iter)
     __len__ = new_method_proxy(len)
     __contains__ = new_method_proxy(operator.contains)
-    
\ No newline at end of file
+
+
+class CachedLazyObject(LazyObject):
+    """
+    A LazyObject that stores every attribute looked up on the wrapped object
+    in its own __dict__. Later lookups of the same name are plain instance
+    attribute reads that never reach __getattr__, so the proxy costs nothing
+    after the first access.
+
+    Only use it for wrapped objects whose attributes are not rebound behind
+    the proxy's back; assignments and deletions made through the proxy do
+    invalidate the cached name.
+    """
+    def __init__(self):
+        self.__dict__['_cached'] = set()
+        super(CachedLazyObject, self).__init__()
+
+    def __getattr__(self, name):
+        _wrapped = self._wrapped
+        if _wrapped is empty:
+            self._setup()
+            _wrapped = self._wrapped
+        value = getattr(_wrapped, name)
+        self.__dict__[name] = value
+        self._cached.add(name)
+        return value
+
+    def __setattr__(self, name, value):
+        if name == "_wrapped":
+            self._clear_cache()
+        else:
+            self._uncache(name)
+        super(CachedLazyObject, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        self._uncache(name)
+        super(CachedLazyObject, self).__delattr__(name)
+
+    def _uncache(self, name):
+        if name in self._cached:
+            self._cached.discard(name)
+            del self.__dict__[name]
+
+    def _clear_cache(self):
+        for name in self._cached:
+            del self.__dict__[name]
+        self._cached.clear()
+
+
+class SimpleLazyObject(LazyObject):
+    """
+    A lazy object initialized from any function.
+
+    Designed for compound objects of unknown type. For builtins or objects of
+    known type, use LazyObject. Every attribute read goes to the wrapped
+    object; subclass CachedLazyObject instead to cache them in the proxy.
+    """
+    def __init__(self, func):
+        """
+        Pass in a callable that returns the object to be wrapped.
+
+        If copies are made of the resulting SimpleLazyObject, which can happen
+        in various circumstances, make sure that the callable can be safely
+        run more than once and will return the same value.
+        """
+        self.__dict__['_setupfunc'] = func
+        super(SimpleLazyObject, self).__init__()
+
+    def _setup(self):
+        self._wrapped = self._setupfunc()
+
+    def __repr__(self):
+        if self._wrapped is empty:
+            repr_attr = self._setupfunc
+        else:
+            repr_attr = self._wrapped
+        return '<%s: %r>' % (type(self).__name__, repr_attr)
+
+    def __copy__(self):
+        if self._wrapped is empty:
+            # If uninitialized, copy the wrapper. Use SimpleLazyObject, not
+            # self.__class__, because the latter is proxied.
+            return SimpleLazyObject(self._setupfunc)
+        else:
+            # If initialized, return a copy of the wrapped object.
+            return copy.copy(self._wrapped)
+
+    def __deepcopy__(self, memo):
+        if self._wrapped is empty:
+            # We have to use SimpleLazyObject, not self.__class__, because the
+            # latter is proxied.
+            result = SimpleLazyObject(self._setupfunc)
+            memo[id(self)] = result
+            return result
+        return copy.deepcopy(self._wrapped, memo)
+
+
+class cached_property(object):
+    """
+    Decorator that converts a method with a single self argument into a
+    property cached on the instance. The value is stored in the instance
+    __dict__ under the same name, so later reads don't call the descriptor.
+
+    A cached value can be discarded with `del instance.name`.
+    """
+    def __init__(self, func, name=None):
+        self.func = func
+        self.__doc__ = getattr(func, '__doc__')
+        self.name = name or func.__name__
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        res = instance.__dict__[self.name] = self.func(instance)
+        return res